@@ -0,0 +1,170 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Benchmark end-to-end sync throughput and latency of the downloader.
+
+Runs against a local `fake_ckan.FakeCKANServer`, so no network is needed.
+Each scenario syncs `--datasets` datasets of `--files` files into a fresh
+directory:
+
+- sequential: one request at a time, a new connection for every request
+  (the behaviour of module-level `httpx.get` / `httpx.stream`)
+- pooled: one request at a time over a keep-alive connection pool
+- concurrent: `--jobs` requests in flight over the pool
+- resync: the concurrent sync repeated on an up-to-date directory, served
+  from the manifest
+
+Usage:
+
+    python benchmarks/bench_downloader.py --files 10 --size 5000000 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from fake_ckan import FakeCKANServer
+from tddata import downloader
+from tddata.scheduler import Scheduler
+from tddata.session import Session
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _sync(
+    server: FakeCKANServer,
+    dest_dir: Path,
+    dataset_ids: List[str],
+    jobs: int,
+    pooled: bool,
+) -> List[Dict]:
+    session = Session(
+        max_connections=jobs,
+        max_keepalive_connections=jobs if pooled else 0,
+        api_url=server.api_url,
+    )
+    # No rate limiting: the benchmark measures the transfer paths themselves
+    scheduler = Scheduler(rate=1e9, burst=10**9, base_delay=0.01)
+    async with session:
+        return await downloader.download_async(
+            dest_dir, dataset_ids, jobs=jobs, session=session, scheduler=scheduler
+        )
+
+
+def run_scenario(
+    name: str,
+    server: FakeCKANServer,
+    dataset_ids: List[str],
+    jobs: int,
+    pooled: bool,
+    repeat: int,
+    resync: bool = False,
+) -> Dict:
+    walls = []
+    durations = []
+    ttfbs = []
+    transferred = 0
+    for _ in range(repeat):
+        dest_dir = Path(tempfile.mkdtemp(prefix="tddata-bench-"))
+        try:
+            if resync:
+                asyncio.run(_sync(server, dest_dir, dataset_ids, jobs, pooled))
+            requests_before = server.requests
+            start = time.perf_counter()
+            results = asyncio.run(_sync(server, dest_dir, dataset_ids, jobs, pooled))
+            walls.append(time.perf_counter() - start)
+            requests = server.requests - requests_before
+        finally:
+            shutil.rmtree(dest_dir)
+        durations += [r["duration"] for r in results if "duration" in r]
+        ttfbs += [r["ttfb"] for r in results if "ttfb" in r]
+        transferred = sum(r.get("bytes_transferred", 0) for r in results)
+
+    wall = statistics.median(walls)
+    return {
+        "scenario": name,
+        "jobs": jobs,
+        "wall_s": wall,
+        "requests": requests,
+        "mb": transferred / 1e6,
+        "mb_per_s": transferred / 1e6 / wall if wall else 0.0,
+        "file_p50_s": _percentile(durations, 0.5),
+        "file_p95_s": _percentile(durations, 0.95),
+        "ttfb_p50_ms": _percentile(ttfbs, 0.5) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tddata downloader")
+    parser.add_argument("--datasets", type=int, default=2)
+    parser.add_argument("--files", type=int, default=10, help="Files per dataset")
+    parser.add_argument("--size", type=int, default=2_000_000, help="Bytes per file")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    dataset_ids = [f"dataset-{i}" for i in range(args.datasets)]
+    scenarios = [
+        ("sequential", 1, False, False),
+        ("pooled", 1, True, False),
+        ("concurrent", args.jobs, True, False),
+        ("resync", args.jobs, True, True),
+    ]
+
+    with FakeCKANServer(
+        files=args.files,
+        size=args.size,
+        latency=args.latency,
+        error_rate=args.error_rate,
+    ) as server:
+        # Keep the downloader's messages and progress bars out of the report
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(
+            devnull
+        ), contextlib.redirect_stderr(devnull):
+            rows = [
+                run_scenario(
+                    name, server, dataset_ids, jobs, pooled, args.repeat, resync
+                )
+                for name, jobs, pooled, resync in scenarios
+            ]
+
+    columns = list(rows[0])
+    print(" ".join(f"{c:>12}" for c in columns))
+    for row in rows:
+        print(
+            " ".join(
+                f"{v:>12.3f}" if isinstance(v, float) else f"{v:>12}"
+                for v in row.values()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Local stand-in for the Tesouro Transparente CKAN API and file server.
+
+Serves `package_show` for any dataset id, listing `--files` CSV resources of
+`--size` bytes each, and the files themselves. Responses can be delayed
+(`--latency`) and fail at random with 503 errors (`--error-rate`). Files
+support `Range` requests and `ETag` / `If-None-Match` validators, like the
+real server, so every downloader code path can be exercised offline.
+
+Run it standalone and point tddata at it:
+
+    python benchmarks/fake_ckan.py --port 8765 --files 20 --size 5000000
+    TDDATA_CKAN_API_URL=http://127.0.0.1:8765/api/3/action/package_show \\
+        tddata --dataset all -o /tmp/data
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+PACKAGE_SHOW_PATH = "/api/3/action/package_show"
+
+CSV_HEADER = (
+    b"Codigo do Investidor;Data da Operacao;Tipo Titulo;Vencimento do Titulo;"
+    b"Quantidade;Valor do Titulo;Valor da Operacao;Tipo da Operacao;"
+    b"Canal da Operacao\n"
+)
+CSV_ROW = b"123456;15/05/2024;Tesouro Selic;01/03/2029;1,5;1000,00;1500,00;C;S\n"
+
+
+def make_payload(size: int) -> bytes:
+    """Operations-like CSV content of exactly `size` bytes."""
+    rows = CSV_ROW * (max(0, size - len(CSV_HEADER)) // len(CSV_ROW) + 1)
+    return (CSV_HEADER + rows)[:size]
+
+
+class FakeCKANServer(ThreadingHTTPServer):
+    """CKAN `package_show` and file server with latency and error injection.
+
+    Args:
+        port: TCP port to listen on (0 picks a free port).
+        files: Number of CSV resources listed for each dataset.
+        size: Size in bytes of each CSV resource.
+        latency: Seconds to wait before answering each request.
+        error_rate: Probability of answering a request with a 503 error.
+        last_modified: The `last_modified` reported for every resource.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        files: int = 10,
+        size: int = 1_000_000,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        last_modified: str = "2024-01-01T12:00:00.000000",
+    ):
+        super().__init__(("127.0.0.1", port), FakeCKANHandler)
+        self.files = files
+        self.size = size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.last_modified = last_modified
+        self.payload = make_payload(size)
+        self.etag = '"' + hashlib.sha256(self.payload).hexdigest()[:16] + '"'
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def api_url(self) -> str:
+        return self.url + PACKAGE_SHOW_PATH
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> "FakeCKANServer":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeCKANServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class FakeCKANHandler(BaseHTTPRequestHandler):
+    server: FakeCKANServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.count_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if random.random() < self.server.error_rate:
+            return self._send(503, b"Service Unavailable")
+
+        url = urlparse(self.path)
+        if url.path == PACKAGE_SHOW_PATH:
+            dataset_id = parse_qs(url.query).get("id", ["dataset"])[0]
+            return self._package_show(dataset_id)
+        if url.path.startswith("/files/"):
+            return self._file()
+        self._send(404, b"Not Found")
+
+    def _send(self, status: int, body: bytes, headers: Optional[dict] = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _package_show(self, dataset_id: str):
+        base_year = 2025 - self.server.files + 1
+        resources = [
+            {
+                "id": f"{dataset_id}-{i}",
+                "name": f"{dataset_id} {base_year + i}",
+                "format": "CSV",
+                "url": f"{self.server.url}/files/{dataset_id}/{i}.csv",
+                "last_modified": self.server.last_modified,
+                "size": self.server.size,
+            }
+            for i in range(self.server.files)
+        ]
+        body = json.dumps({"success": True, "result": {"resources": resources}})
+        self._send(200, body.encode(), {"Content-Type": "application/json"})
+
+    def _file(self):
+        payload = self.server.payload
+        headers = {"ETag": self.server.etag, "Accept-Ranges": "bytes"}
+        if self.headers.get("If-None-Match") == self.server.etag:
+            return self._send(304, b"", headers)
+
+        match = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            if start >= len(payload):
+                headers["Content-Range"] = f"bytes */{len(payload)}"
+                return self._send(416, b"", headers)
+            headers["Content-Range"] = f"bytes {start}-{len(payload) - 1}/{len(payload)}"
+            return self._send(206, payload[start:], headers)
+        self._send(200, payload, headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--files", type=int, default=10, help="Resources per dataset")
+    parser.add_argument("--size", type=int, default=1_000_000, help="Bytes per file")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Probability of a 503 error"
+    )
+    args = parser.parse_args()
+
+    server = FakeCKANServer(
+        port=args.port,
+        files=args.files,
+        size=args.size,
+        latency=args.latency,
+        error_rate=args.error_rate,
+    )
+    print(f"Serving fake CKAN API at {server.api_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
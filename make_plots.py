@@ -16,9 +16,9 @@
 
 import argparse
 from pathlib import Path
+from typing import Optional
 
 import matplotlib.pyplot as plt
-import pandas as pd
 import seaborn as sns
 
 from tddata import plot, reader, storage
@@ -90,30 +90,21 @@ def run_stock(data_dir: Path):
     save_plot(fig, "stock_evolution_total.png")
 
 
-def run_investors(data_dir: Path):
+def run_investors(data_dir: Path, workers: Optional[int] = None):
     # Load all investors files
     # Use storage.get_latest_files to get the latest version of each year's file
     # The pattern for investors is "investidores-do-tesouro-direto-YYYY@timestamp.csv"
     # storage.get_latest_files handles the versioning correctly
-
-    all_files = storage.get_latest_files(data_dir)
-    files = [f for f in all_files if "investidores-do-tesouro-direto-" in f.name]
+    files = storage.get_latest_files(
+        data_dir, pattern="investidores-do-tesouro-direto-*.csv"
+    )
 
     if not files:
         print("No investors file found.")
         return
 
     print(f"Loading {len(files)} investors files...")
-    all_data = []
-    for f in files:
-        print(f"    Reading {f.name}...")
-        df = reader.read_investors(f)
-        all_data.append(df)
-
-    if not all_data:
-        return
-
-    full_data = pd.concat(all_data, ignore_index=True)
+    full_data = reader.read_many("investors", files, workers=workers)
     full_data = full_data.drop_duplicates(
         subset=[Column.INVESTOR_ID.value, Column.JOIN_DATE.value]
     )
@@ -147,27 +138,21 @@ def run_investors(data_dir: Path):
     save_plot(fig, "investors_new_evolution_history.png")
 
 
-def run_operations(data_dir: Path):
+def run_operations(data_dir: Path, workers: Optional[int] = None):
     # Use storage.get_latest_files to get the latest version of each year's file
-    all_files = storage.get_latest_files(data_dir)
-    files = [f for f in all_files if "operacoes-do-tesouro-direto-" in f.name]
+    files = storage.get_latest_files(
+        data_dir, pattern="operacoes-do-tesouro-direto-*.csv"
+    )
 
     if not files:
         print("No operations file found.")
         return
 
     print(f"Loading {len(files)} operations files for evolution...")
-    all_data = []
-    for f in files:
-        print(f"    Reading {f.name}...")
-        df = reader.read_operations(f)
-        all_data.append(df)
-
-    if all_data:
-        full_data = pd.concat(all_data, ignore_index=True)
-        print("  Plotting operations by type (all history)...")
-        fig = plot.plot_operations(full_data, by_type=True)
-        save_plot(fig, "operations_evolution_by_type_history.png")
+    full_data = reader.read_many("operations", files, workers=workers)
+    print("  Plotting operations by type (all history)...")
+    fig = plot.plot_operations(full_data, by_type=True)
+    save_plot(fig, "operations_evolution_by_type_history.png")
 
 
 def run_sales(data_dir: Path):
@@ -238,6 +223,13 @@ def main():
         default="~/data/tddata",
         help="Directory containing the data files (default: ~/data/tddata)",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes reading the yearly files (default: number of CPUs)",
+    )
     args = parser.parse_args()
 
     data_dir = Path(args.data_dir).expanduser()
@@ -245,8 +237,8 @@ def main():
     print("Starting plot generation...")
     run_prices(data_dir)
     run_stock(data_dir)
-    run_investors(data_dir)
-    run_operations(data_dir)
+    run_investors(data_dir, args.workers)
+    run_operations(data_dir, args.workers)
     run_sales(data_dir)
     run_buybacks(data_dir)
     run_maturities(data_dir)
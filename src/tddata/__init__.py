@@ -25,11 +25,13 @@ from .constants import (
     OperationType,
     TradedLast12Months,
 )
+from .session import Session
 
 __all__ = [
     "downloader",
     "plot",
     "reader",
+    "Session",
     "Column",
     "BondType",
     "OperationType",
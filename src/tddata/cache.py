@@ -0,0 +1,246 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Opt-in Parquet cache of the DataFrames returned by the readers.
+
+Parsing the big semicolon CSVs (decimal commas, day-first dates) is slow.
+With the cache enabled, the normalized DataFrame returned by a
+`reader.read_*` function is also stored as Parquet, and later reads of the
+same file load it instead of parsing the CSV again.
+
+A cache entry is keyed by the source file (resolved path, size and
+modification time), the reader function, its CSV engine and
+`READER_VERSION`, so it is ignored as soon as the file changes or the
+normalization done by the readers changes. Stale entries of a source file
+are removed when a new one is written.
+
+The cache is enabled per call with the `cache` argument of the readers, or
+for every call by setting the `TDDATA_CACHE_DIR` environment variable. It
+needs the optional `pyarrow` package (`pip install "tddata[parquet]"`).
+"""
+
+import functools
+import glob
+import hashlib
+import os
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from . import columnar, selection
+from .selection import ColumnName, Filters
+
+# Bump whenever the columns or dtypes returned by the readers change, so
+# entries written by an older version are not used anymore:
+#   2: bond types normalized into categoricals of the `BondType` names
+#   3: maturities and interest coupons return `redemption_date`
+#   4: integer columns are nullable, both engines return the declared types
+#   5: text columns are `pd.StringDtype()`, dates microseconds on any pandas
+READER_VERSION = 5
+
+CACHE_DIR_ENV = "TDDATA_CACHE_DIR"
+
+# Default cache directory, relative to the directory of the source file
+CACHE_DIRNAME = ".tddata-cache"
+
+CacheOption = Union[bool, str, Path, None]
+
+
+def get_cache_dir(filepath: Path, cache: CacheOption = None) -> Optional[Path]:
+    """Resolve the cache directory used for a source file.
+
+    Args:
+        filepath: The source CSV file.
+        cache: False disables the cache. None uses the `TDDATA_CACHE_DIR`
+            environment variable, if set. True uses that variable or, if it
+            is not set, a `.tddata-cache` directory next to the source file.
+            A path selects the cache directory explicitly.
+
+    Returns:
+        Path | None: The cache directory, or None if caching is disabled.
+    """
+    if cache is False:
+        return None
+    if cache is None or cache is True:
+        env_dir = os.environ.get(CACHE_DIR_ENV)
+        if env_dir:
+            return Path(env_dir)
+        return Path(filepath).parent / CACHE_DIRNAME if cache else None
+    return Path(cache)
+
+
+def get_cache_path(
+    cache_dir: Path, filepath: Path, reader_name: str, engine: str = "c"
+) -> Path:
+    """Return the path of the cache entry of a source file, reader and engine.
+
+    The entry is named `<file name>.<reader>.<engine>.<source>.<key>.parquet`,
+    where
+    `<source>` identifies the resolved path of the source file, so files of
+    the same name in other directories sharing the cache directory do not
+    replace each other's entries, and `<key>` its current version.
+    """
+    filepath = Path(filepath)
+    resolved = filepath.resolve()
+    stat = filepath.stat()
+    source = hashlib.sha256(str(resolved).encode()).hexdigest()[:16]
+    key = hashlib.sha256(
+        f"{resolved}:{stat.st_size}:{stat.st_mtime_ns}:"
+        f"{reader_name}:{engine}:{READER_VERSION}".encode()
+    ).hexdigest()[:16]
+    name = f"{filepath.name}.{reader_name}.{engine}.{source}.{key}.parquet"
+    return cache_dir / name
+
+
+def cached(read: Callable) -> Callable:
+    """Add the `cache` argument to a `reader.read_*` function.
+
+    The wrapped function takes the same arguments as `read`, plus
+    `cache` (see `get_cache_dir`).
+
+    Entries always hold the whole file: a read with `columns` or `filters`
+    (see `tddata.selection`) writes the complete entry and selects from it,
+    and later reads push them down into the Parquet reader.
+    """
+
+    @functools.wraps(read)
+    def wrapper(
+        filepath: Path,
+        chunksize: Optional[int] = None,
+        cache: CacheOption = None,
+        columns: Optional[List[ColumnName]] = None,
+        filters: Optional[Filters] = None,
+        **kwargs,
+    ):
+        # File objects (e.g. a download being converted) are never cached
+        is_path = isinstance(filepath, (str, os.PathLike))
+        cache_dir = get_cache_dir(filepath, cache) if is_path else None
+        if cache_dir is None:
+            return read(
+                filepath,
+                chunksize=chunksize,
+                columns=columns,
+                filters=filters,
+                **kwargs,
+            )
+
+        columnar.require_pyarrow()
+        # Each engine gets its own entry, the C parser being the default
+        cache_path = get_cache_path(
+            cache_dir, filepath, read.__name__, kwargs.get("engine", "c")
+        )
+        if cache_path.exists():
+            if chunksize is None:
+                table = columnar.pq.read_table(
+                    cache_path,
+                    columns=selection.needed_columns(columns, filters),
+                    filters=selection.to_arrow_filters(filters),
+                )
+                return selection.apply(table.to_pandas(), columns)
+            chunks = _iter_cached(
+                cache_path, chunksize, selection.needed_columns(columns, filters)
+            )
+            return selection.iter_select(chunks, columns, filters)
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        if chunksize is None:
+            df = read(filepath, **kwargs)
+            writer = _EntryWriter(cache_path)
+            writer.write(df)
+            writer.commit()
+            return selection.select(df, columns, filters)
+        chunks = read(filepath, chunksize=chunksize, **kwargs)
+        return selection.iter_select(
+            _write_through(chunks, cache_path), columns, filters
+        )
+
+    return wrapper
+
+
+def _iter_cached(
+    cache_path: Path, chunksize: int, columns: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    start = 0
+    parquet_file = columnar.pq.ParquetFile(cache_path)
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+        df = batch.to_pandas()
+        # Continue the row numbering across chunks, as `pd.read_csv` does
+        df.index = pd.RangeIndex(start, start + len(df))
+        start += len(df)
+        yield df
+
+
+def _write_through(
+    chunks: Iterator[pd.DataFrame], cache_path: Path
+) -> Iterator[pd.DataFrame]:
+    """Yield the chunks of a reader, caching them once all were read."""
+    writer = _EntryWriter(cache_path)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+            yield chunk
+        writer.commit()
+    finally:
+        writer.discard()
+
+
+class _EntryWriter:
+    """Write a cache entry to a temporary file and publish it atomically.
+
+    Writing is given up, without raising, if a DataFrame does not fit the
+    schema of the first one: the data is still returned, just not cached.
+    """
+
+    def __init__(self, cache_path: Path):
+        self.cache_path = cache_path
+        self.tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        self.writer: Optional["columnar.pq.ParquetWriter"] = None
+        self.failed = False
+
+    def write(self, df: pd.DataFrame):
+        if self.failed:
+            return
+        try:
+            schema = self.writer.schema if self.writer is not None else None
+            table = columnar.pa.Table.from_pandas(
+                df, schema=schema, preserve_index=False
+            )
+            if self.writer is None:
+                self.writer = columnar.pq.ParquetWriter(self.tmp_path, table.schema)
+            self.writer.write_table(table)
+        except columnar.pa.ArrowException:
+            self.failed = True
+
+    def commit(self):
+        if self.writer is None or self.failed:
+            self.discard()
+            return
+        self.writer.close()
+        self.writer = None
+        os.replace(self.tmp_path, self.cache_path)
+        # Drop the entries of older versions of the same source file (all
+        # of the name but the key)
+        prefix = glob.escape(self.cache_path.name.rsplit(".", 2)[0])
+        for stale in self.cache_path.parent.glob(f"{prefix}.*.parquet"):
+            if stale != self.cache_path:
+                stale.unlink(missing_ok=True)
+
+    def discard(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.tmp_path.unlink(missing_ok=True)
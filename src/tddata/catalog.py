@@ -0,0 +1,268 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Indexed catalog of the files stored in a data directory.
+
+The catalog lives in the data directory as `catalog.sqlite` and keeps one row
+per stored data file with its slug, version timestamp, dataset, year,
+extension, size and digest. The downloader updates it as files are
+published, so finding the latest version of a file group is an indexed query
+instead of a scan of the whole directory. `Catalog.rebuild` (or
+`tddata reindex`) recreates it from the files on disk.
+"""
+
+import datetime as dt
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .manifest import MANIFEST_FILENAME, Manifest
+from .storage import (
+    STORED_SUFFIXES,
+    extract_year,
+    get_stored_extensions,
+    is_data_file,
+    parse_filename,
+    slugify,
+)
+
+CATALOG_FILENAME = "catalog.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    slug TEXT NOT NULL,
+    version TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    dataset TEXT,
+    year INTEGER,
+    size INTEGER,
+    digest TEXT,
+    added_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_slug_version
+    ON files (extension, slug, version);
+CREATE INDEX IF NOT EXISTS files_dataset_year
+    ON files (dataset, year);
+"""
+
+
+class Catalog:
+    """SQLite index of the data files of a directory.
+
+    Opening a catalog that does not exist yet creates it and indexes the
+    files already in the directory.
+
+    Args:
+        data_dir: The data directory holding the catalog file.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = data_dir
+        self.path = data_dir / CATALOG_FILENAME
+        created = not self.path.exists()
+        data_dir.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript(_SCHEMA)
+        if created:
+            self.rebuild()
+
+    @staticmethod
+    def exists(data_dir: Path) -> bool:
+        """Whether `data_dir` has a catalog."""
+        return (data_dir / CATALOG_FILENAME).exists()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(
+        self,
+        path: Path,
+        dataset: Optional[str] = None,
+        size: Optional[int] = None,
+        digest: Optional[str] = None,
+    ):
+        """Record a published data file, replacing any previous row for it.
+
+        Args:
+            path: The path of the file, inside the data directory.
+            dataset: The CKAN dataset id the file belongs to.
+            size: The size of the file in bytes; read from disk if omitted.
+            digest: The integrity digest of the file, as `"algorithm:hex"`.
+        """
+        with self.connection:
+            self._insert(path, dataset, size, digest)
+
+    def remove(self, path: Path):
+        """Forget a data file."""
+        with self.connection:
+            self.connection.execute("DELETE FROM files WHERE path = ?", (path.name,))
+
+    def replace(self, path: Path, new_path: Path, digest: Optional[str] = None):
+        """Record that a data file was replaced, e.g. by its compressed version.
+
+        The new file keeps the dataset of the old one, with its own size.
+
+        Args:
+            path: The file replaced, inside the data directory.
+            new_path: The file replacing it.
+            digest: The integrity digest of `new_path`, as `"algorithm:hex"`.
+        """
+        with self.connection:
+            row = self.connection.execute(
+                "SELECT dataset FROM files WHERE path = ?", (path.name,)
+            ).fetchone()
+            self.connection.execute("DELETE FROM files WHERE path = ?", (path.name,))
+            self._insert(new_path, row[0] if row else None, None, digest)
+
+    def rebuild(self):
+        """Recreate the catalog from the data files on disk.
+
+        Datasets are taken from the manifest, when there is one. The whole
+        rebuild is a single transaction, so readers never see a partial index.
+        """
+        datasets = self._datasets_by_slug()
+        with self.connection:
+            self.connection.execute("DELETE FROM files")
+            for path in sorted(self.data_dir.iterdir()):
+                if not is_data_file(path.name):
+                    continue
+                slug = parse_filename(path.name)[0]
+                self._insert(path, datasets.get(slug), None, None)
+
+    def latest_files(
+        self,
+        extension: str = ".csv",
+        pattern: Optional[str] = None,
+        dataset: Optional[str] = None,
+    ) -> List[Path]:
+        """Return the latest version of each file group.
+
+        Snapshot references and compressed files count as files of the
+        extension they replace.
+
+        Args:
+            extension: The extension of the files to consider.
+            pattern: An optional glob pattern the filenames must match.
+            dataset: An optional CKAN dataset id the files must belong to.
+
+        Returns:
+            List[Path]: A sorted list of paths to the latest version of each
+                file group.
+        """
+        extensions = get_stored_extensions(extension)
+        query = (
+            "SELECT path, MAX(version) FROM files"
+            f" WHERE extension IN ({', '.join('?' * len(extensions))})"
+        )
+        params: List = list(extensions)
+        if pattern is not None:
+            globs = _globs(pattern)
+            query += f" AND ({' OR '.join(['path GLOB ?'] * len(globs))})"
+            params.extend(globs)
+        if dataset is not None:
+            query += " AND dataset = ?"
+            params.append(dataset)
+        query += " GROUP BY slug ORDER BY path"
+        return self._existing(query, params)
+
+    def latest_file(self, pattern: str) -> Optional[Path]:
+        """Return the latest file matching a glob pattern, if any."""
+        globs = _globs(pattern)
+        files = self._existing(
+            f"SELECT path FROM files WHERE {' OR '.join(['path GLOB ?'] * len(globs))}"
+            " ORDER BY version DESC LIMIT 1",
+            globs,
+        )
+        return files[0] if files else None
+
+    def versions(self, slug: str, extension: str = ".csv") -> List[Path]:
+        """Return every version of a file group, oldest first."""
+        extensions = get_stored_extensions(extension)
+        return self._existing(
+            "SELECT path FROM files"
+            f" WHERE extension IN ({', '.join('?' * len(extensions))}) AND slug = ?"
+            " ORDER BY version",
+            [*extensions, slug],
+        )
+
+    def _existing(self, query: str, params: List) -> List[Path]:
+        """Run a query for paths, dropping rows of files deleted meanwhile."""
+        while True:
+            rows = self.connection.execute(query, params)
+            paths = [self.data_dir / row[0] for row in rows]
+            missing = [path for path in paths if not path.exists()]
+            if not missing:
+                return paths
+            with self.connection:
+                self.connection.executemany(
+                    "DELETE FROM files WHERE path = ?",
+                    [(path.name,) for path in missing],
+                )
+
+    def _insert(
+        self,
+        path: Path,
+        dataset: Optional[str],
+        size: Optional[int],
+        digest: Optional[str],
+    ):
+        slug, version, extension = parse_filename(path.name)
+        if size is None and path.is_file():
+            size = path.stat().st_size
+        elif size is None and path.is_dir():
+            # Parquet datasets are directories of part files
+            size = sum(part.stat().st_size for part in path.iterdir())
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files"
+            " (path, slug, version, extension, dataset, year, size, digest, added_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path.name,
+                slug,
+                version,
+                extension,
+                dataset,
+                extract_year(path.name),
+                size,
+                digest,
+                dt.datetime.now().isoformat(timespec="seconds"),
+            ),
+        )
+
+    def _datasets_by_slug(self) -> Dict[str, str]:
+        if not (self.data_dir / MANIFEST_FILENAME).exists():
+            return {}
+        manifest = Manifest.load(self.data_dir)
+        return {
+            slugify(resource["name"]): dataset_id
+            for dataset_id, entry in manifest.datasets.items()
+            for resource in entry.get("resources", [])
+        }
+
+
+def _globs(pattern: str) -> List[str]:
+    """Return the GLOB patterns matching `pattern`, referenced or compressed."""
+    return [pattern + suffix for suffix in ("", *STORED_SUFFIXES)]
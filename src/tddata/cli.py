@@ -15,9 +15,21 @@
 
 
 import argparse
+import asyncio
 from pathlib import Path
 
-from . import downloader
+from . import (
+    catalog,
+    compression,
+    downloader,
+    integrity,
+    ipc,
+    partitioned,
+    scheduler,
+    session,
+    snapshots,
+    storage,
+)
 from .constants import (
     DATASET_BUYBACKS,
     DATASET_INVESTORS,
@@ -52,14 +64,322 @@ def set_parser():
         default="prices",
         help="Dataset to download: 'prices', 'operations', 'investors', 'stock', 'buybacks', 'sales' or 'all'",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=downloader.DEFAULT_JOBS,
+        help=f"Maximum number of concurrent downloads (default: {downloader.DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=session.DEFAULT_TIMEOUT,
+        help=f"HTTP read timeout in seconds (default: {session.DEFAULT_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--api-url",
+        default=None,
+        help=(
+            "CKAN package_show endpoint (default: $TDDATA_CKAN_API_URL or the "
+            "Tesouro Transparente API)"
+        ),
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        default=False,
+        help="Use HTTP/2 (requires the 'http2' extra: pip install tddata[http2])",
+    )
+    parser.add_argument(
+        "--metadata-max-age",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help=(
+            "Reuse the CKAN metadata recorded in the data directory's manifest "
+            "if it is younger than SECONDS, instead of calling the API (default: 0)"
+        ),
+    )
+    parser.add_argument(
+        "--years",
+        type=downloader.parse_years,
+        default=None,
+        help=(
+            "Only download yearly resources of these years, e.g. '2025', "
+            "'2023-2025' or '2020,2022-2023'. Resources without a year are kept"
+        ),
+    )
+    parser.add_argument(
+        "--resource-glob",
+        dest="resource_globs",
+        action="append",
+        default=None,
+        metavar="PATTERN",
+        help=(
+            "Only download resources whose (slugified) name matches PATTERN, "
+            "e.g. 'operacoes-*-2025'. May be repeated"
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=downloader.OUTPUT_FORMATS,
+        default="csv",
+        help=(
+            "Save files as published ('csv') or convert them to Parquet while "
+            "downloading ('parquet', requires pyarrow) (default: csv)"
+        ),
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=scheduler.DEFAULT_RATE,
+        help=f"Maximum requests per second to each host (default: {scheduler.DEFAULT_RATE})",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=scheduler.DEFAULT_MAX_ATTEMPTS,
+        help=f"Attempts per request before giving up (default: {scheduler.DEFAULT_MAX_ATTEMPTS})",
+    )
+    parser.add_argument(
+        "--retry-budget",
+        type=int,
+        default=scheduler.DEFAULT_RETRY_BUDGET,
+        help=f"Maximum number of retries in the whole run (default: {scheduler.DEFAULT_RETRY_BUDGET})",
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        default=False,
+        help="Store downloaded CSVs as deduplicated snapshots (see 'snapshot')",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=list(compression.COMPRESSIONS),
+        default=None,
+        help="Compress downloaded CSVs while they stream (.csv.zst or .csv.gz)",
+    )
     parser.add_argument("--verbose", action="store_true", default=False)
+
+    subparsers = parser.add_subparsers(
+        dest="command",
+        title="commands",
+        description="Without a command, the selected dataset is downloaded.",
+    )
+
+    verify_parser = subparsers.add_parser(
+        "verify", help="Check the stored files against their recorded digests"
+    )
+    _add_data_dir_argument(verify_parser)
+    verify_parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+
+    reindex_parser = subparsers.add_parser(
+        "reindex", help="Rebuild the catalog of the stored files"
+    )
+    _add_data_dir_argument(reindex_parser)
+
+    partition_parser = subparsers.add_parser(
+        "partition",
+        help="Rewrite datasets into the year/bond_type partitioned Parquet store",
+    )
+    _add_data_dir_argument(partition_parser)
+    partition_parser.add_argument(
+        "datasets",
+        nargs="*",
+        type=_partitioned_dataset,
+        metavar="DATASET",
+        help=f"Datasets to rewrite (default: all): {', '.join(partitioned.DATASETS)}",
+    )
+
+    export_parser = subparsers.add_parser(
+        "export",
+        help="Write datasets to memory-mappable Arrow IPC files",
+    )
+    _add_data_dir_argument(export_parser)
+    export_parser.add_argument(
+        "datasets",
+        nargs="*",
+        type=_partitioned_dataset,
+        metavar="DATASET",
+        help=f"Datasets to export (default: all): {', '.join(partitioned.DATASETS)}",
+    )
+
+    snapshot_parser = subparsers.add_parser(
+        "snapshot",
+        help="Move the stored CSVs into the deduplicated object store",
+    )
+    _add_data_dir_argument(snapshot_parser)
+
+    gc_parser = subparsers.add_parser(
+        "gc", help="Remove or compress superseded versions of the stored files"
+    )
+    _add_data_dir_argument(gc_parser)
+    gc_parser.add_argument(
+        "--keep-last",
+        type=int,
+        default=None,
+        help="Keep the N most recent versions of each file",
+    )
+    gc_parser.add_argument(
+        "--max-age",
+        type=float,
+        default=None,
+        metavar="DAYS",
+        help="Keep the versions newer than DAYS days",
+    )
+    gc_parser.add_argument(
+        "--compress",
+        action="store_true",
+        default=False,
+        help="Compress the retained old versions with zstd",
+    )
+    gc_parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of compression processes (default: number of CPUs)",
+    )
+    gc_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="Only list what would be removed or compressed",
+    )
     return parser
 
 
+def _partitioned_dataset(value: str) -> str:
+    # Validated here rather than with `choices`, which rejects an empty list
+    if value not in partitioned.DATASETS:
+        raise argparse.ArgumentTypeError(
+            f"invalid dataset {value!r} (choose from {', '.join(partitioned.DATASETS)})"
+        )
+    return value
+
+
+def _add_data_dir_argument(subparser: argparse.ArgumentParser):
+    # SUPPRESS keeps the value given before the command (`tddata -o DIR verify`)
+    # unless the option is repeated after it
+    subparser.add_argument(
+        "-o",
+        "--output",
+        "--data-dir",
+        dest="output",
+        default=argparse.SUPPRESS,
+        type=Path,
+    )
+
+
+def verify(args) -> int:
+    results = integrity.verify_store(args.output, workers=args.workers)
+    counts = {"ok": 0, "mismatch": 0, "no-digest": 0}
+    for result in results:
+        counts[result["status"]] += 1
+        if result["status"] == "mismatch":
+            print(f"MISMATCH {result['path']}")
+        elif args.verbose and result["status"] == "no-digest":
+            print(f"NO DIGEST {result['path']}")
+    print(
+        f"Verified {len(results)} files: {counts['ok']} ok, "
+        f"{counts['mismatch']} corrupted, {counts['no-digest']} without digest"
+    )
+    return 1 if counts["mismatch"] else 0
+
+
+def reindex(args) -> int:
+    with catalog.Catalog(args.output) as store_catalog:
+        store_catalog.rebuild()
+        print(f"Indexed {len(store_catalog)} files")
+    return 0
+
+
+def gc(args) -> int:
+    report = storage.compact(
+        args.output,
+        keep_last=args.keep_last,
+        max_age_days=args.max_age,
+        compress=args.compress,
+        workers=args.workers,
+        dry_run=args.dry_run,
+    )
+    for action, done in (("delete", "Deleted"), ("compress", "Compressed")):
+        entries = [entry for entry in report if entry["action"] == action]
+        for entry in entries:
+            if args.verbose or args.dry_run:
+                print(f"{action.upper()} {entry['path']}")
+        if entries:
+            size = sum(entry["size"] for entry in entries)
+            verb = f"Would {action}" if args.dry_run else done
+            print(f"{verb} {len(entries)} files ({size / 1e6:.1f} MB)")
+    return 0
+
+
+def partition(args) -> int:
+    for dataset in args.datasets or partitioned.DATASETS:
+        root = partitioned.build_dataset(args.output, dataset)
+        if root is None:
+            print(f"No {dataset} files in {args.output}")
+        else:
+            print(f"Wrote {root}")
+    return 0
+
+
+def export(args) -> int:
+    for dataset in args.datasets or partitioned.DATASETS:
+        path = ipc.export_dataset(args.output, dataset)
+        if path is None:
+            print(f"No {dataset} files in {args.output}")
+        else:
+            print(f"Wrote {path}")
+    return 0
+
+
+def snapshot(args) -> int:
+    refs = snapshots.snapshot_store(args.output)
+    with catalog.Catalog(args.output) as store_catalog:
+        store_catalog.rebuild()
+    print(f"Snapshotted {len(refs)} files")
+    return 0
+
+
+def print_transfer_stats(results):
+    for result in results:
+        if "duration" not in result:
+            continue
+        print(
+            f"{result['filename']}: {result['bytes_transferred'] / 1e6:.1f} MB "
+            f"in {result['duration']:.2f}s "
+            f"(TTFB {result['ttfb'] * 1000:.0f} ms, "
+            f"{result['bytes_per_second'] / 1e6:.2f} MB/s)"
+        )
+
+
 def main():
     parser = set_parser()
     args = parser.parse_args()
 
+    if args.command == "verify":
+        return verify(args)
+    if args.command == "reindex":
+        return reindex(args)
+    if args.command == "partition":
+        return partition(args)
+    if args.command == "export":
+        return export(args)
+    if args.command == "snapshot":
+        return snapshot(args)
+    if args.command == "gc":
+        return gc(args)
+
     dataset_map = {
         "prices": DATASET_PRICES_RATES,
         "operations": DATASET_OPERATIONS,
@@ -69,8 +389,48 @@ def main():
         "sales": DATASET_SALES,
     }
 
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
     if args.dataset == "all":
-        for dataset_id in dataset_map.values():
-            downloader.download(args.output, dataset_id=dataset_id)
+        dataset_ids = list(dataset_map.values())
     else:
-        downloader.download(args.output, dataset_id=dataset_map[args.dataset])
+        dataset_ids = [dataset_map[args.dataset]]
+
+    http_session = session.Session(
+        max_connections=args.jobs,
+        max_keepalive_connections=args.jobs,
+        timeout=args.timeout,
+        http2=args.http2,
+        api_url=args.api_url,
+    )
+    download_scheduler = scheduler.Scheduler(
+        rate=args.rate,
+        max_attempts=args.max_attempts,
+        retry_budget=args.retry_budget,
+    )
+
+    async def run_downloads():
+        # Closes the pooled clients in the loop the async one is bound to
+        async with http_session:
+            return await downloader.download_async(
+                args.output,
+                dataset_ids,
+                jobs=args.jobs,
+                session=http_session,
+                metadata_max_age=args.metadata_max_age,
+                scheduler=download_scheduler,
+                output_format=args.output_format,
+                years=args.years,
+                resource_globs=args.resource_globs,
+                dedup=args.dedup,
+                compression_method=args.compression,
+            )
+
+    results = asyncio.run(run_downloads())
+    if args.verbose:
+        print_transfer_stats(results)
+    if download_scheduler.failures:
+        print(download_scheduler.report())
+        return 1
+    return 0
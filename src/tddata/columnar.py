@@ -0,0 +1,82 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Helpers to write and read columnar (Apache Arrow / Parquet) files.
+
+These helpers need the optional `pyarrow` package
+(`pip install "tddata[parquet]"`).
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pa_csv = None
+    ds = None
+    pq = None
+
+
+def require_pyarrow():
+    """Raise an informative error if `pyarrow` is not installed."""
+    if pa is None:
+        raise ImportError(
+            "The 'pyarrow' package is required for Parquet/Arrow support: "
+            'pip install "tddata[parquet]"'
+        )
+
+
+class ParquetPartsWriter:
+    """Write a stream of DataFrames as the numbered parts of a Parquet dataset.
+
+    Each DataFrame becomes one file, `part-00000.parquet`,
+    `part-00001.parquet`, ..., inside `directory`. The Arrow schema of the
+    first DataFrame is used for all parts, so the directory can be read back
+    as a single dataset (e.g. `pd.read_parquet(directory)`).
+
+    Args:
+        directory: The directory receiving the parts. It is created if needed.
+        compression: The Parquet compression codec.
+    """
+
+    def __init__(self, directory: Path, compression: str = "zstd"):
+        require_pyarrow()
+        self.directory = directory
+        self.compression = compression
+        self.schema: Optional["pa.Schema"] = None
+        self.parts = 0
+        self.rows = 0
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, df: pd.DataFrame):
+        """Write a DataFrame as the next part."""
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self.schema is None:
+            self.schema = table.schema
+        pq.write_table(
+            table,
+            self.directory / f"part-{self.parts:05d}.parquet",
+            compression=self.compression,
+        )
+        self.parts += 1
+        self.rows += len(df)
@@ -0,0 +1,118 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Compression of stored data files.
+
+The raw CSVs compress around 10x. Compressed files keep their name, plus a
+`.zst` or `.gz` suffix, and are read transparently, also in chunks: pandas
+infers the compression from the suffix. The downloader compresses files
+while they stream (see `open_writer`), and `storage.compact` compresses old
+versions. Zstandard needs the optional `zstandard` package
+(`pip install "tddata[zstd]"`); gzip is in the standard library.
+"""
+
+import gzip
+import os
+from pathlib import Path
+from typing import Optional
+
+from . import integrity
+from .storage import GZIP_SUFFIX, ZSTD_SUFFIX
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Suffix of the files written with each compression method
+COMPRESSIONS = {"zstd": ZSTD_SUFFIX, "gzip": GZIP_SUFFIX}
+
+DEFAULT_ZSTD_LEVEL = 10
+# Fast enough to keep up with the network while streaming
+DEFAULT_STREAMING_ZSTD_LEVEL = 3
+DEFAULT_GZIP_LEVEL = 6
+
+
+def require_zstandard():
+    """Raise an informative error if `zstandard` is not installed."""
+    if zstandard is None:
+        raise ImportError(
+            "The 'zstandard' package is required for Zstandard compression: "
+            'pip install "tddata[zstd]"'
+        )
+
+
+def compress_file(filepath: Path, level: int = DEFAULT_ZSTD_LEVEL) -> Path:
+    """Replace a file with its Zstandard-compressed version.
+
+    The compressed file is written next to the original, with its digest
+    sidecar, and the original is removed only once it is complete. The
+    modification time is preserved.
+
+    Args:
+        filepath: The file to compress.
+        level: The Zstandard compression level.
+
+    Returns:
+        Path: The path of the compressed file, `<filepath>.zst`.
+    """
+    require_zstandard()
+    dest = filepath.with_name(filepath.name + ZSTD_SUFFIX)
+    tmp_path = dest.with_name(dest.name + ".tmp")
+    compressor = zstandard.ZstdCompressor(level=level)
+    with open(filepath, "rb") as src, open(tmp_path, "wb") as dst:
+        compressor.copy_stream(src, dst, read_size=integrity.CHUNK_SIZE)
+    stat = filepath.stat()
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp_path, dest)
+
+    integrity.write_digest(dest, integrity.hash_file(dest))
+    for algorithm in integrity.HASH_ALGORITHMS:
+        integrity.get_digest_path(filepath, algorithm).unlink(missing_ok=True)
+    filepath.unlink()
+    return dest
+
+
+def open_writer(fileobj, method: str, level: Optional[int] = None):
+    """Wrap a binary file so the bytes written to it are compressed.
+
+    Closing the returned writer finishes the compressed stream but leaves
+    `fileobj` open.
+
+    Args:
+        fileobj: The binary file receiving the compressed bytes.
+        method: "zstd" or "gzip".
+        level: The compression level. Defaults to a fast level.
+
+    Returns:
+        A writable binary stream.
+    """
+    if method == "zstd":
+        require_zstandard()
+        if level is None:
+            level = DEFAULT_STREAMING_ZSTD_LEVEL
+        compressor = zstandard.ZstdCompressor(level=level)
+        return compressor.stream_writer(fileobj, closefd=False)
+    if method == "gzip":
+        if level is None:
+            level = DEFAULT_GZIP_LEVEL
+        # A fixed mtime keeps the output, and so its digest, reproducible
+        return gzip.GzipFile(
+            fileobj=fileobj, mode="wb", compresslevel=level, mtime=0
+        )
+    raise ValueError(
+        f"Unknown compression {method!r}, expected one of {list(COMPRESSIONS)}"
+    )
@@ -15,6 +15,8 @@
 
 
 import enum
+import os
+from typing import NamedTuple, Optional, Type
 
 
 # Columns' names are defined in the constants.py file, which is imported by the
@@ -62,6 +64,7 @@ class Column(enum.Enum):
 
     # Common / Others
     BUYBACK_DATE = "buyback_date"
+    REDEMPTION_DATE = "redemption_date"
     VALUE = "value"
     SALE_DATE = "sale_date"
     UNIT_PRICE = "unit_price"
@@ -186,7 +189,11 @@ class TradedLast12Months(enum.Enum):
         }
 
 
-CKAN_API_URL = "https://www.tesourotransparente.gov.br/ckan/api/3/action/package_show"
+DEFAULT_CKAN_API_URL = (
+    "https://www.tesourotransparente.gov.br/ckan/api/3/action/package_show"
+)
+# The CKAN endpoint can be overridden, e.g. to point at a local stand-in
+CKAN_API_URL = os.environ.get("TDDATA_CKAN_API_URL", DEFAULT_CKAN_API_URL)
 
 DATASET_PRICES_RATES = "taxas-dos-titulos-ofertados-pelo-tesouro-direto"
 DATASET_OPERATIONS = "operacoes-do-tesouro-direto"
@@ -206,22 +213,22 @@ HTTP_HEADERS = {
 
 
 # Bond type name normalization mapping
-# Maps various bond type names found in datasets to standardized names
+# Maps various bond type names found in datasets to standardized names, the
+# values of `BondType`
 BOND_TYPE_NORMALIZATION = {
     # Legacy code
-    "NTN-B1": "Tesouro RendA+",
-    # Case variations
-    "Tesouro Renda+ Aposentadoria Extra": "Tesouro RendA+",
-    "Tesouro Educa+": "Tesouro EducA+",
+    "NTN-B1": BondType.RENDA.value,
+    # Short and case variations
+    "Tesouro RendA+": BondType.RENDA.value,
+    "Tesouro Renda+ Aposentadoria Extra": BondType.RENDA.value,
+    "Tesouro Educa+": BondType.EDUCA.value,
     # Already standardized (identity mapping for completeness)
-    "Tesouro Selic": "Tesouro Selic",
-    "Tesouro Prefixado": "Tesouro Prefixado",
-    "Tesouro Prefixado com Juros Semestrais": "Tesouro Prefixado com Juros Semestrais",
-    "Tesouro IPCA+": "Tesouro IPCA+",
-    "Tesouro IPCA+ com Juros Semestrais": "Tesouro IPCA+ com Juros Semestrais",
-    "Tesouro IGPM+ com Juros Semestrais": "Tesouro IGPM+ com Juros Semestrais",
-    "Tesouro RendA+": "Tesouro RendA+",
-    "Tesouro EducA+": "Tesouro EducA+",
+    **{bond_type.value: bond_type.value for bond_type in BondType},
+}
+
+# The same mapping keyed by lowercase names, for case-insensitive matches
+_BOND_TYPE_NORMALIZATION_LOWER = {
+    key.lower(): value for key, value in BOND_TYPE_NORMALIZATION.items()
 }
 
 
@@ -243,9 +250,130 @@ def normalize_bond_type(bond_type_name: str) -> str | None:
         return BOND_TYPE_NORMALIZATION[bond_type_name]
 
     # Try case-insensitive match
-    for key, value in BOND_TYPE_NORMALIZATION.items():
-        if key.lower() == bond_type_name.lower():
-            return value
+    lowered = bond_type_name.lower()
+    if lowered in _BOND_TYPE_NORMALIZATION_LOWER:
+        return _BOND_TYPE_NORMALIZATION_LOWER[lowered]
 
     # Return original if no mapping found (with warning potential)
     return bond_type_name
+
+
+# Formats of the dates in the source files
+DATE_FORMAT = "%d/%m/%Y"
+MONTH_FORMAT = "%m/%Y"
+
+
+class SourceColumn(NamedTuple):
+    """A column of a dataset's source files, and how the readers parse it.
+
+    Attributes:
+        source: The column's name in the CSV files.
+        column: The standardized column it becomes.
+        dtype: "str", "int", "float" (with "," as decimal point) or "date".
+        date_format: The format of a "date" column.
+        domain: The enum of the column's valid values. Bond types are
+            normalized with `normalize_bond_type` into a categorical; values
+            outside any other domain become missing.
+        compact_dtype: The narrower type of an "int" column in the readers'
+            compact mode, wide enough for any of its values.
+    """
+
+    source: str
+    column: Column
+    dtype: str
+    date_format: Optional[str] = None
+    domain: Optional[Type[enum.Enum]] = None
+    compact_dtype: Optional[str] = None
+
+
+_BOND_TYPE = SourceColumn("Tipo Titulo", Column.BOND_TYPE, "str", domain=BondType)
+_MATURITY_DATE = SourceColumn(
+    "Vencimento do Titulo", Column.MATURITY_DATE, "date", DATE_FORMAT
+)
+
+# Maturities and interest coupon payments share the same layout
+_REDEMPTIONS = (
+    _BOND_TYPE,
+    _MATURITY_DATE,
+    SourceColumn("Data Resgate", Column.REDEMPTION_DATE, "date", DATE_FORMAT),
+    SourceColumn("PU", Column.UNIT_PRICE, "float"),
+    SourceColumn("Quantidade", Column.QUANTITY, "float"),
+    SourceColumn("Valor", Column.VALUE, "float"),
+)
+
+# Columns of each dataset's source files, in the files' order. The readers
+# are compiled from these (see `reader.compile_schema`), so a new dataset
+# only needs its entry here and a `reader.read_*` function.
+DATASET_SCHEMAS = {
+    "prices": (
+        _BOND_TYPE,
+        SourceColumn("Data Vencimento", Column.MATURITY_DATE, "date", DATE_FORMAT),
+        SourceColumn("Data Base", Column.REFERENCE_DATE, "date", DATE_FORMAT),
+        SourceColumn("Taxa Compra Manha", Column.BUY_YIELD, "float"),
+        SourceColumn("Taxa Venda Manha", Column.SELL_YIELD, "float"),
+        SourceColumn("PU Compra Manha", Column.BUY_PRICE, "float"),
+        SourceColumn("PU Venda Manha", Column.SELL_PRICE, "float"),
+        SourceColumn("PU Base Manha", Column.BASE_PRICE, "float"),
+    ),
+    "stock": (
+        _BOND_TYPE,
+        _MATURITY_DATE,
+        SourceColumn("Mes Estoque", Column.STOCK_MONTH, "date", MONTH_FORMAT),
+        SourceColumn("PU", Column.UNIT_PRICE, "float"),
+        SourceColumn("Quantidade", Column.QUANTITY, "float"),
+        SourceColumn("Valor Estoque", Column.STOCK_VALUE, "float"),
+    ),
+    "investors": (
+        SourceColumn(
+            "Codigo do Investidor", Column.INVESTOR_ID, "int", compact_dtype="Int32"
+        ),
+        SourceColumn("Data de Adesao", Column.JOIN_DATE, "date", DATE_FORMAT),
+        # Kept as is, the names are already descriptive
+        SourceColumn("Estado Civil", Column.MARITAL_STATUS, "str"),
+        SourceColumn("Genero", Column.GENDER, "str", domain=Gender),
+        SourceColumn("Profissao", Column.PROFESSION, "str"),
+        SourceColumn("Idade", Column.AGE, "int", compact_dtype="Int16"),
+        SourceColumn("UF do Investidor", Column.STATE, "str"),
+        SourceColumn("Cidade do Investidor", Column.CITY, "str"),
+        SourceColumn("Pais do Investidor", Column.COUNTRY, "str"),
+        SourceColumn(
+            "Situacao da Conta", Column.ACCOUNT_STATUS, "str", domain=AccountStatus
+        ),
+        SourceColumn(
+            "Operou 12 Meses",
+            Column.TRADED_LAST_12_MONTHS,
+            "str",
+            domain=TradedLast12Months,
+        ),
+    ),
+    "operations": (
+        SourceColumn(
+            "Codigo do Investidor", Column.INVESTOR_ID, "int", compact_dtype="Int32"
+        ),
+        SourceColumn("Data da Operacao", Column.OPERATION_DATE, "date", DATE_FORMAT),
+        _BOND_TYPE,
+        _MATURITY_DATE,
+        SourceColumn("Quantidade", Column.QUANTITY, "float"),
+        SourceColumn("Valor do Titulo", Column.BOND_VALUE, "float"),
+        SourceColumn("Valor da Operacao", Column.OPERATION_VALUE, "float"),
+        SourceColumn("Tipo da Operacao", Column.OPERATION_TYPE, "str"),
+        SourceColumn("Canal da Operacao", Column.CHANNEL, "str", domain=Channel),
+    ),
+    "sales": (
+        _BOND_TYPE,
+        _MATURITY_DATE,
+        SourceColumn("Data Venda", Column.SALE_DATE, "date", DATE_FORMAT),
+        SourceColumn("PU", Column.UNIT_PRICE, "float"),
+        SourceColumn("Quantidade", Column.QUANTITY, "float"),
+        SourceColumn("Valor", Column.VALUE, "float"),
+    ),
+    "buybacks": (
+        _BOND_TYPE,
+        _MATURITY_DATE,
+        SourceColumn("Data Resgate", Column.BUYBACK_DATE, "date", DATE_FORMAT),
+        SourceColumn("Quantidade", Column.QUANTITY, "float"),
+        SourceColumn("Valor", Column.VALUE, "float"),
+    ),
+    "maturities": _REDEMPTIONS,
+    "interest_coupons": _REDEMPTIONS,
+}
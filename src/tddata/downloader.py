@@ -16,93 +16,886 @@
 
 """Functions to download Tesouro Direto's historical data"""
 
+import asyncio
+import concurrent.futures
+import contextlib
+import fnmatch
+import io
+import os
+import queue
+import re
+import shutil
+import time
 from pathlib import Path
-from typing import Dict, List
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 import httpx
 from tqdm import tqdm
 
+from . import columnar, compression, integrity, snapshots
+from .catalog import Catalog
 from .constants import CKAN_API_URL, HTTP_HEADERS
-from .storage import generate_filename
+from .manifest import Manifest
+from .reader import get_reader
+from .scheduler import RetryableError, Scheduler
+from .session import Session
+from .storage import (
+    REF_SUFFIX,
+    extract_year,
+    generate_filename,
+    get_partial_path,
+    parse_filename,
+    slugify,
+)
 
+DEFAULT_JOBS = 4
+
+# Bytes are written through a large buffer, so each network chunk does not
+# cost a write syscall, and the progress bar is refreshed at most every
+# PROGRESS_UPDATE_BYTES
+WRITE_BUFFER_SIZE = 1024 * 1024
+PROGRESS_UPDATE_BYTES = 1024 * 1024
+PROGRESS_MIN_INTERVAL = 0.5
+
+OUTPUT_FORMATS = ("csv", "parquet")
+DEFAULT_ROWS_PER_PART = 1_000_000
+
+# Chunks buffered between the download loop and the Parquet conversion
+PIPE_MAX_CHUNKS = 64
+PIPE_POLL_INTERVAL = 0.01
+
+T = TypeVar("T")
+
+
+def get_dataset_resources(
+    dataset_id: str, session: Optional[Session] = None
+) -> List[Dict]:
+    """Fetch resources metadata from CKAN dataset
+
+    Args:
+        dataset_id: The CKAN dataset ID or name.
+        session: An optional `Session` whose connection pool is reused. If
+            not provided, a short-lived session is used.
+    """
+    if session is None:
+        with Session() as session:
+            return get_dataset_resources(dataset_id, session=session)
 
-def get_dataset_resources(dataset_id: str) -> List[Dict]:
-    """Fetch resources metadata from CKAN dataset"""
     params = {"id": dataset_id}
-    response = httpx.get(CKAN_API_URL, params=params, headers=HTTP_HEADERS)
+    response = session.client.get(
+        session.api_url, params=params, headers=HTTP_HEADERS
+    )
     response.raise_for_status()
-    data = response.json()
-    if not data["success"]:
-        raise ValueError(f"CKAN API failed: {data.get('error')}")
-    return data["result"]["resources"]
+    return _parse_package_show(response.json())
 
 
-def download(dest_dir: Path, dataset_id: str) -> List[Dict]:
-    """Download data files
+async def get_dataset_resources_async(
+    client: httpx.AsyncClient, dataset_id: str, api_url: str = CKAN_API_URL
+) -> List[Dict]:
+    """Fetch resources metadata from CKAN dataset using an async client"""
+    params = {"id": dataset_id}
+    response = await client.get(api_url, params=params, headers=HTTP_HEADERS)
+    response.raise_for_status()
+    return _parse_package_show(response.json())
+
+
+def parse_years(spec: str) -> Set[int]:
+    """Parse a years specification such as "2024", "2023-2025" or "2020,2022-2023"
 
     Args:
-        dest_dir: The directory path to save the file
-        dataset_id: The CKAN dataset ID or name.
+        spec: Comma-separated years or inclusive year ranges.
 
     Returns:
-        List[Dict]: metadata for logging and analysis of downloaded files
+        Set[int]: The selected years.
     """
+    years = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        try:
+            first, last = int(start), int(end or start)
+        except ValueError:
+            raise ValueError(f"Invalid years specification: {spec!r}") from None
+        if first > last:
+            raise ValueError(f"Invalid years range: {part!r}")
+        years.update(range(first, last + 1))
+    return years
 
-    dest_dir.mkdir(parents=True, exist_ok=True)
 
-    resources = get_dataset_resources(dataset_id)
-    downloaded_files = []
+def filter_resources(
+    resources: List[Dict],
+    years: Optional[Iterable[int]] = None,
+    resource_globs: Optional[Iterable[str]] = None,
+) -> List[Dict]:
+    """Select the resources to download
+
+    Args:
+        resources: CKAN resources metadata.
+        years: If given, yearly resources (those with a year in their name)
+            are kept only for these years. Resources without a year, such as
+            the prices or stock files covering the whole history, are kept.
+        resource_globs: If given, keep only resources whose name or slugified
+            name matches one of these shell-style patterns (case-insensitive),
+            e.g. "operacoes-*-2025".
+
+    Returns:
+        List[Dict]: The selected resources.
+    """
+    years = set(years) if years is not None else None
+    resource_globs = [g.lower() for g in resource_globs or []]
 
+    selected = []
     for resource in resources:
-        # Filter for CSV files only
-        if resource.get("format", "").upper() != "CSV":
+        name = resource.get("name", "")
+        if years is not None:
+            year = extract_year(name)
+            if year is not None and year not in years:
+                continue
+        if resource_globs and not any(
+            fnmatch.fnmatchcase(name.lower(), pattern)
+            or fnmatch.fnmatchcase(slugify(name), pattern)
+            for pattern in resource_globs
+        ):
             continue
+        selected.append(resource)
+    return selected
+
 
+def _parse_package_show(data: Dict) -> List[Dict]:
+    if not data["success"]:
+        raise ValueError(f"CKAN API failed: {data.get('error')}")
+    return data["result"]["resources"]
+
+
+class _SyncRun:
+    """State shared by all downloads of a single `download_async` call"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        api_url: str,
+        dest_dir: Path,
+        jobs: int,
+        manifest: Manifest,
+        catalog: Catalog,
+        metadata_max_age: float,
+        scheduler: Scheduler,
+        chunk_size: Optional[int],
+        output_format: str,
+        rows_per_part: int,
+        years: Optional[Iterable[int]],
+        resource_globs: Optional[Iterable[str]],
+        dedup: bool,
+        compression_method: Optional[str],
+    ):
+        self.client = client
+        self.api_url = api_url
+        self.dest_dir = dest_dir
+        self.manifest = manifest
+        self.catalog = catalog
+        self.metadata_max_age = metadata_max_age
+        self.scheduler = scheduler
+        self.chunk_size = chunk_size
+        self.output_format = output_format
+        self.rows_per_part = rows_per_part
+        self.years = years
+        self.resource_globs = resource_globs
+        self.dedup = dedup
+        self.compression_method = compression_method
+
+        # Pool of download slots bounding the requests in flight. The slot
+        # number doubles as the progress bar line, so concurrent downloads
+        # each get their own bar
+        self.slots: asyncio.Queue = asyncio.Queue()
+        for position in range(jobs):
+            self.slots.put_nowait(position)
+
+    async def _in_slot(self, request: Callable[[int], Awaitable[T]]) -> T:
+        """Wait for a free download slot and run `request` in it"""
+        position = await self.slots.get()
+        try:
+            return await request(position)
+        finally:
+            self.slots.put_nowait(position)
+
+    async def download_dataset(self, dataset_id: str) -> List[Dict]:
+        resources = self.manifest.get_dataset_resources(
+            dataset_id, self.metadata_max_age
+        )
+        if resources is None:
+            try:
+                resources = await self.scheduler.call(
+                    self.api_url,
+                    lambda: self._in_slot(
+                        lambda _: get_dataset_resources_async(
+                            self.client, dataset_id, api_url=self.api_url
+                        )
+                    ),
+                )
+            except Exception as e:
+                tqdm.write(f"Failed to fetch metadata of {dataset_id}: {e}")
+                self.scheduler.record_failure(self.api_url, e, dataset_id=dataset_id)
+                return []
+            self.manifest.set_dataset_resources(dataset_id, resources)
+
+        # Filter for CSV files only
+        resources = [r for r in resources if r.get("format", "").upper() == "CSV"]
+        resources = filter_resources(resources, self.years, self.resource_globs)
+        results = await asyncio.gather(
+            *(self.download_resource(r, dataset_id) for r in resources)
+        )
+        return [r for r in results if r is not None]
+
+    async def download_resource(
+        self, resource: Dict, dataset_id: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Sync a single CSV resource, retrying transient failures"""
         url = resource["url"]
-        last_modified_str = resource.get("last_modified") or resource.get("created")
 
-        filename = generate_filename(resource["name"], last_modified_str)
-        dest_filepath = dest_dir / filename
+        read = None
+        extension = ".csv"
+        if self.compression_method is not None:
+            extension += compression.COMPRESSIONS[self.compression_method]
+        if self.output_format == "parquet":
+            read = get_reader(resource["name"])
+            if read is None:
+                tqdm.write(f"No reader for {resource['name']}, keeping it as CSV")
+            else:
+                extension = ".parquet"
 
-        # Check if file exists
+        # Nothing changed in CKAN since the last sync: no request at all
+        entry = self.manifest.get_resource(resource)
+        unchanged = self.manifest.is_unchanged(resource)
+        if unchanged and _is_stored_as(entry, extension):
+            return self._result(resource, self.dest_dir / entry["path"], "unchanged")
+
+        last_modified_str = resource.get("last_modified") or resource.get("created")
+        dest_filepath = self.dest_dir / generate_filename(
+            resource["name"], last_modified_str, extension=extension
+        )
+
+        # Check if file exists, as is or as a snapshot reference
+        ref_filepath = snapshots.get_ref_path(dest_filepath)
+        if ref_filepath.exists():
+            dest_filepath = ref_filepath
         if dest_filepath.exists():
-            print("File already exists:", dest_filepath)
-            downloaded_files.append({
-                "url": url,
-                "filename": filename,
-                "destination": dest_filepath,
-                "file_size": resource.get("size"),
-            })
-            continue
+            tqdm.write(f"File already exists: {dest_filepath}")
+            entry = self.manifest.get_resource(resource) or {}
+            if snapshots.is_ref(dest_filepath):
+                digest = snapshots.read_ref(dest_filepath)["digest"]
+            else:
+                recorded = integrity.read_digest(dest_filepath)
+                digest = ":".join(recorded) if recorded else entry.get("digest")
+            self.manifest.set_resource(
+                resource,
+                dest_filepath,
+                etag=entry.get("etag"),
+                http_last_modified=entry.get("http_last_modified"),
+                digest=digest,
+            )
+            self.catalog.add(dest_filepath, dataset=dataset_id, digest=digest)
+            return self._result(resource, dest_filepath, "exists")
 
-        # Download
-        print(f"Downloading {filename}...")
+        # The partial file is kept between attempts, so each retry resumes
+        # from where the previous one stopped
         try:
-            with httpx.stream("GET", url, headers=HTTP_HEADERS, timeout=30.0) as r:
-                r.raise_for_status()
-
-                # Try to get size from header or resource metadata
-                total_size = int(r.headers.get("Content-Length", 0))
-                if total_size == 0 and resource.get("size"):
-                     total_size = int(resource["size"])
-
-                progressbar = tqdm(total=total_size, unit="B", unit_scale=True)
-                with open(dest_filepath, "wb") as f:
-                    for chunk in r.iter_bytes(1024):
-                        f.write(chunk)
-                        progressbar.update(len(chunk))
-                progressbar.close()
-
-            downloaded_files.append({
-                "url": url,
-                "filename": filename,
-                "destination": dest_filepath,
-                "file_size": total_size,
-            })
+            result = await self.scheduler.call(
+                url,
+                lambda: self._in_slot(
+                    lambda position: self._fetch_resource(
+                        resource, dest_filepath, position, read
+                    )
+                ),
+            )
         except Exception as e:
-            print(f"Failed to download {url}: {e}")
-            # Clean up partial file
-            if dest_filepath.exists():
-                dest_filepath.unlink()
+            tqdm.write(f"Failed to download {url}: {e}")
+            self.scheduler.record_failure(
+                url, e, name=resource.get("name"), destination=dest_filepath
+            )
+            return None
+
+        if result["status"] == "downloaded" and self.dedup and read is None:
+            result["destination"] = await asyncio.to_thread(
+                snapshots.snapshot_file, dest_filepath
+            )
+            result["filename"] = result["destination"].name
+            # Same resource and validators, now pointing at the reference
+            entry = self.manifest.get_resource(resource)
+            self.manifest.set_resource(
+                resource,
+                result["destination"],
+                etag=entry.get("etag"),
+                http_last_modified=entry.get("http_last_modified"),
+                digest=entry.get("digest"),
+            )
+            dest_filepath = result["destination"]
+        if result["status"] == "downloaded":
+            self.catalog.add(
+                dest_filepath,
+                dataset=dataset_id,
+                size=result["file_size"] if read is None else None,
+                digest=result["digest"],
+            )
+        return result
+
+    async def _fetch_resource(
+        self,
+        resource: Dict,
+        dest_filepath: Path,
+        position: int,
+        read: Optional[Callable] = None,
+    ) -> Dict:
+        """Fetch a resource unless the server reports it as not modified
+
+        If `read` is given, the CSV body is converted to Parquet with it while
+        streaming, instead of being saved.
+        """
+        tqdm.write(f"Downloading {dest_filepath.name}...")
+        headers = dict(HTTP_HEADERS)
+        entry = self.manifest.get_resource(resource)
+        part_filepath = get_partial_path(dest_filepath)
+        offset = 0
+        if read is not None:
+            # A conversion cannot resume midway: start over
+            if part_filepath.exists():
+                shutil.rmtree(part_filepath)
+        elif self.compression_method is not None:
+            # Neither can a compressed stream
+            part_filepath.unlink(missing_ok=True)
+        elif part_filepath.exists():
+            offset = part_filepath.stat().st_size
+
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        elif (
+            entry is not None
+            and _is_stored_as(entry, parse_filename(dest_filepath.name)[2])
+            and (self.dest_dir / entry["path"]).exists()
+        ):
+            # CKAN metadata changed, but the file itself may not have. A file
+            # in another format must be fetched again whatever the server says
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("http_last_modified"):
+                headers["If-Modified-Since"] = entry["http_last_modified"]
+
+        started = time.perf_counter()
+        async with self.client.stream("GET", resource["url"], headers=headers) as r:
+            ttfb = time.perf_counter() - started
+            if r.status_code == 304:
+                existing_filepath = self.dest_dir / entry["path"]
+                tqdm.write(f"Not modified: {existing_filepath}")
+                self.manifest.set_resource(
+                    resource,
+                    existing_filepath,
+                    etag=r.headers.get("ETag", entry.get("etag")),
+                    http_last_modified=entry.get("http_last_modified"),
+                    digest=entry.get("digest"),
+                )
+                result = self._result(resource, existing_filepath, "not-modified")
+                result.update(_transfer_stats(0, ttfb, time.perf_counter() - started))
+                return result
+
+            if read is not None:
+                file_size, digest, transferred = await _stream_to_parquet(
+                    r,
+                    dest_filepath,
+                    part_filepath,
+                    resource,
+                    position,
+                    self.chunk_size,
+                    read,
+                    self.rows_per_part,
+                )
+            else:
+                file_size, digest, transferred = await _stream_to_file(
+                    r,
+                    dest_filepath,
+                    part_filepath,
+                    offset,
+                    resource,
+                    position,
+                    self.chunk_size,
+                    self.compression_method,
+                )
+            self.manifest.set_resource(
+                resource,
+                dest_filepath,
+                etag=r.headers.get("ETag"),
+                http_last_modified=r.headers.get("Last-Modified"),
+                digest=digest,
+            )
+        result = self._result(resource, dest_filepath, "downloaded", file_size)
+        result["digest"] = digest
+        result.update(
+            _transfer_stats(transferred, ttfb, time.perf_counter() - started)
+        )
+        return result
+
+    @staticmethod
+    def _result(
+        resource: Dict,
+        dest_filepath: Path,
+        status: str,
+        file_size: Optional[int] = None,
+    ) -> Dict:
+        return {
+            "url": resource["url"],
+            "filename": dest_filepath.name,
+            "destination": dest_filepath,
+            "file_size": file_size if file_size is not None else resource.get("size"),
+            "status": status,
+        }
+
+
+async def _stream_to_file(
+    r: httpx.Response,
+    dest_filepath: Path,
+    part_filepath: Path,
+    offset: int,
+    resource: Dict,
+    position: int,
+    chunk_size: Optional[int] = None,
+    compression_method: Optional[str] = None,
+) -> Tuple[int, str, int]:
+    """Stream a response into a partial file and publish it as `dest_filepath`
+
+    Bytes are staged in `part_filepath`. If a partial file is left by a
+    previous attempt, the request resumes from its end (`offset`) with an
+    HTTP Range header; servers that ignore the Range header send the whole
+    body again, which then overwrites the partial file. Only a complete
+    transfer is atomically renamed to `dest_filepath`.
+
+    With a `compression_method` ("zstd" or "gzip", see `tddata.compression`),
+    the content is compressed as it streams; such downloads cannot resume.
+
+    The stored bytes are hashed as they are written and the digest is written
+    next to the published file (see `tddata.integrity`).
+
+    By default the body is consumed in the chunks the network delivers them
+    (`chunk_size=None`), which avoids re-chunking copies; a fixed
+    `chunk_size` can be given instead.
+
+    Returns:
+        Tuple[int, str, int]: The size of the downloaded file in bytes, its
+            digest, prefixed by the hash algorithm (e.g. `sha256:...`), and
+            the number of bytes transferred by this request.
+    """
+    hasher = integrity.new_hasher()
+    if r.status_code == 416:
+        # Range not satisfiable: the partial file may already hold the
+        # whole content, otherwise it is stale and is discarded
+        if _content_range_total(r) == offset:
+            digest = integrity.hash_file(part_filepath, hasher=hasher)
+            return offset, _publish(part_filepath, dest_filepath, digest), 0
+        part_filepath.unlink()
+        raise RetryableError("Partial file does not match remote content, discarded")
+    r.raise_for_status()
 
-    return downloaded_files
+    if r.status_code == 206:
+        start = _content_range_start(r)
+        if start != offset:
+            part_filepath.unlink()
+            raise RetryableError(
+                f"Server resumed at byte {start}, expected {offset}; "
+                "partial file discarded"
+            )
+        mode = "ab"
+        # Only the bytes received so far are read back, to resume the hash
+        integrity.hash_file(part_filepath, hasher=hasher)
+    else:
+        offset = 0
+        mode = "wb"
+
+    # Try to get size from header or resource metadata
+    total_size = int(r.headers.get("Content-Length", 0))
+    if total_size:
+        total_size += offset
+    elif resource.get("size"):
+        total_size = int(resource["size"])
+
+    progressbar = tqdm(
+        total=total_size,
+        initial=offset,
+        unit="B",
+        unit_scale=True,
+        desc=dest_filepath.name,
+        position=position,
+        leave=False,
+        mininterval=PROGRESS_MIN_INTERVAL,
+    )
+    transferred = 0
+    pending_progress = 0
+    with open(part_filepath, mode, buffering=WRITE_BUFFER_SIZE) as f:
+        writer = integrity.HashingWriter(f, hasher)
+        if compression_method is not None:
+            writer = compression.open_writer(writer, compression_method)
+        async for chunk in r.aiter_bytes(chunk_size):
+            writer.write(chunk)
+            transferred += len(chunk)
+            pending_progress += len(chunk)
+            if pending_progress >= PROGRESS_UPDATE_BYTES:
+                progressbar.update(pending_progress)
+                pending_progress = 0
+        writer.close()
+    progressbar.update(pending_progress)
+    progressbar.close()
+
+    file_size = part_filepath.stat().st_size
+    digest = _publish(part_filepath, dest_filepath, hasher.hexdigest())
+    return file_size, digest, transferred
+
+
+class _BytesPipe(io.RawIOBase):
+    """Blocking file-like object reading the chunks fed by another thread
+
+    The async download loop feeds response chunks with `feed`, and a worker
+    thread parses them through `read`. `None` marks the end of the stream,
+    and an exception is raised in the reader.
+    """
+
+    def __init__(self, max_chunks: int = PIPE_MAX_CHUNKS):
+        self.queue: queue.Queue = queue.Queue(max_chunks)
+        self.pending = memoryview(b"")
+        self.eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending:
+            if self.eof:
+                return 0
+            chunk = self.queue.get()
+            if chunk is None:
+                self.eof = True
+                return 0
+            if isinstance(chunk, BaseException):
+                raise chunk
+            self.pending = memoryview(chunk)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    async def feed(self, chunk, consumer: asyncio.Future) -> bool:
+        """Queue a chunk, waiting while the queue is full
+
+        Returns:
+            bool: False if `consumer` stopped, so that nobody reads anymore.
+        """
+        while True:
+            if consumer.done():
+                return False
+            try:
+                self.queue.put_nowait(chunk)
+                return True
+            except queue.Full:
+                await asyncio.sleep(PIPE_POLL_INTERVAL)
+
+
+def _convert_to_parquet(
+    pipe: _BytesPipe, read: Callable, directory: Path, rows_per_part: int
+) -> int:
+    """Parse CSV bytes from `pipe` with a reader and write them as Parquet parts"""
+    writer = columnar.ParquetPartsWriter(directory)
+    with io.BufferedReader(pipe, WRITE_BUFFER_SIZE) as f:
+        for df in read(f, chunksize=rows_per_part):
+            writer.write(df)
+    return writer.rows
+
+
+async def _stream_to_parquet(
+    r: httpx.Response,
+    dest_dirpath: Path,
+    part_dirpath: Path,
+    resource: Dict,
+    position: int,
+    chunk_size: Optional[int],
+    read: Callable,
+    rows_per_part: int,
+) -> Tuple[int, str, int]:
+    """Convert a CSV response to a Parquet dataset without saving the CSV
+
+    The response body is piped into `read` (one of the `reader.read_*`
+    functions) running in a worker thread, and each chunk of
+    `rows_per_part` normalized rows is written as a part of the Parquet
+    dataset staged in `part_dirpath`. The directory is renamed to
+    `dest_dirpath` once complete.
+
+    Returns:
+        Tuple[int, str, int]: The size of the CSV in bytes, its digest and
+            the number of bytes transferred.
+    """
+    r.raise_for_status()
+    total_size = int(r.headers.get("Content-Length", 0)) or int(
+        resource.get("size") or 0
+    )
+
+    hasher = integrity.new_hasher()
+    pipe = _BytesPipe()
+    consumer = asyncio.ensure_future(
+        asyncio.to_thread(
+            _convert_to_parquet, pipe, read, part_dirpath, rows_per_part
+        )
+    )
+    progressbar = tqdm(
+        total=total_size,
+        unit="B",
+        unit_scale=True,
+        desc=dest_dirpath.name,
+        position=position,
+        leave=False,
+        mininterval=PROGRESS_MIN_INTERVAL,
+    )
+    transferred = 0
+    pending_progress = 0
+    try:
+        async for chunk in r.aiter_bytes(chunk_size):
+            if not await pipe.feed(chunk, consumer):
+                break
+            hasher.update(chunk)
+            transferred += len(chunk)
+            pending_progress += len(chunk)
+            if pending_progress >= PROGRESS_UPDATE_BYTES:
+                progressbar.update(pending_progress)
+                pending_progress = 0
+        await pipe.feed(None, consumer)
+        # Raises the conversion error, if any
+        await consumer
+    except BaseException as e:
+        # Unblock and stop the worker thread before cleaning up
+        await pipe.feed(e, consumer)
+        with contextlib.suppress(BaseException):
+            await consumer
+        shutil.rmtree(part_dirpath, ignore_errors=True)
+        raise
+    finally:
+        progressbar.update(pending_progress)
+        progressbar.close()
+
+    os.replace(part_dirpath, dest_dirpath)
+    # The digest identifies the source CSV; it is only kept in the manifest
+    digest = f"{integrity.HASH_ALGORITHM}:{hasher.hexdigest()}"
+    return transferred, digest, transferred
+
+
+def _is_stored_as(entry: Dict, extension: str) -> bool:
+    """Whether the manifest `entry` points to a file with `extension`"""
+    return entry["path"].removesuffix(REF_SUFFIX).endswith(extension)
+
+
+def _transfer_stats(transferred: int, ttfb: float, duration: float) -> Dict:
+    """Throughput metrics of a request, in bytes and seconds"""
+    return {
+        "bytes_transferred": transferred,
+        "ttfb": ttfb,
+        "duration": duration,
+        "bytes_per_second": transferred / duration if duration > 0 else 0.0,
+    }
+
+
+def _publish(part_filepath: Path, dest_filepath: Path, digest: str) -> str:
+    """Write the digest sidecar and rename the partial file to its final name"""
+    integrity.write_digest(dest_filepath, digest)
+    os.replace(part_filepath, dest_filepath)
+    return f"{integrity.HASH_ALGORITHM}:{digest}"
+
+
+def _content_range_start(response: httpx.Response) -> Optional[int]:
+    """First byte position of a `Content-Range: bytes <start>-<end>/<total>`"""
+    match = re.match(r"bytes (\d+)-", response.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match else None
+
+
+def _content_range_total(response: httpx.Response) -> Optional[int]:
+    """Complete length of a `Content-Range: bytes <range>/<total>` header"""
+    match = re.match(r"bytes [^/]+/(\d+)", response.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match else None
+
+
+async def download_async(
+    dest_dir: Path,
+    dataset_ids: Iterable[str],
+    jobs: int = DEFAULT_JOBS,
+    session: Optional[Session] = None,
+    metadata_max_age: float = 0,
+    scheduler: Optional[Scheduler] = None,
+    chunk_size: Optional[int] = None,
+    output_format: str = "csv",
+    rows_per_part: int = DEFAULT_ROWS_PER_PART,
+    years: Optional[Iterable[int]] = None,
+    resource_globs: Optional[Iterable[str]] = None,
+    dedup: bool = False,
+    compression_method: Optional[str] = None,
+) -> List[Dict]:
+    """Download data files of several datasets concurrently
+
+    At most `jobs` requests are in flight at any time, counting both CKAN
+    metadata requests and file downloads of all datasets together. All of
+    them share the keep-alive connection pool of `session`.
+
+    The sync is recorded in the manifest of `dest_dir` (see
+    `tddata.manifest`). Resources whose CKAN url, `last_modified` and size
+    did not change since the last sync are skipped without any request;
+    the others are fetched with a conditional GET, so that a file the server
+    reports as not modified is not transferred again. Published files are
+    also added to the catalog of `dest_dir` (see `tddata.catalog`).
+
+    Args:
+        dest_dir: The directory path to save the files
+        dataset_ids: The CKAN dataset IDs or names.
+        jobs: Maximum number of concurrent requests.
+        session: An optional `Session` to issue the requests with. If not
+            provided, a new session sized for `jobs` connections is created
+            and closed at the end.
+        metadata_max_age: Seconds during which the CKAN metadata recorded in
+            the manifest is reused instead of calling `package_show` again.
+            The default (0) always asks CKAN.
+        scheduler: An optional `Scheduler` pacing and retrying the requests.
+            Requests that fail permanently are listed in its `failures`. If
+            not provided, a scheduler with default settings is used.
+        chunk_size: Size of the chunks read from each response body. By
+            default, chunks are taken as the network delivers them.
+        output_format: "csv" to save the files as published, or "parquet"
+            to stream each CSV through the matching `reader.read_*` function
+            into a Parquet dataset (a `<slug>@<timestamp>.parquet` directory
+            of part files) without writing the CSV to disk. Resources without
+            a known reader are kept as CSV. Requires `pyarrow`.
+        rows_per_part: Number of rows in each Parquet part file.
+        years: Download yearly resources of these years only (see
+            `filter_resources`).
+        resource_globs: Download only resources matching one of these
+            patterns (see `filter_resources`).
+        dedup: Move each downloaded CSV into the deduplicated object store,
+            leaving a `<file>.ref` snapshot reference in its place (see
+            `tddata.snapshots`).
+        compression_method: "zstd" or "gzip" to compress the CSV files
+            while they stream, saving them as `.csv.zst` / `.csv.gz` (see
+            `tddata.compression`). The readers read them transparently.
+
+    Returns:
+        List[Dict]: metadata for logging and analysis of downloaded files.
+            The `status` key tells whether the file was `downloaded`, or
+            skipped as `unchanged`, `not-modified` or already existing
+            (`exists`). Fetched files also report `bytes_transferred`,
+            `ttfb` (seconds until the response headers arrived), `duration`
+            (seconds) and `bytes_per_second`.
+    """
+    if jobs < 1:
+        raise ValueError(f"jobs must be at least 1, got {jobs}")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}")
+    if output_format == "parquet":
+        columnar.require_pyarrow()
+    if compression_method is not None:
+        if compression_method not in compression.COMPRESSIONS:
+            raise ValueError(
+                f"compression_method must be one of {list(compression.COMPRESSIONS)}"
+            )
+        if dedup:
+            raise ValueError("Compressed files cannot be deduplicated")
+        if compression_method == "zstd":
+            compression.require_zstandard()
+
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    owns_session = session is None
+    if owns_session:
+        session = Session(max_connections=jobs, max_keepalive_connections=jobs)
+    run = _SyncRun(
+        session.async_client,
+        session.api_url,
+        dest_dir,
+        jobs,
+        Manifest.load(dest_dir),
+        Catalog(dest_dir),
+        metadata_max_age,
+        scheduler if scheduler is not None else Scheduler(),
+        chunk_size,
+        output_format,
+        rows_per_part,
+        years,
+        resource_globs,
+        dedup,
+        compression_method,
+    )
+    try:
+        results = await asyncio.gather(
+            *(run.download_dataset(dataset_id) for dataset_id in dataset_ids)
+        )
+    finally:
+        run.manifest.save()
+        run.catalog.close()
+        if owns_session:
+            await session.aclose()
+
+    return [r for dataset_results in results for r in dataset_results]
+
+
+def download_many(
+    dest_dir: Path,
+    dataset_ids: Iterable[str],
+    jobs: int = DEFAULT_JOBS,
+    session: Optional[Session] = None,
+    **kwargs,
+) -> List[Dict]:
+    """Download data files of several datasets concurrently
+
+    Blocking wrapper around `download_async`. It also works when called from
+    a running event loop (e.g. Jupyter), by running the downloads in a
+    separate thread.
+
+    Args:
+        dest_dir: The directory path to save the files
+        dataset_ids: The CKAN dataset IDs or names.
+        jobs: Maximum number of concurrent requests.
+        session: An optional `Session` to issue the requests with.
+        **kwargs: Further options of `download_async`.
+
+    Returns:
+        List[Dict]: metadata for logging and analysis of downloaded files
+    """
+    coro = download_async(
+        dest_dir, list(dataset_ids), jobs=jobs, session=session, **kwargs
+    )
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def download(
+    dest_dir: Path,
+    dataset_id: str,
+    jobs: int = DEFAULT_JOBS,
+    session: Optional[Session] = None,
+    **kwargs,
+) -> List[Dict]:
+    """Download data files
+
+    Args:
+        dest_dir: The directory path to save the file
+        dataset_id: The CKAN dataset ID or name.
+        jobs: Maximum number of concurrent downloads.
+        session: An optional `Session` to issue the requests with.
+        **kwargs: Further options of `download_async`.
+
+    Returns:
+        List[Dict]: metadata for logging and analysis of downloaded files
+    """
+    return download_many(dest_dir, [dataset_id], jobs=jobs, session=session, **kwargs)
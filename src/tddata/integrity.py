@@ -0,0 +1,179 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Integrity digests of downloaded files.
+
+Files are hashed while they are downloaded, and the digest is stored next to
+the file in a sidecar `<filename>.<algorithm>` written in the same format as
+`sha256sum` / `b3sum`, so it can also be checked with those tools. BLAKE3 is
+used when the `blake3` package is installed, SHA-256 otherwise.
+"""
+
+import concurrent.futures
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import blake3
+except ImportError:  # pragma: no cover - optional dependency
+    blake3 = None
+
+from .storage import COMPRESSED_SUFFIXES, REF_SUFFIX
+
+HASH_ALGORITHM = "blake3" if blake3 is not None else "sha256"
+HASH_ALGORITHMS = ("blake3", "sha256")
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def new_hasher(algorithm: str = HASH_ALGORITHM):
+    """Return a new hash object for `algorithm` ("blake3" or "sha256")."""
+    if algorithm == "blake3":
+        if blake3 is None:
+            raise ImportError("The 'blake3' package is required for BLAKE3 digests")
+        return blake3.blake3()
+    return hashlib.new(algorithm)
+
+
+def hash_file(filepath: Path, algorithm: str = HASH_ALGORITHM, hasher=None) -> str:
+    """Compute the hex digest of a file.
+
+    Args:
+        filepath: The file to hash.
+        algorithm: The hash algorithm.
+        hasher: An optional hash object to update instead of a new one,
+            e.g. to hash a partial file before resuming its download.
+
+    Returns:
+        str: The hex digest.
+    """
+    if hasher is None:
+        hasher = new_hasher(algorithm)
+    with open(filepath, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_digest_path(filepath: Path, algorithm: str = HASH_ALGORITHM) -> Path:
+    """Return the sidecar path holding the digest of `filepath`."""
+    return filepath.with_name(f"{filepath.name}.{algorithm}")
+
+
+def write_digest(filepath: Path, digest: str, algorithm: str = HASH_ALGORITHM):
+    """Write the digest of `filepath` to its sidecar file, atomically."""
+    digest_path = get_digest_path(filepath, algorithm)
+    tmp_path = digest_path.with_name(digest_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f"{digest}  {filepath.name}\n")
+    os.replace(tmp_path, digest_path)
+
+
+def read_digest(filepath: Path) -> Optional[Tuple[str, str]]:
+    """Read the recorded digest of `filepath`.
+
+    Returns:
+        Tuple[str, str] | None: The algorithm and hex digest, or None if no
+            sidecar file exists.
+    """
+    for algorithm in HASH_ALGORITHMS:
+        digest_path = get_digest_path(filepath, algorithm)
+        if digest_path.exists():
+            with open(digest_path, encoding="utf-8") as f:
+                return algorithm, f.read().split()[0]
+    return None
+
+
+def verify_file(filepath: Path) -> Dict:
+    """Check a file against its recorded digest.
+
+    Snapshot references are checked with `snapshots.verify_ref`.
+
+    Returns:
+        Dict: The file path and a `status`, one of `ok`, `mismatch` or
+            `no-digest`.
+    """
+    if filepath.name.endswith(REF_SUFFIX):
+        from .snapshots import verify_ref
+
+        return verify_ref(filepath)
+
+    recorded = read_digest(filepath)
+    if recorded is None:
+        return {"path": filepath, "status": "no-digest"}
+    algorithm, expected = recorded
+    actual = hash_file(filepath, algorithm)
+    return {
+        "path": filepath,
+        "status": "ok" if actual == expected else "mismatch",
+        "algorithm": algorithm,
+        "expected": expected,
+        "actual": actual,
+    }
+
+
+def iter_data_files(directory: Path) -> Iterable[Path]:
+    """Yield the data files of a store directory, compressed or not."""
+    return sorted(
+        path
+        for suffix in ("", *COMPRESSED_SUFFIXES)
+        for path in directory.glob(f"*.csv{suffix}")
+    )
+
+
+class HashingWriter:
+    """Write to a binary file, hashing the bytes written.
+
+    Args:
+        fileobj: The file written to. It is not closed by `close`.
+        hasher: The hash object updated with every write.
+    """
+
+    def __init__(self, fileobj, hasher):
+        self.fileobj = fileobj
+        self.hasher = hasher
+
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def close(self):
+        self.flush()
+
+
+def verify_store(directory: Path, workers: Optional[int] = None) -> List[Dict]:
+    """Check every data file of a store against its recorded digest.
+
+    Files are hashed in parallel by a pool of processes.
+
+    Args:
+        directory: The store directory.
+        workers: Number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        List[Dict]: The result of `verify_file` for each data file and
+            snapshot reference.
+    """
+    files = [*iter_data_files(directory), *sorted(directory.glob(f"*{REF_SUFFIX}"))]
+    if not files:
+        return []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(verify_file, files))
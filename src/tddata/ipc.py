@@ -0,0 +1,174 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Memory-mapped Arrow IPC exports of the datasets.
+
+Every process loading a dataset from the CSVs pays the parse again and
+holds its own copy of the frame. This module writes the normalized rows of
+a dataset, as returned by its `reader.read_*` function for the latest files,
+into a single uncompressed Arrow IPC file (Feather v2):
+
+    <data_dir>/arrow/prices.arrow
+
+`load_table` memory-maps it: there is nothing to parse, the columns are not
+copied into the process, and their pages are shared through the OS page
+cache by every process loading the same file. Requires the optional
+`pyarrow` package (`pip install "tddata[parquet]"`).
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from . import columnar, partitioned, storage
+
+# Directory of the exports, inside the data directory
+IPC_DIRNAME = "arrow"
+IPC_SUFFIX = ".arrow"
+
+
+def get_ipc_path(data_dir: Path, dataset: str) -> Path:
+    """Return the path of the Arrow IPC export of a dataset."""
+    return data_dir / IPC_DIRNAME / f"{dataset}{IPC_SUFFIX}"
+
+
+def export_dataset(
+    data_dir: Path, dataset: str, chunksize: int = partitioned.DEFAULT_CHUNKSIZE
+) -> Optional[Path]:
+    """Write the latest files of a dataset to an Arrow IPC file.
+
+    The source files are read in chunks, each written as record batches, so
+    the whole dataset never has to fit in memory. The file is written
+    uncompressed, as compressed buffers could not be memory-mapped, and
+    replaces the previous export once complete.
+
+    Chunks may have different categories, e.g. bond names outside
+    `BondType`. The file format cannot replace a dictionary, so the
+    categories only grow (see `_extend_categories`) and each chunk adds its
+    new ones as a dictionary delta.
+
+    Args:
+        data_dir: The data directory holding the downloaded files.
+        dataset: One of the keys of `partitioned.DATASETS`, e.g. "prices".
+        chunksize: Number of rows read from the source files at a time.
+
+    Returns:
+        Path | None: The path of the export, or None if the data directory
+            has no file of the dataset.
+    """
+    columnar.require_pyarrow()
+    spec = partitioned.DATASETS[dataset]
+    files = storage.get_latest_files(data_dir, pattern=spec.pattern)
+    if not files:
+        return None
+
+    path = get_ipc_path(data_dir, dataset)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    options = columnar.pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    categories: Dict[str, List] = {}
+    schema = None
+    writer = None
+    try:
+        for filepath in files:
+            for df in spec.read(filepath, chunksize=chunksize):
+                table = columnar.pa.Table.from_pandas(
+                    _extend_categories(df, categories),
+                    schema=schema,
+                    preserve_index=False,
+                )
+                if writer is None:
+                    schema = table.schema
+                    writer = columnar.pa.ipc.new_file(
+                        str(tmp_path), schema, options=options
+                    )
+                writer.write_table(table)
+    except BaseException:
+        # Leave no partial export behind; a previous one is kept
+        if writer is not None:
+            writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if writer is not None:
+        writer.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def _extend_categories(
+    df: pd.DataFrame, categories: Dict[str, List]
+) -> pd.DataFrame:
+    """Recode the categoricals of a chunk on the categories seen so far.
+
+    The categories of the chunk not seen yet are appended to
+    `categories[name]`, so each chunk's categories extend the previous
+    chunk's.
+    """
+    for name in df.columns:
+        column = df[name]
+        if not isinstance(column.dtype, pd.CategoricalDtype):
+            continue
+        seen = categories.setdefault(name, [])
+        known = set(seen)
+        seen.extend(c for c in column.cat.categories if c not in known)
+        df[name] = column.cat.set_categories(list(seen))
+    return df
+
+
+def load_table(
+    data_dir: Path, dataset: str, columns: Optional[List[str]] = None
+) -> "columnar.pa.Table":
+    """Memory-map the Arrow IPC export of a dataset.
+
+    The table references the mapped file directly: loading it reads nothing
+    up front, and only the pages of the columns used are ever read.
+
+    Args:
+        data_dir: The data directory.
+        dataset: One of the keys of `partitioned.DATASETS`, e.g. "prices".
+        columns: Keep only these columns.
+
+    Returns:
+        pa.Table: The rows of the export.
+    """
+    columnar.require_pyarrow()
+    source = columnar.pa.memory_map(str(get_ipc_path(data_dir, dataset)))
+    table = columnar.pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    return table
+
+
+def load_dataset(
+    data_dir: Path, dataset: str, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """Load the Arrow IPC export of a dataset as a DataFrame.
+
+    Numeric and datetime columns without nulls are not copied: their blocks
+    are views of the memory-mapped file. Strings are converted.
+
+    Args:
+        data_dir: The data directory.
+        dataset: One of the keys of `partitioned.DATASETS`, e.g. "prices".
+        columns: Keep only these columns.
+
+    Returns:
+        pd.DataFrame: The rows returned by the dataset's reader.
+    """
+    table = load_table(data_dir, dataset, columns)
+    return table.to_pandas(split_blocks=True)
@@ -0,0 +1,169 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Persisted record of the CKAN resources synced to a data directory.
+
+The manifest lives in the data directory as `manifest.json` and stores, for
+every resource, its CKAN id, url, `last_modified` and size, the HTTP
+validators (`ETag` / `Last-Modified`) sent by the file server, the local
+file holding it and its integrity digest. The downloader diffs fresh CKAN
+metadata against it to skip unchanged resources, and uses the validators for
+conditional GETs.
+"""
+
+import datetime as dt
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def get_resource_key(resource: Dict) -> str:
+    """Return the key identifying a CKAN resource in the manifest."""
+    return resource.get("id") or resource["url"]
+
+
+class Manifest:
+    """Resources and datasets known to be synced to a data directory.
+
+    Args:
+        data_dir: The data directory holding the manifest file.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = data_dir
+        self.path = data_dir / MANIFEST_FILENAME
+        self.datasets: Dict[str, Dict] = {}
+        self.resources: Dict[str, Dict] = {}
+
+    @classmethod
+    def load(cls, data_dir: Path) -> "Manifest":
+        """Load the manifest of `data_dir`, or an empty one if missing."""
+        manifest = cls(data_dir)
+        if manifest.path.exists():
+            with open(manifest.path, encoding="utf-8") as f:
+                data = json.load(f)
+            manifest.datasets = data.get("datasets", {})
+            manifest.resources = data.get("resources", {})
+        return manifest
+
+    def save(self):
+        """Write the manifest atomically, so readers never see a torn file."""
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "datasets": self.datasets,
+                    "resources": self.resources,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.path)
+
+    def get_dataset_resources(
+        self, dataset_id: str, max_age: float
+    ) -> Optional[List[Dict]]:
+        """Return the cached CKAN resources of a dataset if fresh enough.
+
+        Args:
+            dataset_id: The CKAN dataset ID or name.
+            max_age: Maximum age in seconds of the cached metadata.
+
+        Returns:
+            List[Dict] | None: The cached resources, or None if the dataset
+                is unknown or its metadata is older than `max_age`.
+        """
+        entry = self.datasets.get(dataset_id)
+        if entry is None or max_age <= 0:
+            return None
+        checked_at = dt.datetime.fromisoformat(entry["checked_at"])
+        age = (dt.datetime.now(dt.timezone.utc) - checked_at).total_seconds()
+        if age > max_age:
+            return None
+        return entry["resources"]
+
+    def set_dataset_resources(self, dataset_id: str, resources: List[Dict]):
+        """Record the CKAN resources of a dataset as checked now."""
+        self.datasets[dataset_id] = {
+            "checked_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+            "resources": resources,
+        }
+
+    def get_resource(self, resource: Dict) -> Optional[Dict]:
+        """Return the manifest entry of a CKAN resource, if any."""
+        return self.resources.get(get_resource_key(resource))
+
+    def is_unchanged(self, resource: Dict) -> bool:
+        """Whether a CKAN resource matches its entry and the file is present.
+
+        Args:
+            resource: Fresh CKAN metadata of the resource.
+
+        Returns:
+            bool: True if url, `last_modified` and size are the same as
+                recorded and the local file still exists.
+        """
+        entry = self.get_resource(resource)
+        if entry is None:
+            return False
+        return (
+            entry["url"] == resource["url"]
+            and entry["last_modified"] == _last_modified(resource)
+            and entry["size"] == resource.get("size")
+            and (self.data_dir / entry["path"]).exists()
+        )
+
+    def set_resource(
+        self,
+        resource: Dict,
+        path: Path,
+        etag: Optional[str] = None,
+        http_last_modified: Optional[str] = None,
+        digest: Optional[str] = None,
+    ):
+        """Record a CKAN resource as synced to `path`.
+
+        Args:
+            resource: CKAN metadata of the resource.
+            path: The local file holding the resource.
+            etag: The `ETag` header sent with the file, if any.
+            http_last_modified: The `Last-Modified` header sent with the
+                file, if any.
+            digest: The integrity digest of the file, as
+                `<algorithm>:<hex digest>`, if known.
+        """
+        self.resources[get_resource_key(resource)] = {
+            "id": resource.get("id"),
+            "name": resource.get("name"),
+            "url": resource["url"],
+            "last_modified": _last_modified(resource),
+            "size": resource.get("size"),
+            "etag": etag,
+            "http_last_modified": http_last_modified,
+            "digest": digest,
+            "path": path.name,
+        }
+
+
+def _last_modified(resource: Dict) -> Optional[str]:
+    return resource.get("last_modified") or resource.get("created")
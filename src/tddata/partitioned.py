@@ -0,0 +1,213 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Hive-partitioned Parquet store of the datasets.
+
+The flat data directory keeps one `<slug>@<timestamp>.csv` file per
+resource, so a query on a single year or bond type has to parse every
+yearly file. This module rewrites the latest version of each file of a
+dataset, as normalized by its `reader.read_*` function, into a Parquet
+dataset partitioned by year and bond type:
+
+    <data_dir>/partitioned/operations/year=2024/bond_type=Tesouro%20Selic/...
+
+`read_dataset` then only opens the partitions matching its filters.
+Requires the optional `pyarrow` package (`pip install "tddata[parquet]"`).
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from . import columnar, reader, storage
+from .constants import Column
+
+# Directory of the partitioned store, inside the data directory
+STORE_DIRNAME = "partitioned"
+
+YEAR_COLUMN = "year"
+
+# Rows read from the source CSVs at a time while building the store
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+class PartitionedDataset(NamedTuple):
+    """How a dataset is laid out in the partitioned store.
+
+    Attributes:
+        pattern: Glob pattern of the dataset's files in the data directory.
+        read: The reader normalizing the files.
+        date_column: The column the `year` partition is taken from.
+        partition_columns: The columns the dataset is partitioned by.
+    """
+
+    pattern: str
+    read: Callable
+    date_column: Column
+    partition_columns: Tuple[str, ...] = (YEAR_COLUMN, Column.BOND_TYPE.value)
+
+
+DATASETS = {
+    "prices": PartitionedDataset(
+        "taxas-dos-titulos-ofertados*.csv",
+        reader.read_prices,
+        Column.REFERENCE_DATE,
+    ),
+    "stock": PartitionedDataset(
+        "estoque-do-tesouro-direto*.csv", reader.read_stock, Column.STOCK_MONTH
+    ),
+    "investors": PartitionedDataset(
+        "investidores-do-tesouro-direto*.csv",
+        reader.read_investors,
+        Column.JOIN_DATE,
+        (YEAR_COLUMN,),
+    ),
+    "operations": PartitionedDataset(
+        "operacoes-do-tesouro-direto*.csv",
+        reader.read_operations,
+        Column.OPERATION_DATE,
+    ),
+    "sales": PartitionedDataset(
+        "vendas-do-tesouro-direto*.csv", reader.read_sales, Column.SALE_DATE
+    ),
+    "buybacks": PartitionedDataset(
+        "recompras-do-tesouro-direto*.csv", reader.read_buybacks, Column.BUYBACK_DATE
+    ),
+    "maturities": PartitionedDataset(
+        "vencimentos-do-tesouro-direto*.csv",
+        reader.read_maturities,
+        Column.REDEMPTION_DATE,
+    ),
+    "interest_coupons": PartitionedDataset(
+        "pagamento-de-cupom-de-juros-do-tesouro-direto*.csv",
+        reader.read_interest_coupons,
+        Column.REDEMPTION_DATE,
+    ),
+}
+
+
+def get_dataset_path(data_dir: Path, dataset: str) -> Path:
+    """Return the root directory of a dataset in the partitioned store."""
+    return data_dir / STORE_DIRNAME / dataset
+
+
+def build_dataset(
+    data_dir: Path, dataset: str, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Optional[Path]:
+    """Rewrite the latest files of a dataset into the partitioned store.
+
+    The source files are read in chunks, so the whole dataset never has to
+    fit in memory. The new partitions are written next to the current ones
+    and swapped in once complete.
+
+    Args:
+        data_dir: The data directory holding the downloaded files.
+        dataset: One of the keys of `DATASETS`, e.g. "operations".
+        chunksize: Number of rows read from the source files at a time.
+
+    Returns:
+        Path | None: The root directory of the dataset, or None if the data
+            directory has no file of the dataset.
+    """
+    columnar.require_pyarrow()
+    spec = DATASETS[dataset]
+    files = storage.get_latest_files(data_dir, pattern=spec.pattern)
+    if not files:
+        return None
+
+    root = get_dataset_path(data_dir, dataset)
+    tmp_root = root.with_name(root.name + ".tmp")
+    if tmp_root.exists():
+        shutil.rmtree(tmp_root)
+
+    schema = None
+    for file_number, filepath in enumerate(files):
+        for chunk_number, df in enumerate(spec.read(filepath, chunksize=chunksize)):
+            df[YEAR_COLUMN] = df[spec.date_column.value].dt.year.astype("Int64")
+            table = columnar.pa.Table.from_pandas(
+                df, schema=schema, preserve_index=False
+            )
+            if schema is None:
+                # Later chunks are cast to it, so all the files are readable
+                # as a single dataset
+                schema = table.schema
+            # A distinct file name per chunk, so chunks landing in the same
+            # partition do not overwrite each other
+            basename = f"part-{file_number:03d}-{chunk_number:05d}-{{i}}.parquet"
+            columnar.pq.write_to_dataset(
+                table,
+                tmp_root,
+                partition_cols=list(spec.partition_columns),
+                basename_template=basename,
+            )
+
+    if root.exists():
+        shutil.rmtree(root)
+    os.replace(tmp_root, root)
+    return root
+
+
+def read_dataset(
+    data_dir: Path,
+    dataset: str,
+    years: Optional[Iterable[int]] = None,
+    bond_types: Optional[Iterable[str]] = None,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Read a dataset from the partitioned store.
+
+    Only the partitions of the requested years and bond types are read.
+
+    Args:
+        data_dir: The data directory.
+        dataset: One of the keys of `DATASETS`, e.g. "operations".
+        years: Read only these years.
+        bond_types: Read only these bond types (standardized names, e.g.
+            "Tesouro Selic"). Ignored for datasets without bond types.
+        columns: Read only these columns.
+
+    Returns:
+        pd.DataFrame: The rows of the selected partitions, with the columns
+            returned by the dataset's reader plus `year`.
+    """
+    columnar.require_pyarrow()
+    spec = DATASETS[dataset]
+    filters = []
+    if years is not None:
+        filters.append((YEAR_COLUMN, "in", [int(year) for year in years]))
+    if bond_types is not None and Column.BOND_TYPE.value in spec.partition_columns:
+        filters.append((Column.BOND_TYPE.value, "in", list(bond_types)))
+
+    # Typed partition keys, so they come back as the columns written
+    # instead of dictionary-encoded ones
+    key_types = {
+        YEAR_COLUMN: columnar.pa.int64(),
+        Column.BOND_TYPE.value: columnar.pa.string(),
+    }
+    key_schema = columnar.pa.schema(
+        [(name, key_types[name]) for name in spec.partition_columns]
+    )
+    partitioning = columnar.ds.partitioning(key_schema, flavor="hive")
+    table = columnar.pq.read_table(
+        get_dataset_path(data_dir, dataset),
+        columns=columns,
+        filters=filters or None,
+        partitioning=partitioning,
+    )
+    return table.to_pandas()
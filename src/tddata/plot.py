@@ -131,12 +131,15 @@ def plot_stock(data: pd.DataFrame, by_bond_type: bool = True):
     if by_bond_type:
         # Group by month and bond type
         df_grouped = (
-            data.groupby([Column.STOCK_MONTH.value, Column.BOND_TYPE.value])[
-                Column.STOCK_VALUE.value
-            ]
+            data.groupby(
+                [Column.STOCK_MONTH.value, Column.BOND_TYPE.value], observed=True
+            )[Column.STOCK_VALUE.value]
             .sum()
             .reset_index()
         )
+        df_grouped[Column.BOND_TYPE.value] = _drop_unused_categories(
+            df_grouped[Column.BOND_TYPE.value]
+        )
 
         sns.lineplot(
             data=df_grouped,
@@ -470,7 +473,7 @@ def plot_maturities(data: pd.DataFrame, by_bond_type: bool = True):
     """Plot maturities value over time."""
     return _plot_value_over_time(
         data,
-        date_col=Column.BUYBACK_DATE.value,  # Maturities file uses 'Data Resgate' -> BUYBACK_DATE/REDEMPTION_DATE
+        date_col=Column.REDEMPTION_DATE.value,
         value_col=Column.VALUE.value,
         title="Maturities Volume Over Time",
         hue_col=Column.BOND_TYPE.value if by_bond_type else None,
@@ -482,7 +485,7 @@ def plot_interest_coupons(data: pd.DataFrame, by_bond_type: bool = True):
     """Plot interest coupons payments value over time."""
     return _plot_value_over_time(
         data,
-        date_col=Column.BUYBACK_DATE.value,  # Interest coupons file uses 'Data Resgate' similar to maturities
+        date_col=Column.REDEMPTION_DATE.value,
         value_col=Column.VALUE.value,
         title="Interest Coupons Payments Over Time",
         hue_col=Column.BOND_TYPE.value if by_bond_type else None,
@@ -506,7 +509,12 @@ def _plot_value_over_time(
     df["month"] = df[date_col].dt.to_period("M").dt.to_timestamp()
 
     if hue_col:
-        grouped = df.groupby(["month", hue_col])[value_col].sum().reset_index()
+        grouped = (
+            df.groupby(["month", hue_col], observed=True)[value_col]
+            .sum()
+            .reset_index()
+        )
+        grouped[hue_col] = _drop_unused_categories(grouped[hue_col])
         sns.lineplot(data=grouped, x="month", y=value_col, hue=hue_col, ax=ax)
         if legend_title:
             ax.legend(title=legend_title)
@@ -524,6 +532,13 @@ def _plot_value_over_time(
     return f
 
 
+def _drop_unused_categories(series: pd.Series) -> pd.Series:
+    # Seaborn draws a legend entry for every category, even absent ones
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.remove_unused_categories()
+    return series
+
+
 def _add_footer(fig):
     fig.text(
         0.01,
@@ -23,38 +23,524 @@ and data normalization using the schema defined in `constants.py`.
 
 The DataFrames returned by these functions use standardized column names
 defined in the `Column` enum.
+
+Every `read_*` function is driven by the dataset's `DATASET_SCHEMAS` entry
+and takes the same arguments:
+
+    filepath: Path to the CSV file (plain, compressed or a snapshot
+        reference), or a file object.
+    chunksize: Number of lines to read from the CSV file at a time. The
+        reader then returns an iterator of DataFrames.
+    engine: The CSV parser, "c" or the multi-threaded "pyarrow". Both
+        return the column types declared in `DATASET_SCHEMAS`.
+    columns: Return only these columns. Only they, and those the filters
+        need, are parsed.
+    filters: Return only the rows matching these conditions, e.g.
+        `{Column.BOND_TYPE: "Tesouro Selic"}` (see `tddata.selection`).
+        They are applied to each chunk as it is parsed.
+    workers: Parse the file in this many processes (see `parallelizable`).
+    compact: Return memory-lean dtypes (see `compactable`).
+    cache: Whether and where to cache the result as Parquet (see
+        `tddata.cache.get_cache_dir`). Disabled by default, unless the
+        `TDDATA_CACHE_DIR` environment variable is set.
 """
 
+import concurrent.futures
+import enum
+import functools
+import io
+import itertools
+import os
 from pathlib import Path
-from typing import Iterator, Optional, Union
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
+import numpy as np
 import pandas as pd
 
+from . import columnar, selection
+from .cache import cached
 from .constants import (
-    AccountStatus,
-    Channel,
-    Column,
-    Gender,
-    TradedLast12Months,
+    DATASET_SCHEMAS,
+    BondType,
+    SourceColumn,
     normalize_bond_type,
 )
+from .selection import ColumnName, Filters
+from .snapshots import open_source
+from .storage import slugify
+
+# CSV parsers the readers can use: pandas' C parser, or pyarrow's
+# multi-threaded one (requires `pip install "tddata[parquet]"`)
+ENGINES = ("c", "pyarrow")
+
+# Text columns with at most this ratio of distinct values per row become
+# categoricals in compact mode
+CATEGORY_MAX_RATIO = 0.5
+
+# Smallest byte range a file is split into for parallel parsing
+MIN_RANGE_SIZE = 8 * 1024 * 1024
+
+# Types the C engine parses each `SourceColumn.dtype` to, dates being parsed
+# afterwards by `_parse_dates` to `DATE_DTYPE`. Integers are nullable, as some
+# columns have blanks, and the pyarrow engine returns the same types. They are
+# spelled out so pandas 2 returns them too: it would make text columns `object`
+# and dates nanoseconds.
+PANDAS_DTYPES = {
+    "str": pd.StringDtype(),
+    "int": "Int64",
+    "float": "float64",
+    "date": pd.StringDtype(),
+}
+DATE_DTYPE = "datetime64[us]"
+
+# Bytes parsed at a time by the pyarrow engine
+PYARROW_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+class CompiledSchema(NamedTuple):
+    """The parsing steps of a dataset, compiled from its `DATASET_SCHEMAS` entry.
+
+    Attributes:
+        rename: Standardized name of each source column.
+        dtypes: Type of each source column, "str", "int", "float" or "date".
+        date_formats: Format of each source date column.
+        domains: Enum of the valid values of each standardized column with
+            a domain.
+    """
+
+    rename: Dict[str, str]
+    dtypes: Dict[str, str]
+    date_formats: Dict[str, str]
+    domains: Dict[str, Type[enum.Enum]]
+
+
+def compile_schema(source_columns: Iterable[SourceColumn]) -> CompiledSchema:
+    """Compile the `SourceColumn`s of a dataset into its parsing steps."""
+    source_columns = list(source_columns)
+    return CompiledSchema(
+        rename={c.source: c.column.value for c in source_columns},
+        dtypes={c.source: c.dtype for c in source_columns},
+        date_formats={
+            c.source: c.date_format for c in source_columns if c.dtype == "date"
+        },
+        domains={
+            c.column.value: c.domain for c in source_columns if c.domain is not None
+        },
+    )
+
+
+# Parsing steps of each dataset, shared by every reader option
+SCHEMAS = {
+    dataset: compile_schema(source_columns)
+    for dataset, source_columns in DATASET_SCHEMAS.items()
+}
+
+
+def compact_dtypes(df: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    """Convert the columns of a DataFrame to memory-lean dtypes.
+
+    Repetitive text columns (such as state, city or profession) become
+    categoricals and the other text columns Arrow-backed strings, integers
+    are downcast to the smallest type holding their values and, optionally,
+    floats to single precision.
+
+    The memory saved, in bytes, is reported in `df.attrs["memory_saved"]`.
+
+    Args:
+        df: The DataFrame to convert, in place.
+        float32: Also convert float columns, such as prices, to float32.
+
+    Returns:
+        pd.DataFrame: `df`, converted.
+    """
+    before = df.memory_usage(deep=True).sum()
+    for name in df.columns:
+        column = df[name]
+        if pd.api.types.is_integer_dtype(column.dtype):
+            df[name] = pd.to_numeric(column, downcast="integer")
+        elif pd.api.types.is_float_dtype(column.dtype):
+            if float32:
+                df[name] = column.astype("float32")
+        elif pd.api.types.is_string_dtype(column.dtype):
+            if column.nunique() <= CATEGORY_MAX_RATIO * len(column):
+                df[name] = column.astype("category")
+            elif columnar.pa is not None:
+                df[name] = column.astype(pd.StringDtype("pyarrow"))
+    df.attrs["memory_saved"] = int(before - df.memory_usage(deep=True).sum())
+    return df
+
+
+def fixed_compact_dtypes(
+    source_columns: Iterable[SourceColumn], float32: bool = False
+) -> Dict[str, object]:
+    """Return memory-lean dtypes for a dataset, from its schema alone.
+
+    `compact_dtypes` picks the dtypes from the values of a whole DataFrame,
+    so the chunks of a chunked read would each get their own. These are the
+    same for every chunk: columns with a domain become categoricals over its
+    values, integers take their `SourceColumn.compact_dtype`, other text
+    columns become Arrow-backed strings and, optionally, floats float32.
+    Bond types are left alone, as the readers already return categoricals.
+
+    Returns:
+        Dict[str, object]: The dtype of each standardized column to convert.
+    """
+    dtypes = {}
+    for c in source_columns:
+        name = c.column.value
+        if c.domain is BondType:
+            continue
+        if c.domain is not None:
+            dtypes[name] = pd.CategoricalDtype([member.value for member in c.domain])
+        elif c.compact_dtype is not None:
+            dtypes[name] = c.compact_dtype
+        elif c.dtype == "str" and columnar.pa is not None:
+            dtypes[name] = pd.StringDtype("pyarrow")
+        elif c.dtype == "float" and float32:
+            dtypes[name] = "float32"
+    return dtypes
+
+
+def _astype_compact(df: pd.DataFrame, dtypes: Dict[str, object]) -> pd.DataFrame:
+    """Convert the columns of `df` to `dtypes`, as `compact_dtypes` reports it."""
+    before = df.memory_usage(deep=True).sum()
+    df = df.astype({name: dtype for name, dtype in dtypes.items() if name in df})
+    df.attrs["memory_saved"] = int(before - df.memory_usage(deep=True).sum())
+    return df
+
+
+def compactable(read: Callable) -> Callable:
+    """Add the `compact` argument to a `reader.read_*` function.
+
+    `compact=True` converts the result with `compact_dtypes`, and
+    `compact="float32"` also converts its floats to single precision. The
+    chunks of a chunked read are all converted to the same
+    `fixed_compact_dtypes` instead. The conversion comes after any cache
+    lookup, so cached entries are shared by both modes.
+    """
+
+    @functools.wraps(read)
+    def wrapper(
+        filepath: Path,
+        chunksize: Optional[int] = None,
+        compact: Union[bool, str] = False,
+        **kwargs,
+    ):
+        result = read(filepath, chunksize=chunksize, **kwargs)
+        if not compact:
+            return result
+        float32 = compact == "float32"
+        if chunksize is None:
+            return compact_dtypes(result, float32)
+        # The readers are named after their dataset, e.g. `read_prices`
+        dataset = read.__name__.removeprefix("read_")
+        dtypes = fixed_compact_dtypes(DATASET_SCHEMAS[dataset], float32)
+        return (_astype_compact(chunk, dtypes) for chunk in result)
+
+    return wrapper
+
+
+def parallelizable(read: Callable) -> Callable:
+    """Add the `workers` argument to a `reader.read_*` function.
+
+    With `workers` > 1, a plain CSV file is split into byte ranges aligned
+    to line ends (see `split_ranges`), the header is prepended to each range
+    and the ranges are parsed and normalized by `read` in as many worker
+    processes. The results are reassembled in order, as `read_many` does.
+    Each range is parsed to the types declared in `DATASET_SCHEMAS`, so
+    ranges where a column is blank still merge with the others.
+    Chunked reads, compressed files and snapshot references are read by a
+    single process.
+    """
+
+    @functools.wraps(read)
+    def wrapper(
+        filepath: Path,
+        chunksize: Optional[int] = None,
+        workers: Optional[int] = None,
+        **kwargs,
+    ):
+        if (
+            workers is None
+            or workers < 2
+            or chunksize is not None
+            or not isinstance(filepath, (str, os.PathLike))
+            or not str(filepath).endswith(".csv")
+        ):
+            return read(filepath, chunksize=chunksize, **kwargs)
+        header, ranges = split_ranges(Path(filepath), workers)
+        if len(ranges) < 2:
+            return read(filepath, **kwargs)
+        max_workers = len(ranges)
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+            results = list(
+                executor.map(
+                    _read_range,
+                    itertools.repeat(read.__name__),
+                    itertools.repeat(filepath),
+                    itertools.repeat(header),
+                    ranges,
+                    itertools.repeat(kwargs),
+                )
+            )
+        return _assemble(results)
+
+    return wrapper
+
+
+def split_ranges(filepath: Path, parts: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """Split the rows of a CSV file into byte ranges ending at line ends.
+
+    The file is split into up to `parts` ranges of at least
+    `MIN_RANGE_SIZE` bytes. Quoted fields spanning lines are not supported,
+    and the data files have none.
+
+    Returns:
+        Tuple[bytes, List[Tuple[int, int]]]: The header line, and the start
+            and end offsets of the ranges.
+    """
+    with open(filepath, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        parts = max(1, min(parts, (size - start) // MIN_RANGE_SIZE))
+        bounds = [start]
+        for part in range(1, parts):
+            f.seek(start + (size - start) * part // parts)
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+    bounds.append(size)
+    return header, list(zip(bounds[:-1], bounds[1:]))
+
+
+def _read_range(
+    name: str, filepath: Path, header: bytes, byte_range: Tuple[int, int], kwargs: Dict
+):
+    """Parse a byte range of a file in a worker, with the reader `name`."""
+    start, end = byte_range
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # The public reader, as the decorated functions cannot be pickled
+    return _to_arrow(globals()[name](io.BytesIO(header + data), **kwargs))
+
+
+def _normalize_bond_types(bond_types: pd.Series) -> pd.Series:
+    """Apply `normalize_bond_type` to a column, once per distinct name.
+
+    Returns:
+        pd.Series: A categorical over the `BondType` names, in their
+            declaration order, followed by any name with no mapping.
+    """
+    codes, names = pd.factorize(bond_types)
+    normalized = [normalize_bond_type(name) for name in names]
+    categories = [bond_type.value for bond_type in BondType]
+    categories += sorted(
+        {name for name in normalized if name is not None} - set(categories)
+    )
+    positions = {name: i for i, name in enumerate(categories)}
+    # The missing values' code, -1, takes the last (missing) entry
+    mapping = np.array([positions.get(name, -1) for name in normalized] + [-1])
+    return pd.Series(
+        pd.Categorical.from_codes(mapping[codes], categories),
+        index=bond_types.index,
+        name=bond_types.name,
+    )
 
 
+def _read_csv(
+    filepath: Path,
+    chunksize: Optional[int],
+    engine: str,
+    schema: CompiledSchema,
+    usecols: Optional[List[str]] = None,
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """Parse a source CSV file with the requested engine.
+
+    Only the `usecols` columns are parsed, if given. Both engines convert
+    every column to its type in `schema`, so they return the same dtypes
+    however the values of a file, or of a chunk, look: the C engine parses
+    them to `PANDAS_DTYPES` and then parses the dates (see `_parse_dates`).
+    """
+    if engine == "c":
+        data = pd.read_csv(
+            open_source(filepath),
+            sep=";",
+            decimal=",",
+            usecols=usecols,
+            dtype={
+                name: PANDAS_DTYPES[dtype] for name, dtype in schema.dtypes.items()
+            },
+            chunksize=chunksize,
+        )
+        if chunksize is None:
+            return _parse_dates(data, schema.date_formats)
+        return (_parse_dates(chunk, schema.date_formats) for chunk in data)
+    if engine != "pyarrow":
+        raise ValueError(f"engine must be one of {ENGINES}")
+
+    columnar.require_pyarrow()
+    pa = columnar.pa
+    types = {
+        "str": pa.string(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        # Microseconds, as `pd.read_csv` parses dates to
+        "date": pa.timestamp("us"),
+    }
+    source = open_source(filepath)
+    if isinstance(source, (str, os.PathLike)):
+        # Lets pyarrow decompress `.gz` and `.zst` files
+        source = str(source)
+    options = dict(
+        read_options=columnar.pa_csv.ReadOptions(block_size=PYARROW_BLOCK_SIZE),
+        parse_options=columnar.pa_csv.ParseOptions(delimiter=";"),
+        convert_options=columnar.pa_csv.ConvertOptions(
+            column_types={
+                name: types[dtype] for name, dtype in schema.dtypes.items()
+            },
+            include_columns=usecols,
+            timestamp_parsers=sorted(set(schema.date_formats.values())),
+            decimal_point=",",
+            strings_can_be_null=True,
+        ),
+    )
+    if chunksize is None:
+        return _arrow_to_pandas(columnar.pa_csv.read_csv(source, **options))
+    return _iter_arrow_chunks(columnar.pa_csv.open_csv(source, **options), chunksize)
+
+
+def _read(
+    filepath: Path,
+    dataset: str,
+    chunksize: Optional[int],
+    engine: str,
+    columns: Optional[List[ColumnName]],
+    filters: Optional[Filters],
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """Parse a source file of `dataset`, normalize it and select its rows.
+
+    This is the engine behind every `read_*` function, driven by the
+    dataset's `SCHEMAS` entry. Only the columns needed by `columns` and
+    `filters` are parsed, and the filters are applied to each chunk as soon
+    as it is normalized.
+    """
+    schema = SCHEMAS[dataset]
+    needed = selection.needed_columns(columns, filters)
+    usecols = None
+    if needed is not None:
+        usecols = [source for source, name in schema.rename.items() if name in needed]
+    data = _read_csv(filepath, chunksize, engine, schema, usecols)
+
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        df = df.rename(columns=schema.rename)
+        for name, domain in schema.domains.items():
+            if name in df:
+                df[name] = _apply_domain(df[name], domain)
+        return df
+
+    if chunksize is None:
+        return selection.select(_normalize(data), columns, filters)
+    return selection.iter_select(
+        (_normalize(chunk) for chunk in data), columns, filters
+    )
+
+
+def _apply_domain(series: pd.Series, domain: Type[enum.Enum]) -> pd.Series:
+    """Restrict a column to the values of its `SourceColumn.domain`."""
+    if domain is BondType:
+        return _normalize_bond_types(series)
+    values = series.map({member.value: member.value for member in domain})
+    return values.astype(PANDAS_DTYPES["str"])
+
+
+def _parse_dates(df: pd.DataFrame, formats: Dict[str, str]) -> pd.DataFrame:
+    """Parse the date columns of a DataFrame, each in its `formats` entry.
+
+    The columns hold a few thousand distinct dates over millions of rows, so
+    each distinct string is parsed once and the result broadcast to the rows
+    through their factorization codes.
+    """
+    for name, date_format in formats.items():
+        if name not in df.columns:
+            continue
+        codes, uniques = pd.factorize(df[name])
+        dates = pd.to_datetime(uniques, format=date_format).astype(DATE_DTYPE)
+        # The missing values' code, -1, becomes NaT
+        df[name] = dates.take(codes, allow_fill=True, fill_value=pd.NaT)
+    return df
+
+
+def _arrow_to_pandas(table) -> pd.DataFrame:
+    """Convert a parsed table to the `PANDAS_DTYPES` and `DATE_DTYPE` types."""
+    types = {
+        columnar.pa.int64(): pd.Int64Dtype(),
+        columnar.pa.string(): PANDAS_DTYPES["str"],
+    }
+    df = table.to_pandas(types_mapper=types.get)
+    for name in table.schema.names:
+        if columnar.pa.types.is_timestamp(table.schema.field(name).type):
+            df[name] = df[name].astype(DATE_DTYPE)
+    return df
+
+
+def _iter_arrow_chunks(batches, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Regroup the record batches of a CSV stream into `chunksize` rows."""
+    pending = []
+    rows = 0
+    start = 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            table = columnar.pa.Table.from_batches(pending)
+            df = _arrow_to_pandas(table.slice(0, chunksize))
+            rest = table.slice(chunksize)
+            pending = rest.to_batches()
+            rows = rest.num_rows
+            # Continue the row numbering across chunks, as `pd.read_csv` does
+            df.index = pd.RangeIndex(start, start + len(df))
+            start += len(df)
+            yield df
+    if rows:
+        df = _arrow_to_pandas(columnar.pa.Table.from_batches(pending))
+        df.index = pd.RangeIndex(start, start + len(df))
+        yield df
+
+
+@compactable
+@cached
+@parallelizable
 def read_prices(
-    filepath: Path, chunksize: Optional[int] = None
+    filepath: Path,
+    chunksize: Optional[int] = None,
+    engine: str = "c",
+    columns: Optional[List[ColumnName]] = None,
+    filters: Optional[Filters] = None,
 ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """Read bond prices and rates (Taxas e Preços dos Títulos).
 
     Parses the daily prices and yields for government bonds.
 
-    Args:
-        filepath: Path to the CSV file.
-        chunksize: Number of lines to read from the CSV file at a time.
-
     Returns:
         pd.DataFrame or Iterator[pd.DataFrame]: DataFrame with columns:
             - reference_date: Date of the record
-            - bond_type: Name of the bond (e.g., Tesouro Selic)
+            - bond_type: Name of the bond (categorical, e.g., Tesouro Selic)
             - maturity_date: Maturity date of the bond
             - buy_yield: Yield for buying
             - sell_yield: Yield for selling
@@ -62,104 +548,49 @@ def read_prices(
             - sell_price: Price for selling
             - base_price: Base price
     """
-    data = pd.read_csv(
-        filepath,
-        sep=";",
-        decimal=",",
-        parse_dates=["Data Vencimento", "Data Base"],
-        dayfirst=True,
-        chunksize=chunksize,
-    )
-
-    def _process(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.rename(
-            columns={
-                "Data Base": Column.REFERENCE_DATE.value,
-                "Tipo Titulo": Column.BOND_TYPE.value,
-                "Data Vencimento": Column.MATURITY_DATE.value,
-                "Taxa Compra Manha": Column.BUY_YIELD.value,
-                "Taxa Venda Manha": Column.SELL_YIELD.value,
-                "PU Compra Manha": Column.BUY_PRICE.value,
-                "PU Venda Manha": Column.SELL_PRICE.value,
-                "PU Base Manha": Column.BASE_PRICE.value,
-            }
-        )
-        df[Column.BOND_TYPE.value] = df[Column.BOND_TYPE.value].apply(
-            normalize_bond_type
-        )
-        return df
-
-    if chunksize is None:
-        return _process(data)
-    return (_process(chunk) for chunk in data)
+    return _read(filepath, "prices", chunksize, engine, columns, filters)
 
 
+@compactable
+@cached
+@parallelizable
 def read_stock(
-    filepath: Path, chunksize: Optional[int] = None
+    filepath: Path,
+    chunksize: Optional[int] = None,
+    engine: str = "c",
+    columns: Optional[List[ColumnName]] = None,
+    filters: Optional[Filters] = None,
 ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """Read bond stock (Estoque).
 
     Parses the monthly stock of government bonds.
 
-    Args:
-        filepath: Path to the CSV file.
-        chunksize: Number of lines to read from the CSV file at a time.
-
     Returns:
         pd.DataFrame or Iterator[pd.DataFrame]: DataFrame with columns:
-            - bond_type: Name of the bond
+            - bond_type: Name of the bond (categorical)
             - maturity_date: Maturity date of the bond
             - stock_month: Month of the stock record
             - unit_price: Unit price of the bond
             - quantity: Quantity of bonds in stock
             - stock_value: Total value of the stock
     """
-    # 'Mes Estoque' is in format %m/%Y (e.g. 11/2021)
-    # 'Vencimento do Titulo' is in format %d/%m/%Y
-    # It's better to read as strings first and convert manually to avoid warnings/ambiguities
-    data = pd.read_csv(
-        filepath,
-        sep=";",
-        decimal=",",
-        chunksize=chunksize,
-    )
-
-    def _process(df: pd.DataFrame) -> pd.DataFrame:
-        df["Vencimento do Titulo"] = pd.to_datetime(
-            df["Vencimento do Titulo"], dayfirst=True
-        )
-        df["Mes Estoque"] = pd.to_datetime(df["Mes Estoque"], format="%m/%Y")
-        df = df.rename(
-            columns={
-                "Tipo Titulo": Column.BOND_TYPE.value,
-                "Vencimento do Titulo": Column.MATURITY_DATE.value,
-                "Mes Estoque": Column.STOCK_MONTH.value,
-                "PU": Column.UNIT_PRICE.value,
-                "Quantidade": Column.QUANTITY.value,
-                "Valor Estoque": Column.STOCK_VALUE.value,
-            }
-        )
-        df[Column.BOND_TYPE.value] = df[Column.BOND_TYPE.value].apply(
-            normalize_bond_type
-        )
-        return df
-
-    if chunksize is None:
-        return _process(data)
-    return (_process(chunk) for chunk in data)
+    return _read(filepath, "stock", chunksize, engine, columns, filters)
 
 
+@compactable
+@cached
+@parallelizable
 def read_investors(
-    filepath: Path, chunksize: Optional[int] = None
+    filepath: Path,
+    chunksize: Optional[int] = None,
+    engine: str = "c",
+    columns: Optional[List[ColumnName]] = None,
+    filters: Optional[Filters] = None,
 ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """Read investors data (Investidores).
 
     Parses the list of investors registered in Tesouro Direto.
 
-    Args:
-        filepath: Path to the CSV file.
-        chunksize: Number of lines to read from the CSV file at a time.
-
     Returns:
         pd.DataFrame or Iterator[pd.DataFrame]: DataFrame with columns:
             - investor_id: Unique identifier for the investor
@@ -174,72 +605,28 @@ def read_investors(
             - account_status: Account status (Active/Deactivated)
             - traded_last_12_months: Whether traded in last 12 months
     """
-    data = pd.read_csv(
-        filepath,
-        sep=";",
-        parse_dates=["Data de Adesao"],
-        dayfirst=True,
-        chunksize=chunksize,
-    )
-
-    def _process(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.rename(
-            columns={
-                "Codigo do Investidor": Column.INVESTOR_ID.value,
-                "Data de Adesao": Column.JOIN_DATE.value,
-                "Estado Civil": Column.MARITAL_STATUS.value,
-                "Genero": Column.GENDER.value,
-                "Profissao": Column.PROFESSION.value,
-                "Idade": Column.AGE.value,
-                "UF do Investidor": Column.STATE.value,
-                "Cidade do Investidor": Column.CITY.value,
-                "Pais do Investidor": Column.COUNTRY.value,
-                "Situacao da Conta": Column.ACCOUNT_STATUS.value,
-                "Operou 12 Meses": Column.TRADED_LAST_12_MONTHS.value,
-            }
-        )
-
-        # Map categorical values to enum values for better semantics
-        # Keep original values for MaritalStatus as they're already descriptive
-
-        # Map gender codes to enum values
-        gender_map = {e.value: e.value for e in Gender}
-        df[Column.GENDER.value] = df[Column.GENDER.value].map(gender_map)
-
-        # Map account status codes to enum values
-        status_map = {e.value: e.value for e in AccountStatus}
-        df[Column.ACCOUNT_STATUS.value] = df[Column.ACCOUNT_STATUS.value].map(
-            status_map
-        )
-
-        # Map traded last 12 months codes to enum values
-        traded_map = {e.value: e.value for e in TradedLast12Months}
-        df[Column.TRADED_LAST_12_MONTHS.value] = df[
-            Column.TRADED_LAST_12_MONTHS.value
-        ].map(traded_map)
-        return df
-
-    if chunksize is None:
-        return _process(data)
-    return (_process(chunk) for chunk in data)
+    return _read(filepath, "investors", chunksize, engine, columns, filters)
 
 
+@compactable
+@cached
+@parallelizable
 def read_operations(
-    filepath: Path, chunksize: Optional[int] = None
+    filepath: Path,
+    chunksize: Optional[int] = None,
+    engine: str = "c",
+    columns: Optional[List[ColumnName]] = None,
+    filters: Optional[Filters] = None,
 ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """Read operations data (Operações).
 
     Parses the history of buy/sell/custody operations.
 
-    Args:
-        filepath: Path to the CSV file.
-        chunksize: Number of lines to read from the CSV file at a time.
-
     Returns:
         pd.DataFrame or Iterator[pd.DataFrame]: DataFrame with columns:
             - investor_id: Investor ID
             - operation_date: Date of the operation
-            - bond_type: Bond type
+            - bond_type: Bond type (categorical)
             - maturity_date: Maturity date
             - quantity: Quantity traded
             - bond_value: Unit value of the bond
@@ -247,205 +634,233 @@ def read_operations(
             - operation_type: Type (Buy, Sell, etc.)
             - channel: Channel used (Site, Homebroker)
     """
-    data = pd.read_csv(
-        filepath,
-        sep=";",
-        decimal=",",
-        parse_dates=["Data da Operacao", "Vencimento do Titulo"],
-        dayfirst=True,
-        chunksize=chunksize,
-    )
-
-    def _process(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.rename(
-            columns={
-                "Codigo do Investidor": Column.INVESTOR_ID.value,
-                "Data da Operacao": Column.OPERATION_DATE.value,
-                "Tipo Titulo": Column.BOND_TYPE.value,
-                "Vencimento do Titulo": Column.MATURITY_DATE.value,
-                "Quantidade": Column.QUANTITY.value,
-                "Valor do Titulo": Column.BOND_VALUE.value,
-                "Valor da Operacao": Column.OPERATION_VALUE.value,
-                "Tipo da Operacao": Column.OPERATION_TYPE.value,
-                "Canal da Operacao": Column.CHANNEL.value,
-            }
-        )
-
-        # Map channel codes to enum values
-        channel_map = {e.value: e.value for e in Channel}
-        df[Column.CHANNEL.value] = df[Column.CHANNEL.value].map(channel_map)
-
-        df[Column.BOND_TYPE.value] = df[Column.BOND_TYPE.value].apply(
-            normalize_bond_type
-        )
-        return df
-
-    if chunksize is None:
-        return _process(data)
-    return (_process(chunk) for chunk in data)
+    return _read(filepath, "operations", chunksize, engine, columns, filters)
 
 
+@compactable
+@cached
+@parallelizable
 def read_sales(
-    filepath: Path, chunksize: Optional[int] = None
+    filepath: Path,
+    chunksize: Optional[int] = None,
+    engine: str = "c",
+    columns: Optional[List[ColumnName]] = None,
+    filters: Optional[Filters] = None,
 ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """Read sales data (Vendas).
 
     Parses the history of bond sales (investments).
 
-    Args:
-        filepath: Path to the CSV file.
-        chunksize: Number of lines to read from the CSV file at a time.
-
     Returns:
         pd.DataFrame or Iterator[pd.DataFrame]: DataFrame with columns:
-            - bond_type: Bond type
+            - bond_type: Bond type (categorical)
             - maturity_date: Maturity date
             - sale_date: Date of the sale
             - unit_price: Unit price
             - quantity: Quantity sold
             - value: Total value
     """
-    data = pd.read_csv(
-        filepath,
-        sep=";",
-        decimal=",",
-        parse_dates=["Vencimento do Titulo", "Data Venda"],
-        dayfirst=True,
-        chunksize=chunksize,
-    )
-
-    def _process(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.rename(
-            columns={
-                "Tipo Titulo": Column.BOND_TYPE.value,
-                "Vencimento do Titulo": Column.MATURITY_DATE.value,
-                "Data Venda": Column.SALE_DATE.value,
-                "PU": Column.UNIT_PRICE.value,
-                "Quantidade": Column.QUANTITY.value,
-                "Valor": Column.VALUE.value,
-            }
-        )
-        df[Column.BOND_TYPE.value] = df[Column.BOND_TYPE.value].apply(
-            normalize_bond_type
-        )
-        return df
-
-    if chunksize is None:
-        return _process(data)
-    return (_process(chunk) for chunk in data)
+    return _read(filepath, "sales", chunksize, engine, columns, filters)
 
 
+@compactable
+@cached
+@parallelizable
 def read_buybacks(
-    filepath: Path, chunksize: Optional[int] = None
+    filepath: Path,
+    chunksize: Optional[int] = None,
+    engine: str = "c",
+    columns: Optional[List[ColumnName]] = None,
+    filters: Optional[Filters] = None,
 ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """Read buybacks data (Resgates).
 
     Parses the history of bond buybacks/redemptions.
 
-    Args:
-        filepath: Path to the CSV file.
-        chunksize: Number of lines to read from the CSV file at a time.
-
     Returns:
         pd.DataFrame or Iterator[pd.DataFrame]: DataFrame with columns:
-            - bond_type: Bond type
+            - bond_type: Bond type (categorical)
             - maturity_date: Maturity date
             - buyback_date: Date of the buyback
             - quantity: Quantity redeemed
             - value: Total value
     """
-    data = pd.read_csv(
-        filepath,
-        sep=";",
-        decimal=",",
-        parse_dates=["Vencimento do Titulo", "Data Resgate"],
-        dayfirst=True,
-        chunksize=chunksize,
-    )
-
-    def _process(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.rename(
-            columns={
-                "Tipo Titulo": Column.BOND_TYPE.value,
-                "Vencimento do Titulo": Column.MATURITY_DATE.value,
-                "Data Resgate": Column.BUYBACK_DATE.value,
-                "Quantidade": Column.QUANTITY.value,
-                "Valor": Column.VALUE.value,
-            }
-        )
-        df[Column.BOND_TYPE.value] = df[Column.BOND_TYPE.value].apply(
-            normalize_bond_type
-        )
-        return df
-
-    if chunksize is None:
-        return _process(data)
-    return (_process(chunk) for chunk in data)
+    return _read(filepath, "buybacks", chunksize, engine, columns, filters)
 
 
+@compactable
+@cached
+@parallelizable
 def read_maturities(
-    filepath: Path, chunksize: Optional[int] = None
+    filepath: Path,
+    chunksize: Optional[int] = None,
+    engine: str = "c",
+    columns: Optional[List[ColumnName]] = None,
+    filters: Optional[Filters] = None,
 ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """Read maturities data (Vencimentos).
 
     Parses the history of bond maturities.
 
-    Args:
-        filepath: Path to the CSV file.
-        chunksize: Number of lines to read from the CSV file at a time.
-
     Returns:
         pd.DataFrame or Iterator[pd.DataFrame]: DataFrame with columns:
-            - bond_type: Bond type
+            - bond_type: Bond type (categorical)
             - maturity_date: Maturity date
-            - buyback_date: Date of the maturity/redemption
+            - redemption_date: Date of the maturity/redemption
             - unit_price: Unit price
             - quantity: Quantity matured
             - value: Total value
     """
-    data = pd.read_csv(
-        filepath,
-        sep=";",
-        decimal=",",
-        parse_dates=["Vencimento do Titulo", "Data Resgate"],
-        dayfirst=True,
-        chunksize=chunksize,
-    )
-
-    def _process(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.rename(
-            columns={
-                "Tipo Titulo": Column.BOND_TYPE.value,
-                "Vencimento do Titulo": Column.MATURITY_DATE.value,
-                "Data Resgate": Column.BUYBACK_DATE.value,
-                "PU": Column.UNIT_PRICE.value,
-                "Quantidade": Column.QUANTITY.value,
-                "Valor": Column.VALUE.value,
-            }
-        )
-        df[Column.BOND_TYPE.value] = df[Column.BOND_TYPE.value].apply(
-            normalize_bond_type
-        )
-        return df
-
-    if chunksize is None:
-        return _process(data)
-    return (_process(chunk) for chunk in data)
+    return _read(filepath, "maturities", chunksize, engine, columns, filters)
 
 
+@compactable
+@cached
+@parallelizable
 def read_interest_coupons(
-    filepath: Path, chunksize: Optional[int] = None
+    filepath: Path,
+    chunksize: Optional[int] = None,
+    engine: str = "c",
+    columns: Optional[List[ColumnName]] = None,
+    filters: Optional[Filters] = None,
 ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """Read interest coupons data (Pagamento de Cupom de Juros).
 
     Parses the history of interest coupon payments.
     This file shares the same structure as the maturities file.
 
+    Returns:
+        pd.DataFrame or Iterator[pd.DataFrame]: DataFrame with columns similar to `read_maturities`.
+    """
+    return _read(
+        filepath, "interest_coupons", chunksize, engine, columns, filters
+    )
+
+
+# Reader of each dataset, keyed by the slug prefix of its resources' names
+# (see `storage.generate_filename`)
+READERS = {
+    "taxas-dos-titulos-ofertados": read_prices,
+    "estoque-do-tesouro-direto": read_stock,
+    "investidores-do-tesouro-direto": read_investors,
+    "operacoes-do-tesouro-direto": read_operations,
+    "vendas-do-tesouro-direto": read_sales,
+    "recompras-do-tesouro-direto": read_buybacks,
+    "vencimentos-do-tesouro-direto": read_maturities,
+    "pagamento-de-cupom-de-juros-do-tesouro-direto": read_interest_coupons,
+}
+
+
+# Reader of each dataset, by the dataset names of `read_many` (the same as
+# in `tddata.partitioned.DATASETS`)
+DATASET_READERS = {
+    "prices": read_prices,
+    "stock": read_stock,
+    "investors": read_investors,
+    "operations": read_operations,
+    "sales": read_sales,
+    "buybacks": read_buybacks,
+    "maturities": read_maturities,
+    "interest_coupons": read_interest_coupons,
+}
+
+
+def read_many(
+    dataset: str,
+    files: Iterable[Path],
+    workers: Optional[int] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Read several files of a dataset, such as its yearly files, in parallel.
+
+    Each file is parsed in its own worker process and sent back as Arrow
+    record batches, which are assembled into the result in a single
+    allocation, instead of concatenating DataFrames. Categoricals are
+    unified across files, so they stay categoricals.
+
+    Without `pyarrow`, the DataFrames themselves are sent back and
+    concatenated by pandas, after unifying their categoricals.
+
     Args:
-        filepath: Path to the CSV file.
-        chunksize: Number of lines to read from the CSV file at a time.
+        dataset: One of the keys of `DATASET_READERS`, e.g. "operations".
+        files: The files to read, in the order of the result's rows.
+        workers: Number of worker processes (default: number of CPUs). With
+            1, the files are read in this process.
+        **kwargs: Further arguments of the dataset's reader, such as
+            `columns`, `filters` or `cache`.
 
     Returns:
-        pd.DataFrame or Iterator[pd.DataFrame]: DataFrame with columns similar to `read_maturities`.
+        pd.DataFrame: The rows of all the files, numbered from 0.
+    """
+    files = list(files)
+    if not files:
+        return pd.DataFrame()
+    if workers == 1 or len(files) == 1:
+        results = [_read_file(dataset, filepath, kwargs) for filepath in files]
+    else:
+        workers = min(workers or os.cpu_count() or 1, len(files))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    _read_file,
+                    itertools.repeat(dataset),
+                    files,
+                    itertools.repeat(kwargs),
+                )
+            )
+
+    return _assemble(results)
+
+
+def _read_file(dataset: str, filepath: Path, kwargs: Dict):
+    """Read a file in a worker, as `_to_arrow` sends it back."""
+    return _to_arrow(DATASET_READERS[dataset](filepath, **kwargs))
+
+
+def _to_arrow(df: pd.DataFrame):
+    """Serialize a worker's result as an Arrow IPC stream, if `pyarrow` is installed."""
+    if columnar.pa is None:
+        return df
+    table = columnar.pa.Table.from_pandas(df, preserve_index=False)
+    sink = columnar.pa.BufferOutputStream()
+    with columnar.pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _assemble(results: List) -> pd.DataFrame:
+    """Put the results of `_to_arrow` back together, in order."""
+    if columnar.pa is None:
+        return _concat_frames(results)
+    tables = [columnar.pa.ipc.open_stream(buffer).read_all() for buffer in results]
+    table = columnar.pa.concat_tables(tables, promote_options="permissive")
+    return table.unify_dictionaries().to_pandas()
+
+
+def _concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    for name in frames[0].columns:
+        columns = [df[name] for df in frames if name in df]
+        if all(isinstance(column.dtype, pd.CategoricalDtype) for column in columns):
+            # pd.concat only keeps categoricals with identical categories
+            categories = pd.api.types.union_categoricals(columns).categories
+            for df in frames:
+                df[name] = df[name].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def get_reader(name: str) -> Optional[Callable]:
+    """Find the reader function for a resource or file name.
+
+    Args:
+        name: A CKAN resource name (e.g. "Operações do Tesouro Direto 2024")
+            or a downloaded file name.
+
+    Returns:
+        Callable | None: The matching `read_*` function, or None if the
+            resource does not belong to a known dataset.
     """
-    return read_maturities(filepath, chunksize=chunksize)
+    slug = slugify(name)
+    for prefix, read in READERS.items():
+        if slug.startswith(prefix):
+            return read
+    return None
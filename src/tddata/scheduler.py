@@ -0,0 +1,206 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Retry and rate limiting for the downloader.
+
+A `Scheduler` wraps every request of a download run. It paces the requests
+sent to each host with a token bucket, retries transient failures (timeouts,
+connection errors, 5xx and 429 responses) with exponential backoff and full
+jitter, and caps the total number of retries of the run with a retry
+budget. Requests that still fail are recorded in `Scheduler.failures`, so a
+run can report them instead of silently losing files.
+"""
+
+import asyncio
+import email.utils
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 10
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_RETRY_BUDGET = 100
+
+RETRY_STATUS_CODES = {408, 416, 425, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """A failure that is worth retrying, raised by the downloader itself."""
+
+
+class TokenBucket:
+    """Token bucket limiting the rate of requests sent to a host.
+
+    Args:
+        rate: Tokens added per second, i.e. the sustained request rate.
+        burst: Maximum number of tokens, i.e. the largest burst of requests.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        # The lock makes waiters take tokens in arrival order
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a request failure is transient and worth retrying."""
+    if isinstance(error, (httpx.TransportError, RetryableError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUS_CODES
+    return False
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Delay in seconds requested by a `Retry-After` header, if any."""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class Scheduler:
+    """Per-host rate limiting and retries with backoff for a download run.
+
+    Args:
+        rate: Sustained requests per second allowed to each host.
+        burst: Maximum burst of requests to each host.
+        max_attempts: Attempts per request, including the first one.
+        base_delay: Backoff delay in seconds before the first retry; it
+            doubles with every further attempt.
+        max_delay: Upper bound of the backoff delay in seconds.
+        retry_budget: Maximum number of retries in the whole run. Once
+            exhausted, failures are no longer retried, so a struggling
+            server is not hammered.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        retry_budget: int = DEFAULT_RETRY_BUDGET,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.retries = 0
+        self.failures: List[Dict] = []
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def backoff(self, attempt: int) -> float:
+        """Backoff delay before retry number `attempt`, with full jitter."""
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+    async def call(self, url: str, request: Callable[[], Awaitable[T]]) -> T:
+        """Run `request` against the host of `url`, retrying transient errors.
+
+        Args:
+            url: The url requested, whose host is rate limited.
+            request: A function returning a new awaitable for each attempt.
+
+        Returns:
+            The result of the first successful attempt.
+
+        Raises:
+            Exception: The error of the last attempt, once the attempts or
+                the retry budget are exhausted or the error is permanent.
+        """
+        # Buckets hold asyncio locks, which belong to a single event loop
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._buckets = {}
+            self._loop = loop
+
+        host = httpx.URL(url).host
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket = self._buckets[host]
+
+        attempt = 1
+        while True:
+            await bucket.acquire()
+            try:
+                return await request()
+            except Exception as error:
+                if (
+                    attempt >= self.max_attempts
+                    or self.retries >= self.retry_budget
+                    or not is_retryable(error)
+                ):
+                    raise
+                self.retries += 1
+                delay = _retry_after(error)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                await asyncio.sleep(min(delay, self.max_delay))
+                attempt += 1
+
+    def record_failure(self, url: str, error: Exception, **details):
+        """Record a request that failed permanently."""
+        self.failures.append({"url": url, "error": f"{error}", **details})
+
+    def report(self) -> str:
+        """Human readable summary of the permanently failed requests."""
+        if not self.failures:
+            return "All requests succeeded."
+        lines = [f"{len(self.failures)} requests failed permanently:"]
+        for failure in self.failures:
+            name = failure.get("name") or failure.get("dataset_id")
+            lines.append(f"  {name} ({failure['url']}): {failure['error']}")
+        return "\n".join(lines)
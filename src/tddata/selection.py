@@ -0,0 +1,205 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Column projection and row filters of the readers.
+
+The `columns` and `filters` arguments of the `reader.read_*` functions use
+the standardized column names (`Column` members or their values). Filters
+map a column to a condition:
+
+    filters = {
+        Column.BOND_TYPE: "Tesouro Selic",                  # equal to
+        Column.OPERATION_TYPE: ["C", "V"],                  # one of
+        Column.OPERATION_DATE: ("2024-01-01", "2024-06-30"),  # in range
+        Column.INVESTOR_ID: {123, 456},                     # one of
+    }
+
+A tuple is an inclusive range, either end of which may be None; a list or
+set is a set of values; anything else is a single value. Values of date
+columns may be given as strings or dates, in any of the three forms. All the
+conditions must hold.
+
+Readers parsing a CSV only parse the columns needed and filter each chunk
+as it is read; cached reads push the filters down into Parquet.
+"""
+
+import datetime as dt
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .constants import DATASET_SCHEMAS, Column
+
+ColumnName = Union[Column, str]
+Filters = Dict[ColumnName, Any]
+
+# The standardized columns holding dates, whose filter values are converted
+# to timestamps
+DATE_COLUMNS = frozenset(
+    source_column.column.value
+    for source_columns in DATASET_SCHEMAS.values()
+    for source_column in source_columns
+    if source_column.dtype == "date"
+)
+
+
+def column_name(column: ColumnName) -> str:
+    """Return the standardized name of a column given as a `Column`."""
+    return column.value if isinstance(column, Column) else column
+
+
+def normalize_columns(columns: Optional[Iterable[ColumnName]]) -> Optional[List[str]]:
+    """Return the names of the selected columns, or None for all."""
+    if columns is None:
+        return None
+    return [column_name(column) for column in columns]
+
+
+def normalize_filters(filters: Optional[Filters]) -> Dict[str, Tuple[str, Any]]:
+    """Turn filters into `{name: (kind, value)}`.
+
+    The kind is "range", "in" or "==". Values of `DATE_COLUMNS` given as
+    strings or dates are converted to timestamps, so they compare with the
+    parsed dates both in pandas and in Parquet; other values are kept.
+    """
+    normalized = {}
+    for column, condition in (filters or {}).items():
+        name = column_name(column)
+        convert = _to_timestamp if name in DATE_COLUMNS else _keep
+        if isinstance(condition, tuple):
+            start, end = condition
+            normalized[name] = ("range", (convert(start), convert(end)))
+        elif isinstance(condition, (list, set, frozenset)):
+            normalized[name] = ("in", [convert(value) for value in condition])
+        else:
+            normalized[name] = ("==", convert(condition))
+    return normalized
+
+
+def _to_timestamp(value: Any) -> Any:
+    if isinstance(value, (str, dt.date)):
+        return pd.Timestamp(value)
+    return value
+
+
+def _keep(value: Any) -> Any:
+    return value
+
+
+def needed_columns(
+    columns: Optional[Iterable[ColumnName]], filters: Optional[Filters]
+) -> Optional[List[str]]:
+    """Return the columns to read to select `columns` and apply `filters`.
+
+    Returns:
+        List[str] | None: The column names, or None if all are needed.
+    """
+    columns = normalize_columns(columns)
+    if columns is None:
+        return None
+    return list(dict.fromkeys(columns + list(normalize_filters(filters))))
+
+
+def apply(
+    df: pd.DataFrame,
+    columns: Optional[Iterable[ColumnName]] = None,
+    filters: Optional[Filters] = None,
+) -> pd.DataFrame:
+    """Keep the rows of `df` matching `filters`, then the `columns`.
+
+    The row labels of `df` are kept.
+    """
+    mask = None
+    for name, (kind, value) in normalize_filters(filters).items():
+        series = df[name]
+        if kind == "range":
+            condition = _in_range(series, *value)
+        elif kind == "in":
+            condition = series.isin(value)
+        else:
+            condition = series == value
+        mask = condition if mask is None else mask & condition
+    if mask is not None:
+        df = df[mask.fillna(False).astype(bool)]
+    columns = normalize_columns(columns)
+    if columns is not None:
+        df = df[columns]
+    return df
+
+
+def _in_range(series: pd.Series, start: Any, end: Any) -> pd.Series:
+    """Whether each value of `series` is between `start` and `end`."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Unordered categoricals cannot be compared: compare the categories
+        # and broadcast the result through the codes, -1 (missing) to False
+        inside = _in_range(pd.Series(series.cat.categories), start, end)
+        inside = np.append(inside.to_numpy(dtype=bool), False)
+        return pd.Series(inside[series.cat.codes.to_numpy()], index=series.index)
+    condition = pd.Series(True, index=series.index)
+    if start is not None:
+        condition &= series >= start
+    if end is not None:
+        condition &= series <= end
+    return condition
+
+
+def select(
+    df: pd.DataFrame,
+    columns: Optional[Iterable[ColumnName]] = None,
+    filters: Optional[Filters] = None,
+) -> pd.DataFrame:
+    """Apply the selection to a whole DataFrame, renumbering the rows kept."""
+    df = apply(df, columns, filters)
+    if filters:
+        df = df.reset_index(drop=True)
+    return df
+
+
+def iter_select(
+    chunks: Iterable[pd.DataFrame],
+    columns: Optional[Iterable[ColumnName]] = None,
+    filters: Optional[Filters] = None,
+) -> Iterator[pd.DataFrame]:
+    """Apply the selection to each chunk of a chunked read.
+
+    Chunks left without rows are skipped, and the rows kept are numbered
+    continuously across chunks, as `pd.read_csv` numbers them.
+    """
+    start = 0
+    for chunk in chunks:
+        chunk = apply(chunk, columns, filters)
+        if filters:
+            if chunk.empty:
+                continue
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+        yield chunk
+
+
+def to_arrow_filters(filters: Optional[Filters]) -> Optional[List[Tuple]]:
+    """Convert filters to the DNF filters of `pyarrow.parquet.read_table`."""
+    expressions = []
+    for name, (kind, value) in normalize_filters(filters).items():
+        if kind == "range":
+            start, end = value
+            if start is not None:
+                expressions.append((name, ">=", start))
+            if end is not None:
+                expressions.append((name, "<=", end))
+        else:
+            expressions.append((name, kind, value))
+    return expressions or None
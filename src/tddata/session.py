@@ -0,0 +1,149 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Pooled HTTP session shared by CKAN metadata requests and file downloads.
+
+A `Session` owns one keep-alive connection pool, so every `package_show`
+call and every file download of a run reuse the same TCP/TLS connections to
+the Tesouro Transparente server instead of paying a new handshake each time.
+"""
+
+import asyncio
+from typing import Optional
+
+import httpx
+
+from .constants import CKAN_API_URL, HTTP_HEADERS
+
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+
+class Session:
+    """Keep-alive HTTP connection pool for the downloader.
+
+    The session lazily creates a blocking `httpx.Client` (used by
+    `downloader.get_dataset_resources`) and an `httpx.AsyncClient` (used by
+    the async download engine), both sharing the same pool limits, timeouts
+    and headers. Callers may instead hand over their own clients, which are
+    then used as-is and never closed by the session.
+
+    Args:
+        max_connections: Maximum number of open connections.
+        max_keepalive_connections: Maximum number of idle connections kept
+            alive in the pool.
+        keepalive_expiry: Seconds an idle connection is kept alive.
+        timeout: Read/write timeout in seconds.
+        connect_timeout: Connection timeout in seconds.
+        http2: Whether to negotiate HTTP/2, multiplexing requests over a
+            single connection. Requires the `h2` package
+            (`pip install "httpx[http2]"`).
+        client: An optional blocking client to use instead of creating one.
+        async_client: An optional async client to use instead of creating one.
+        api_url: The CKAN `package_show` endpoint. Defaults to
+            `constants.CKAN_API_URL` (overridable with the
+            `TDDATA_CKAN_API_URL` environment variable).
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        http2: bool = False,
+        client: Optional[httpx.Client] = None,
+        async_client: Optional[httpx.AsyncClient] = None,
+        api_url: Optional[str] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # Waiting for a pooled connection is not an error: the downloader
+        # already bounds how many requests are in flight
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout, pool=None)
+        self.http2 = http2
+        self.api_url = api_url or CKAN_API_URL
+
+        self._client = client
+        self._owns_client = client is None
+        self._async_client = async_client
+        self._owns_async_client = async_client is None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _client_options(self) -> dict:
+        return {
+            "headers": HTTP_HEADERS,
+            "limits": self.limits,
+            "timeout": self.timeout,
+            "http2": self.http2,
+            "follow_redirects": True,
+        }
+
+    @property
+    def client(self) -> httpx.Client:
+        """The blocking client, created on first use."""
+        if self._client is None:
+            self._client = httpx.Client(**self._client_options())
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """The async client, created on first use.
+
+        Async connections are bound to the event loop that opened them, so a
+        client created by the session is recreated when used from a new loop
+        (e.g. across successive `asyncio.run` calls).
+        """
+        loop = asyncio.get_running_loop()
+        if self._owns_async_client and self._async_client_loop is not loop:
+            self._async_client = None
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(**self._client_options())
+            self._async_client_loop = loop
+        return self._async_client
+
+    def close(self):
+        """Close the blocking client if it was created by the session."""
+        if self._owns_client and self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        """Close both clients if they were created by the session."""
+        self.close()
+        if self._owns_async_client and self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+
+    def __enter__(self) -> "Session":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self) -> "Session":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
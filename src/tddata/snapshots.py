@@ -0,0 +1,238 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Content-addressed, deduplicated storage of file versions.
+
+Every CKAN refresh creates a new `<slug>@<timestamp>.csv`, even when the
+content barely changed. Snapshots store the content of each version as
+fixed-size chunks in `<data_dir>/objects/`, named by their SHA-256, so a
+chunk shared by several versions is stored once. The version itself becomes
+a small JSON reference, `<slug>@<timestamp>.csv.ref`, listing its chunks.
+
+The yearly files only grow by appending rows, so consecutive versions share
+all their chunks but the last ones.
+
+References are resolved transparently: `storage.get_latest_file(s)` return
+them like plain files, and the `reader.read_*` functions read them through
+`open_snapshot`.
+"""
+
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from . import integrity
+from .storage import REF_SUFFIX
+
+OBJECTS_DIRNAME = "objects"
+REF_VERSION = 1
+
+# Size of the chunks files are split into
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def is_ref(filepath: Union[str, Path]) -> bool:
+    """Whether a path is a snapshot reference."""
+    return str(filepath).endswith(REF_SUFFIX)
+
+
+def get_ref_path(filepath: Path) -> Path:
+    """Return the path of the reference replacing `filepath`."""
+    return filepath.with_name(filepath.name + REF_SUFFIX)
+
+
+def get_object_path(data_dir: Path, object_id: str) -> Path:
+    """Return the path of a chunk in the object store of `data_dir`."""
+    return data_dir / OBJECTS_DIRNAME / object_id[:2] / object_id[2:]
+
+
+def read_ref(ref_path: Path) -> Dict:
+    """Load a snapshot reference."""
+    with open(ref_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def snapshot_file(filepath: Path, chunk_size: int = CHUNK_SIZE) -> Path:
+    """Move a file into the object store, leaving a reference in its place.
+
+    Chunks already in the store are not written again. The reference is
+    written before the file (and its digest sidecar) is removed, so the
+    version is never missing.
+
+    Args:
+        filepath: The file to snapshot, inside the data directory.
+        chunk_size: Size of the chunks the file is split into.
+
+    Returns:
+        Path: The path of the reference, `<filepath>.ref`.
+    """
+    data_dir = filepath.parent
+    hasher = integrity.new_hasher()
+    chunks = []
+    size = 0
+    with open(filepath, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+            size += len(chunk)
+            chunks.append(_write_object(data_dir, chunk))
+
+    ref_path = get_ref_path(filepath)
+    ref = {
+        "version": REF_VERSION,
+        "size": size,
+        "digest": f"{integrity.HASH_ALGORITHM}:{hasher.hexdigest()}",
+        "chunks": chunks,
+    }
+    tmp_path = ref_path.with_name(ref_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(ref, f, indent=2)
+    os.replace(tmp_path, ref_path)
+
+    for algorithm in integrity.HASH_ALGORITHMS:
+        integrity.get_digest_path(filepath, algorithm).unlink(missing_ok=True)
+    filepath.unlink()
+    return ref_path
+
+
+def snapshot_store(data_dir: Path, chunk_size: int = CHUNK_SIZE) -> List[Path]:
+    """Snapshot every plain CSV file of a data directory.
+
+    Returns:
+        List[Path]: The references written.
+    """
+    return [
+        snapshot_file(filepath, chunk_size)
+        for filepath in integrity.iter_data_files(data_dir)
+        # Compressed files would not share chunks across versions
+        if filepath.suffix == ".csv"
+    ]
+
+
+def _write_object(data_dir: Path, chunk: bytes) -> str:
+    object_id = hashlib.sha256(chunk).hexdigest()
+    object_path = get_object_path(data_dir, object_id)
+    if not object_path.exists():
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = object_path.with_name(f"{object_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(chunk)
+        os.replace(tmp_path, object_path)
+    return object_id
+
+
+class _SnapshotReader(io.RawIOBase):
+    """Read the chunks of a reference as a single stream.
+
+    Only the chunk being read is open at any time.
+    """
+
+    def __init__(self, data_dir: Path, chunks: Iterable[str]):
+        self.data_dir = data_dir
+        self.chunks = iter(chunks)
+        self.current: Optional[io.BufferedReader] = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self.current is None:
+                object_id = next(self.chunks, None)
+                if object_id is None:
+                    return 0
+                self.current = open(get_object_path(self.data_dir, object_id), "rb")
+            n = self.current.readinto(buffer)
+            if n:
+                return n
+            self.current.close()
+            self.current = None
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+        super().close()
+
+
+def open_snapshot(ref_path: Path) -> io.BufferedReader:
+    """Open the content of a snapshot reference as a binary file."""
+    ref = read_ref(ref_path)
+    raw = _SnapshotReader(Path(ref_path).parent, ref["chunks"])
+    return io.BufferedReader(raw, buffer_size=integrity.CHUNK_SIZE)
+
+
+def open_source(filepath: Union[str, Path]):
+    """Return what the readers should parse for `filepath`.
+
+    Snapshot references are opened with `open_snapshot`; any other path
+    (or file object) is returned unchanged.
+    """
+    if isinstance(filepath, (str, os.PathLike)) and is_ref(filepath):
+        return open_snapshot(Path(filepath))
+    return filepath
+
+
+def materialize(ref_path: Path, dest: Path) -> Path:
+    """Write the content of a snapshot reference to a plain file."""
+    tmp_path = dest.with_name(dest.name + ".tmp")
+    with open_snapshot(ref_path) as src, open(tmp_path, "wb") as dst:
+        while chunk := src.read(integrity.CHUNK_SIZE):
+            dst.write(chunk)
+    os.replace(tmp_path, dest)
+    return dest
+
+
+def verify_ref(ref_path: Path) -> Dict:
+    """Check the content of a snapshot reference against its digest.
+
+    Returns:
+        Dict: The reference path and a `status`, `ok` or `mismatch` (which
+            includes chunks missing from the object store).
+    """
+    ref = read_ref(ref_path)
+    data_dir = ref_path.parent
+    if not all(get_object_path(data_dir, c).exists() for c in ref["chunks"]):
+        return {"path": ref_path, "status": "mismatch"}
+    algorithm, expected = ref["digest"].split(":", 1)
+    hasher = integrity.new_hasher(algorithm)
+    with open_snapshot(ref_path) as f:
+        while chunk := f.read(integrity.CHUNK_SIZE):
+            hasher.update(chunk)
+    status = "ok" if hasher.hexdigest() == expected else "mismatch"
+    return {"path": ref_path, "status": status}
+
+
+def collect_garbage(data_dir: Path) -> List[Path]:
+    """Remove the chunks no snapshot reference of `data_dir` points to.
+
+    Returns:
+        List[Path]: The chunks removed.
+    """
+    objects_dir = data_dir / OBJECTS_DIRNAME
+    if not objects_dir.exists():
+        return []
+    referenced = set()
+    for ref_path in data_dir.glob(f"*{REF_SUFFIX}"):
+        referenced.update(read_ref(ref_path)["chunks"])
+    removed = []
+    for object_path in sorted(objects_dir.glob("*/*")):
+        if object_path.parent.name + object_path.name not in referenced:
+            object_path.unlink()
+            removed.append(object_path)
+    return removed
@@ -22,11 +22,35 @@ It handles slugification of names, generation of timestamped filenames,
 and retrieval of the latest file versions from a directory.
 """
 
+import concurrent.futures
 import datetime as dt
+import glob
 import re
+import shutil
 import unicodedata
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
+
+PARTIAL_SUFFIX = ".part"
+
+# Suffix of the snapshot references replacing deduplicated files (see
+# `tddata.snapshots`)
+REF_SUFFIX = ".ref"
+
+# Suffixes of compressed files (see `tddata.compression`)
+ZSTD_SUFFIX = ".zst"
+GZIP_SUFFIX = ".gz"
+COMPRESSED_SUFFIXES = (ZSTD_SUFFIX, GZIP_SUFFIX)
+
+# Suffixes a file may carry on top of its extension and still be read as it
+STORED_SUFFIXES = (REF_SUFFIX, *COMPRESSED_SUFFIXES)
+
+# Extensions of the data files kept in a store
+DATA_EXTENSIONS = (
+    ".parquet",
+    ".csv",
+    *(".csv" + suffix for suffix in STORED_SUFFIXES),
+)
 
 
 def slugify(value: str) -> str:
@@ -48,10 +72,12 @@ def slugify(value: str) -> str:
     return re.sub(r"[-\s]+", "-", value)
 
 
-def generate_filename(name: str, last_modified: str | None = None) -> str:
+def generate_filename(
+    name: str, last_modified: str | None = None, extension: str = ".csv"
+) -> str:
     """Generate a standardized filename for a resource.
 
-    The filename format is: `<slugified-name>@<timestamp>.csv`
+    The filename format is: `<slugified-name>@<timestamp><extension>`
     The timestamp format is Compact ISO 8601: `YYYYMMDDTHHMMSS`
 
     Args:
@@ -59,6 +85,7 @@ def generate_filename(name: str, last_modified: str | None = None) -> str:
         last_modified: An optional ISO 8601 timestamp string representing
             the last modification time. If not provided or invalid, the
             current time is used.
+        extension: The file extension, `.csv` by default.
 
     Returns:
         str: The generated filename.
@@ -76,19 +103,99 @@ def generate_filename(name: str, last_modified: str | None = None) -> str:
     else:
         timestamp_str = dt.datetime.now().strftime("%Y%m%dT%H%M%S")
 
-    return f"{name_slug}@{timestamp_str}.csv"
+    return f"{name_slug}@{timestamp_str}{extension}"
+
+
+def extract_year(name: str) -> int | None:
+    """Extract the year a resource or file refers to from its name.
+
+    Yearly resources carry their year in the name, e.g. "Operações do
+    Tesouro Direto 2024" or `operacoes-do-tesouro-direto-2024@<ts>.csv`.
+    The version timestamp after the '@' is ignored.
+
+    Args:
+        name: A resource name or file name.
+
+    Returns:
+        int | None: The last year (19xx or 20xx) found in the name, or None
+            if it has none.
+    """
+    matches = re.findall(r"(?<!\d)((?:19|20)\d{2})(?!\d)", name.split("@")[0])
+    return int(matches[-1]) if matches else None
+
+
+def get_partial_path(filepath: Path) -> Path:
+    """Return the staging path used while `filepath` is being downloaded.
+
+    Downloads are written to `<filename>.part` and renamed to `filename`
+    only once complete, so a partial file never matches the `*.csv` globs
+    used to find the latest versions.
+
+    Args:
+        filepath: The final path of the file.
+
+    Returns:
+        Path: The path of the partial file.
+    """
+    return filepath.with_name(filepath.name + PARTIAL_SUFFIX)
+
+
+def parse_filename(name: str) -> Tuple[str, str, str] | None:
+    """Split a standardized filename into its slug, version and extension.
+
+    Args:
+        name: A filename such as `tesouro-selic@20240101T120000.csv`.
+
+    Returns:
+        Tuple[str, str, str] | None: The slug (`tesouro-selic`), the version
+            timestamp (`20240101T120000`) and the extension (`.csv`), or None
+            if the name does not follow the `<slug>@<timestamp>` convention.
+    """
+    if "@" not in name:
+        return None
+    slug, _, rest = name.rpartition("@")
+    version, dot, extension = rest.partition(".")
+    return slug, version, dot + extension
 
 
-def get_latest_files(directory: Path) -> List[Path]:
-    """Scan a directory and return only the latest version of each file group.
+def get_stored_extensions(extension: str) -> Tuple[str, ...]:
+    """Return the extensions under which files of `extension` may be stored.
+
+    E.g. `.csv`, plus `.csv.ref` for snapshot references and `.csv.zst` for
+    compressed files.
+    """
+    return (extension, *(extension + suffix for suffix in STORED_SUFFIXES))
+
+
+def is_data_file(name: str) -> bool:
+    """Whether a filename is a stored data file (not a sidecar or a partial)."""
+    parsed = parse_filename(name)
+    return parsed is not None and parsed[2] in DATA_EXTENSIONS
+
+
+def get_latest_files(
+    directory: Path, extension: str = ".csv", pattern: str | None = None
+) -> List[Path]:
+    """Return only the latest version of each file group of a directory.
 
     Files are grouped by their slug (the part of the filename before the '@').
     For each group, only the file with the lexicographically largest timestamp
     is returned. This is useful for handling versioned files where multiple
     downloads of the same dataset might exist.
 
+    Versions stored as snapshot references (`<file>.ref`, see
+    `tddata.snapshots`) or compressed (`<file>.zst`, `<file>.gz`) count as
+    files of the same extension.
+
+    If the directory has a catalog (see `tddata.catalog`), the latest
+    versions are looked up in its index instead of scanning the directory.
+
     Args:
         directory: The directory to scan for CSV files.
+        extension: The extension of the files to consider, e.g. `.parquet`
+            for datasets converted while downloading.
+        pattern: An optional glob pattern the filenames must match, e.g.
+            "operacoes-do-tesouro-direto-*".
 
     Returns:
         List[Path]: A sorted list of paths to the latest version of each file.
@@ -96,37 +203,33 @@ def get_latest_files(directory: Path) -> List[Path]:
     if not directory.exists():
         return []
 
-    files_map: Dict[str, Path] = {}
+    from .catalog import Catalog
 
-    for file_path in directory.glob("*.csv"):
-        name = file_path.name
-        if "@" not in name:
-            continue
+    if Catalog.exists(directory):
+        with Catalog(directory) as catalog:
+            return catalog.latest_files(extension=extension, pattern=pattern)
 
-        # Split into slug and timestamp
-        parts = name.split("@")
-        slug = "@".join(parts[:-1])
-        timestamp_part = parts[-1].replace(".csv", "")
+    files_map: Dict[str, Tuple[str, Path]] = {}
 
-        # If we haven't seen this slug or if this file is newer
-        if slug not in files_map:
-            files_map[slug] = file_path
-        else:
-            # Compare timestamps
-            current_best = files_map[slug]
-            current_ts = current_best.name.split("@")[-1].replace(".csv", "")
+    for file_path in _glob_versions(directory, pattern or f"*{extension}"):
+        parsed = parse_filename(file_path.name)
+        if parsed is None or parsed[2] not in get_stored_extensions(extension):
+            continue
 
-            if timestamp_part > current_ts:
-                files_map[slug] = file_path
+        # If we haven't seen this slug or if this file is newer
+        slug, timestamp, _ = parsed
+        if slug not in files_map or timestamp > files_map[slug][0]:
+            files_map[slug] = (timestamp, file_path)
 
-    return sorted(list(files_map.values()))
+    return sorted(file_path for _, file_path in files_map.values())
 
 
 def get_latest_file(data_dir: Path, pattern: str) -> Path | None:
     """Find the latest file matching a specific pattern in a directory.
 
     This function searches for files matching the given glob pattern and
-    returns the one with the latest timestamp suffix.
+    returns the one with the latest timestamp suffix. If the directory has
+    a catalog, the lookup is an indexed query instead of a directory scan.
 
     Args:
         data_dir: The directory to search in.
@@ -136,22 +239,196 @@ def get_latest_file(data_dir: Path, pattern: str) -> Path | None:
         Path | None: The path to the latest file matching the pattern, or
             None if no matching files are found.
     """
-    files = list(data_dir.glob(pattern))
-    if not files:
-        return None
+    from .catalog import Catalog
+
+    if Catalog.exists(data_dir):
+        with Catalog(data_dir) as catalog:
+            return catalog.latest_file(pattern)
 
     latest_file = None
     latest_ts = ""
 
-    for f in files:
-        if "@" not in f.name:
+    for f in _glob_versions(data_dir, pattern):
+        parsed = parse_filename(f.name)
+        if parsed is None:
             continue
 
-        parts = f.name.split("@")
-        ts = parts[-1].replace(".csv", "")
-
+        ts = parsed[1]
         if ts > latest_ts:
             latest_ts = ts
             latest_file = f
 
     return latest_file
+
+
+def get_versions(directory: Path, slug: str, extension: str = ".csv") -> List[Path]:
+    """Return every stored version of a file group, oldest first.
+
+    Args:
+        directory: The data directory.
+        slug: The slug of the file group, e.g. "operacoes-do-tesouro-direto-2024".
+        extension: The extension of the files to consider.
+
+    Returns:
+        List[Path]: The paths of all versions, sorted by timestamp.
+    """
+    from .catalog import Catalog
+
+    if Catalog.exists(directory):
+        with Catalog(directory) as catalog:
+            return catalog.versions(slug, extension=extension)
+
+    files = _glob_versions(directory, f"{glob.escape(slug)}@*{extension}")
+    return sorted(files, key=lambda f: parse_filename(f.name)[1])
+
+
+def _glob_versions(directory: Path, pattern: str) -> List[Path]:
+    """Glob the files matching `pattern`, also when referenced or compressed."""
+    return [
+        path
+        for suffix in ("", *STORED_SUFFIXES)
+        for path in directory.glob(pattern + suffix)
+    ]
+
+
+def compact(
+    directory: Path,
+    keep_last: int | None = None,
+    max_age_days: float | None = None,
+    compress: bool = False,
+    workers: int | None = None,
+    dry_run: bool = False,
+) -> List[Dict]:
+    """Apply a retention policy to the superseded versions of a directory.
+
+    A file group holds the versions of a slug in one format, CSV versions
+    being grouped whether they are compressed, snapshot references or not.
+    A version of a file group is kept if it is among the `keep_last` most
+    recent ones, or if it is newer than `max_age_days` (by the timestamp in
+    its name). The latest version is always kept. Without any policy, no
+    version is removed. Removed versions also lose their digest sidecars,
+    cached DataFrames and, for snapshot references, the chunks no other
+    version uses.
+
+    Args:
+        directory: The data directory.
+        keep_last: Keep at most this many versions of each file group.
+        max_age_days: Keep the versions newer than this many days.
+        compress: Compress the retained CSV versions, except the latest,
+            with Zstandard (see `tddata.compression`), in parallel.
+        workers: Number of worker processes compressing files. Defaults to
+            the number of CPUs.
+        dry_run: Only report what would be done.
+
+    Returns:
+        List[Dict]: One entry per affected file: its `path`, the `action`
+            ("delete" or "compress") and its `size` in bytes.
+    """
+    if keep_last is not None and keep_last < 1:
+        raise ValueError(f"keep_last must be at least 1, got {keep_last}")
+
+    now = dt.datetime.now()
+    groups: Dict[Tuple[str, str], Dict[str, List[Path]]] = {}
+    for path in directory.iterdir():
+        if is_data_file(path.name):
+            slug, version, extension = parse_filename(path.name)
+            group = (slug, _base_extension(extension))
+            groups.setdefault(group, {}).setdefault(version, []).append(path)
+
+    to_delete: List[Path] = []
+    to_compress: List[Path] = []
+    for versions in groups.values():
+        # Newest first
+        for rank, version in enumerate(sorted(versions, reverse=True)):
+            keep = (
+                rank == 0
+                or (keep_last is None and max_age_days is None)
+                or (keep_last is not None and rank < keep_last)
+                or (
+                    max_age_days is not None
+                    and now - _parse_version(version)
+                    <= dt.timedelta(days=max_age_days)
+                )
+            )
+            if not keep:
+                to_delete.extend(versions[version])
+            elif rank > 0:
+                to_compress.extend(
+                    p for p in versions[version] if p.name.endswith(".csv")
+                )
+
+    report = [
+        {"path": path, "action": "delete", "size": _disk_usage(path)}
+        for path in sorted(to_delete)
+    ]
+    if compress:
+        report.extend(
+            {"path": path, "action": "compress", "size": path.stat().st_size}
+            for path in sorted(to_compress)
+        )
+    if dry_run:
+        return report
+
+    from . import cache, integrity, snapshots
+    from .catalog import Catalog
+
+    for path in to_delete:
+        _remove_version(path, directory / cache.CACHE_DIRNAME)
+    if any(path.name.endswith(REF_SUFFIX) for path in to_delete):
+        snapshots.collect_garbage(directory)
+
+    compressed: List[Path] = []
+    if compress and to_compress:
+        from . import compression
+
+        compression.require_zstandard()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            compressed = list(
+                executor.map(compression.compress_file, sorted(to_compress))
+            )
+
+    # Only the rows of the files touched change, so the digests and datasets
+    # recorded by the downloader are kept for the others
+    if Catalog.exists(directory):
+        with Catalog(directory) as catalog:
+            for path in to_delete:
+                catalog.remove(path)
+            for path, dest in zip(sorted(to_compress), compressed):
+                algorithm, hexdigest = integrity.read_digest(dest)
+                catalog.replace(path, dest, digest=f"{algorithm}:{hexdigest}")
+    return report
+
+
+def _base_extension(extension: str) -> str:
+    """Strip the `STORED_SUFFIXES` from an extension, e.g. `.csv.zst` to `.csv`."""
+    for suffix in STORED_SUFFIXES:
+        if extension.endswith(suffix):
+            return extension.removesuffix(suffix)
+    return extension
+
+
+def _parse_version(version: str) -> dt.datetime:
+    try:
+        return dt.datetime.strptime(version, "%Y%m%dT%H%M%S")
+    except ValueError:
+        # An unexpected name: treat it as recent, so it is not removed
+        return dt.datetime.now()
+
+
+def _disk_usage(path: Path) -> int:
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return path.stat().st_size
+
+
+def _remove_version(path: Path, cache_dir: Path):
+    from . import integrity
+
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+    for algorithm in integrity.HASH_ALGORITHMS:
+        integrity.get_digest_path(path, algorithm).unlink(missing_ok=True)
+    for entry in cache_dir.glob(f"{glob.escape(path.name)}.*.parquet"):
+        entry.unlink()
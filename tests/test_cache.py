@@ -0,0 +1,211 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime as dt
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+from tddata import cache, columnar, reader
+from tddata.constants import Column
+
+OPERATIONS = (
+    "Codigo do Investidor;Data da Operacao;Tipo Titulo;Vencimento do Titulo;"
+    "Quantidade;Valor do Titulo;Valor da Operacao;Tipo da Operacao;"
+    "Canal da Operacao\n"
+    "456;15/05/2024;Tesouro Selic;01/03/2029;1,5;1000,00;1500,00;C;Site\n"
+    "457;16/05/2024;Tesouro IPCA+;15/05/2035;2,0;3000,00;6000,00;V;Site\n"
+    "458;17/05/2024;Tesouro Prefixado;01/01/2027;1,0;700,00;700,00;C;Site\n"
+)
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.filepath = self.test_dir / "operacoes@20240101T000000.csv"
+        self.filepath.write_text(OPERATIONS, encoding="utf-8")
+        self.cache_dir = self.test_dir / cache.CACHE_DIRNAME
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def entries(self):
+        return sorted(self.cache_dir.glob("*.parquet"))
+
+    def test_disabled_by_default(self):
+        with patch.dict(os.environ, {}, clear=True):
+            reader.read_operations(self.filepath)
+        self.assertFalse(self.cache_dir.exists())
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_cached_read_skips_csv_parsing(self):
+        expected = reader.read_operations(self.filepath, cache=True)
+        self.assertEqual(len(self.entries()), 1)
+
+        with patch.object(pd, "read_csv", side_effect=AssertionError):
+            df = reader.read_operations(self.filepath, cache=True)
+        pd.testing.assert_frame_equal(df, expected)
+        self.assertTrue(
+            pd.api.types.is_datetime64_any_dtype(df[Column.OPERATION_DATE.value])
+        )
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_selection_is_pushed_down(self):
+        columns = [Column.INVESTOR_ID, Column.OPERATION_VALUE]
+        filters = {
+            Column.BOND_TYPE: ["Tesouro Selic", "Tesouro Prefixado"],
+            Column.OPERATION_DATE: ("2024-05-16", None),
+        }
+        # The first read writes the whole file to the cache
+        expected = reader.read_operations(
+            self.filepath, cache=True, columns=columns, filters=filters
+        )
+        self.assertEqual(expected[Column.INVESTOR_ID.value].tolist(), [458])
+        self.assertEqual(len(reader.read_operations(self.filepath, cache=True)), 3)
+
+        with patch.object(pd, "read_csv", side_effect=AssertionError):
+            df = reader.read_operations(
+                self.filepath, cache=True, columns=columns, filters=filters
+            )
+            chunks = list(
+                reader.read_operations(
+                    self.filepath,
+                    chunksize=1,
+                    cache=True,
+                    columns=columns,
+                    filters=filters,
+                )
+            )
+        pd.testing.assert_frame_equal(df, expected)
+        self.assertEqual(len(chunks), 1)
+        pd.testing.assert_frame_equal(chunks[0], expected)
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_filters_on_cache_miss_and_hit(self):
+        cases = [
+            ({Column.OPERATION_DATE: "2024-05-15"}, [456]),
+            ({Column.OPERATION_DATE: [dt.date(2024, 5, 15), "2024-05-17"]}, [456, 458]),
+            # Strings are only dates in date columns
+            ({Column.BOND_TYPE: ("Tesouro I", "Tesouro Q")}, [457, 458]),
+            ({Column.BOND_TYPE: "Tesouro Selic"}, [456]),
+        ]
+        for filters, expected in cases:
+            with self.subTest(filters=filters):
+                shutil.rmtree(self.cache_dir, ignore_errors=True)
+                for _ in ("miss", "hit"):
+                    df = reader.read_operations(
+                        self.filepath, cache=True, filters=filters
+                    )
+                    self.assertEqual(df[Column.INVESTOR_ID.value].tolist(), expected)
+                self.assertEqual(len(self.entries()), 1)
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_changed_source_invalidates_entry(self):
+        reader.read_operations(self.filepath, cache=True)
+        (old_entry,) = self.entries()
+
+        self.filepath.write_text(OPERATIONS.rsplit("458", 1)[0], encoding="utf-8")
+        df = reader.read_operations(self.filepath, cache=True)
+        self.assertEqual(len(df), 2)
+        # The stale entry is replaced, not kept alongside
+        (new_entry,) = self.entries()
+        self.assertNotEqual(new_entry, old_entry)
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_same_name_in_shared_cache_dir(self):
+        other_dir = self.test_dir / "other"
+        other_dir.mkdir()
+        other = other_dir / self.filepath.name
+        other.write_text(OPERATIONS.rsplit("458", 1)[0], encoding="utf-8")
+
+        reader.read_operations(self.filepath, cache=self.cache_dir)
+        reader.read_operations(other, cache=self.cache_dir)
+        # Both entries are kept, neither is taken for a stale version
+        self.assertEqual(len(self.entries()), 2)
+        with patch.object(pd, "read_csv", side_effect=AssertionError):
+            self.assertEqual(
+                len(reader.read_operations(self.filepath, cache=self.cache_dir)), 3
+            )
+            self.assertEqual(
+                len(reader.read_operations(other, cache=self.cache_dir)), 2
+            )
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_engines_have_their_own_entries(self):
+        expected = reader.read_operations(self.filepath, cache=True, engine="pyarrow")
+        reader.read_operations(self.filepath, cache=True)
+        self.assertEqual(len(self.entries()), 2)
+        self.assertEqual(len([e for e in self.entries() if ".pyarrow." in e.name]), 1)
+        with patch.object(pd, "read_csv", side_effect=AssertionError):
+            df = reader.read_operations(self.filepath, cache=True, engine="pyarrow")
+        pd.testing.assert_frame_equal(df, expected)
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_reader_version_invalidates_entry(self):
+        reader.read_operations(self.filepath, cache=True)
+        with patch.object(cache, "READER_VERSION", cache.READER_VERSION + 1):
+            with patch.object(pd, "read_csv", wraps=pd.read_csv) as read_csv:
+                reader.read_operations(self.filepath, cache=True)
+        read_csv.assert_called_once()
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_chunked_reads(self):
+        chunks = list(reader.read_operations(self.filepath, chunksize=2, cache=True))
+        self.assertEqual([len(c) for c in chunks], [2, 1])
+        self.assertEqual(len(self.entries()), 1)
+
+        with patch.object(pd, "read_csv", side_effect=AssertionError):
+            cached = list(
+                reader.read_operations(self.filepath, chunksize=2, cache=True)
+            )
+        for df, expected in zip(cached, chunks):
+            pd.testing.assert_frame_equal(df, expected)
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_partially_consumed_chunks_are_not_cached(self):
+        chunks = reader.read_operations(self.filepath, chunksize=1, cache=True)
+        next(chunks)
+        chunks.close()
+        self.assertEqual(self.entries(), [])
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_cache_dir_from_environment(self):
+        env_dir = self.test_dir / "env-cache"
+        with patch.dict(os.environ, {cache.CACHE_DIR_ENV: str(env_dir)}):
+            reader.read_interest_coupons(self.write_coupons())
+            self.assertEqual(len(list(env_dir.glob("*.parquet"))), 1)
+            # cache=False overrides the environment
+            self.assertIsNone(cache.get_cache_dir(self.filepath, False))
+
+    def write_coupons(self):
+        filepath = self.test_dir / "cupons@20240101T000000.csv"
+        filepath.write_text(
+            "Tipo Titulo;Vencimento do Titulo;Data Resgate;PU;Quantidade;Valor\n"
+            "Tesouro IPCA+ com Juros Semestrais;15/05/2035;15/05/2024;"
+            "100,00;10,00;1000,00\n",
+            encoding="utf-8",
+        )
+        return filepath
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from tddata import storage
+from tddata.catalog import CATALOG_FILENAME, Catalog
+from tddata.manifest import Manifest
+
+
+class TestCatalog(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        for name in [
+            "operacoes-do-tesouro-direto-2023@20240101T000000.csv",
+            "operacoes-do-tesouro-direto-2024@20240101T000000.csv",
+            "operacoes-do-tesouro-direto-2024@20240201T000000.csv",
+            "operacoes-do-tesouro-direto-2024@20240201T000000.csv.sha256",
+            "operacoes-do-tesouro-direto-2024@20240301T000000.csv.part",
+            "vendas-do-tesouro-direto@20240101T000000.csv",
+        ]:
+            (self.test_dir / name).write_text("content")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_indexes_existing_files_on_creation(self):
+        with Catalog(self.test_dir) as catalog:
+            self.assertEqual(len(catalog), 4)
+            self.assertEqual(
+                [f.name for f in catalog.latest_files()],
+                [
+                    "operacoes-do-tesouro-direto-2023@20240101T000000.csv",
+                    "operacoes-do-tesouro-direto-2024@20240201T000000.csv",
+                    "vendas-do-tesouro-direto@20240101T000000.csv",
+                ],
+            )
+
+    def test_latest_file_and_versions(self):
+        with Catalog(self.test_dir) as catalog:
+            self.assertEqual(
+                catalog.latest_file("operacoes-do-tesouro-direto-2024*.csv").name,
+                "operacoes-do-tesouro-direto-2024@20240201T000000.csv",
+            )
+            self.assertIsNone(catalog.latest_file("investidores*.csv"))
+            self.assertEqual(
+                [f.name for f in catalog.versions("operacoes-do-tesouro-direto-2024")],
+                [
+                    "operacoes-do-tesouro-direto-2024@20240101T000000.csv",
+                    "operacoes-do-tesouro-direto-2024@20240201T000000.csv",
+                ],
+            )
+
+    def test_add_records_dataset_and_year(self):
+        path = self.test_dir / "operacoes-do-tesouro-direto-2025@20250101T000000.csv"
+        path.write_text("new content")
+        with Catalog(self.test_dir) as catalog:
+            catalog.add(path, dataset="operacoes", digest="sha256:abc")
+            self.assertEqual(
+                catalog.latest_files(dataset="operacoes"), [path]
+            )
+            row = catalog.connection.execute(
+                "SELECT year, size, digest FROM files WHERE path = ?", (path.name,)
+            ).fetchone()
+        self.assertEqual(row, (2025, len("new content"), "sha256:abc"))
+
+    def test_deleted_files_are_pruned(self):
+        with Catalog(self.test_dir) as catalog:
+            latest = catalog.latest_file("operacoes-do-tesouro-direto-2024*.csv")
+            latest.unlink()
+            self.assertEqual(
+                catalog.latest_file("operacoes-do-tesouro-direto-2024*.csv").name,
+                "operacoes-do-tesouro-direto-2024@20240101T000000.csv",
+            )
+            self.assertEqual(len(catalog), 3)
+
+    def test_rebuild_takes_datasets_from_manifest(self):
+        manifest = Manifest(self.test_dir)
+        manifest.set_dataset_resources(
+            "vendas", [{"name": "Vendas do Tesouro Direto", "url": "http://x"}]
+        )
+        manifest.save()
+        with Catalog(self.test_dir) as catalog:
+            self.assertEqual(
+                [f.name for f in catalog.latest_files(dataset="vendas")],
+                ["vendas-do-tesouro-direto@20240101T000000.csv"],
+            )
+
+    def test_storage_uses_catalog(self):
+        Catalog(self.test_dir).close()
+        self.assertTrue((self.test_dir / CATALOG_FILENAME).exists())
+        # Files added behind the catalog's back are only seen after a rebuild
+        (self.test_dir / "vendas-do-tesouro-direto@20250101T000000.csv").write_text(
+            "content"
+        )
+        self.assertEqual(
+            storage.get_latest_file(self.test_dir, "vendas*.csv").name,
+            "vendas-do-tesouro-direto@20240101T000000.csv",
+        )
+        with Catalog(self.test_dir) as catalog:
+            catalog.rebuild()
+        self.assertEqual(
+            storage.get_latest_file(self.test_dir, "vendas*.csv").name,
+            "vendas-do-tesouro-direto@20250101T000000.csv",
+        )
+        self.assertEqual(
+            len(
+                storage.get_latest_files(
+                    self.test_dir, pattern="operacoes-do-tesouro-direto-*"
+                )
+            ),
+            2,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,13 +14,45 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import asyncio
 import shutil
 import tempfile
 import unittest
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
-from tddata import downloader
+import httpx
+import pandas as pd
+
+from tddata import columnar, compression, downloader, integrity
+from tddata.catalog import Catalog
+from tddata.constants import Column
+from tddata.manifest import Manifest
+from tddata.scheduler import Scheduler
+from tddata.session import Session
+
+RESOURCE = {
+    "name": "Resource 1",
+    "format": "CSV",
+    "url": "http://example.com/file1.csv",
+    "last_modified": "2024-01-01T12:00:00.000000",
+}
+
+OPERATIONS_RESOURCE = {
+    "name": "Operações do Tesouro Direto 2024",
+    "format": "CSV",
+    "url": "http://example.com/operacoes-2024.csv",
+    "last_modified": "2024-01-01T12:00:00.000000",
+}
+OPERATIONS_CSV = (
+    "Codigo do Investidor;Data da Operacao;Tipo Titulo;Vencimento do Titulo;"
+    "Quantidade;Valor do Titulo;Valor da Operacao;Tipo da Operacao;"
+    "Canal da Operacao\n"
+    + "".join(
+        f"{i};15/05/2024;Tesouro Selic;01/03/2029;1,5;1000,00;1500,00;C;S\n"
+        for i in range(5)
+    )
+).encode()
 
 
 class TestDownloader(unittest.TestCase):
@@ -30,41 +62,67 @@ class TestDownloader(unittest.TestCase):
     def tearDown(self):
         shutil.rmtree(self.test_dir)
 
-    @patch("tddata.downloader.httpx.get")
-    def test_get_dataset_resources(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
-            "success": True,
-            "result": {
-                "resources": [
-                    {"name": "Resource 1", "format": "CSV"},
-                    {"name": "Resource 2", "format": "PDF"}
-                ]
-            }
-        }
-        mock_response.status_code = 200
-        mock_get.return_value = mock_response
+    def test_get_dataset_resources(self):
+        requests = []
 
-        resources = downloader.get_dataset_resources("fake-id")
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={
+                "success": True,
+                "result": {
+                    "resources": [
+                        {"name": "Resource 1", "format": "CSV"},
+                        {"name": "Resource 2", "format": "PDF"}
+                    ]
+                }
+            })
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with Session(client=client) as session:
+            resources = downloader.get_dataset_resources("fake-id", session=session)
         self.assertEqual(len(resources), 2)
         self.assertEqual(resources[0]["name"], "Resource 1")
+        self.assertEqual(requests[0].url.params["id"], "fake-id")
+        # Caller-provided clients are not closed by the session
+        self.assertFalse(client.is_closed)
 
-    @patch("tddata.downloader.httpx.get")
-    def test_get_dataset_resources_failure(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
-            "success": False,
-            "error": "Dataset not found"
-        }
-        mock_response.status_code = 200
-        mock_get.return_value = mock_response
+    def test_get_dataset_resources_failure(self):
+        def handler(request):
+            return httpx.Response(200, json={
+                "success": False,
+                "error": "Dataset not found"
+            })
 
+        session = Session(client=httpx.Client(transport=httpx.MockTransport(handler)))
         with self.assertRaises(ValueError):
-            downloader.get_dataset_resources("bad-id")
+            downloader.get_dataset_resources("bad-id", session=session)
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_reuses_session_client(self, mock_get_resources):
+        mock_get_resources.return_value = [
+            {
+                "name": f"Resource {i}",
+                "format": "CSV",
+                "url": f"http://example.com/file{i}.csv",
+                "last_modified": "2024-01-01T12:00:00.000000",
+            }
+            for i in range(3)
+        ]
+
+        def handler(request):
+            return httpx.Response(200, content=b"data")
 
-    @patch("tddata.downloader.get_dataset_resources")
-    @patch("tddata.downloader.httpx.stream")
-    def test_download_success(self, mock_stream, mock_get_resources):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        session = Session(async_client=client)
+        results = downloader.download(self.test_dir, "fake-dataset", session=session)
+
+        self.assertEqual(len(results), 3)
+        for call in mock_get_resources.call_args_list:
+            self.assertIs(call.args[0], client)
+        self.assertFalse(client.is_closed)
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_success(self, mock_get_resources):
         # Mock resources
         mock_get_resources.return_value = [
             {
@@ -81,16 +139,16 @@ class TestDownloader(unittest.TestCase):
             }
         ]
 
-        # Mock stream context manager
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.headers = {"Content-Length": "10"}
-        mock_response.iter_bytes.return_value = [b"chunk1", b"chunk2"]
+        # Mock transport serving the file content
+        def handler(request):
+            return httpx.Response(200, content=b"chunk1chunk2")
 
-        mock_stream.return_value.__enter__.return_value = mock_response
+        session = Session(
+            async_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
 
         # Execute download
-        results = downloader.download(self.test_dir, "fake-dataset")
+        results = downloader.download(self.test_dir, "fake-dataset", session=session)
 
         # Verify
         expected_filename = "resource-1@20240101T120000.csv"
@@ -104,7 +162,433 @@ class TestDownloader(unittest.TestCase):
             content = f.read()
         self.assertEqual(content, b"chunk1chunk2")
 
-    @patch("tddata.downloader.get_dataset_resources")
+        # Transfer metrics are reported with each fetched file
+        self.assertEqual(results[0]["bytes_transferred"], 12)
+        for key in ("ttfb", "duration", "bytes_per_second"):
+            self.assertGreaterEqual(results[0][key], 0)
+        self.assertLessEqual(results[0]["ttfb"], results[0]["duration"])
+
+        # The digest is computed while streaming and stored next to the file
+        algorithm, digest = integrity.read_digest(expected_path)
+        self.assertEqual(results[0]["digest"], f"{algorithm}:{digest}")
+        self.assertEqual(digest, integrity.hash_file(expected_path, algorithm))
+
+        # The published file is added to the catalog of the directory
+        with Catalog(self.test_dir) as catalog:
+            self.assertEqual(catalog.latest_files(dataset="fake-dataset"), [expected_path])
+
+    @unittest.skipIf(compression.zstandard is None, "zstandard is not installed")
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_compressed(self, mock_get_resources):
+        mock_get_resources.return_value = [RESOURCE]
+        content = b"a;b\n" + b"1;2\n" * 1000
+
+        def handler(request):
+            return httpx.Response(200, content=content)
+
+        for method, suffix in (("gzip", ".gz"), ("zstd", ".zst")):
+            session = Session(
+                async_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            )
+            (result,) = downloader.download(
+                self.test_dir, "fake-dataset", session=session, compression_method=method
+            )
+            expected_path = self.test_dir / f"resource-1@20240101T120000.csv{suffix}"
+            self.assertEqual(result["destination"], expected_path)
+            self.assertEqual(result["bytes_transferred"], len(content))
+            self.assertLess(expected_path.stat().st_size, len(content))
+            self.assertEqual(
+                pd.read_csv(expected_path, sep=";")["a"].tolist(), [1] * 1000
+            )
+            # The digest is of the stored, compressed, bytes
+            self.assertEqual(integrity.verify_file(expected_path)["status"], "ok")
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_compresses_resource_synced_as_csv(self, mock_get_resources):
+        mock_get_resources.return_value = [RESOURCE]
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, headers={"ETag": '"v1"'}, content=b"a;b\n1;2\n")
+
+        downloader.download(
+            self.test_dir, "fake-dataset", session=self._resume_session(handler)
+        )
+        (result,) = downloader.download(
+            self.test_dir,
+            "fake-dataset",
+            session=self._resume_session(handler),
+            compression_method="gzip",
+        )
+
+        self.assertNotIn("If-None-Match", requests[-1].headers)
+        expected_path = self.test_dir / "resource-1@20240101T120000.csv.gz"
+        self.assertEqual(result["status"], "downloaded")
+        self.assertEqual(result["destination"], expected_path)
+        self.assertEqual(pd.read_csv(expected_path, sep=";")["a"].tolist(), [1])
+
+    def test_download_compression_is_validated(self):
+        with self.assertRaises(ValueError):
+            downloader.download(self.test_dir, "fake-dataset", compression_method="xz")
+        with self.assertRaises(ValueError):
+            downloader.download(
+                self.test_dir, "fake-dataset", compression_method="gzip", dedup=True
+            )
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_many_respects_jobs(self, mock_get_resources):
+        async def fake_resources(client, dataset_id, **kwargs):
+            return [
+                {
+                    "name": f"{dataset_id} {year}",
+                    "format": "CSV",
+                    "url": f"http://example.com/{dataset_id}-{year}.csv",
+                    "last_modified": "2024-01-01T12:00:00.000000",
+                }
+                for year in range(2020, 2025)
+            ]
+
+        mock_get_resources.side_effect = fake_resources
+
+        in_flight = 0
+        max_in_flight = 0
+
+        async def handler(request):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, content=request.url.path.encode())
+
+        session = Session(
+            async_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        results = downloader.download_many(
+            self.test_dir, ["dataset-a", "dataset-b"], jobs=3, session=session
+        )
+
+        self.assertEqual(len(results), 10)
+        self.assertGreater(max_in_flight, 1)
+        self.assertLessEqual(max_in_flight, 3)
+        filepath = self.test_dir / "dataset-b-2022@20240101T120000.csv"
+        self.assertEqual(filepath.read_bytes(), b"/dataset-b-2022.csv")
+
+    def _resume_session(self, handler):
+        return Session(
+            async_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_resumes_partial_file(self, mock_get_resources):
+        mock_get_resources.return_value = [RESOURCE]
+        part_path = self.test_dir / "resource-1@20240101T120000.csv.part"
+        part_path.write_bytes(b"chunk1")
+
+        ranges = []
+
+        def handler(request):
+            ranges.append(request.headers.get("Range"))
+            return httpx.Response(
+                206,
+                headers={"Content-Range": "bytes 6-11/12"},
+                content=b"chunk2",
+            )
+
+        results = downloader.download(
+            self.test_dir, "fake-dataset", session=self._resume_session(handler)
+        )
+
+        self.assertEqual(ranges, ["bytes=6-"])
+        self.assertEqual(results[0]["file_size"], 12)
+        self.assertFalse(part_path.exists())
+        expected_path = self.test_dir / "resource-1@20240101T120000.csv"
+        self.assertEqual(expected_path.read_bytes(), b"chunk1chunk2")
+
+        # The digest covers both the resumed prefix and the new bytes
+        self.assertEqual(
+            integrity.read_digest(expected_path)[1],
+            integrity.hash_file(expected_path),
+        )
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_restarts_when_range_is_ignored(self, mock_get_resources):
+        mock_get_resources.return_value = [RESOURCE]
+        part_path = self.test_dir / "resource-1@20240101T120000.csv.part"
+        part_path.write_bytes(b"stale")
+
+        def handler(request):
+            return httpx.Response(200, content=b"chunk1chunk2")
+
+        downloader.download(
+            self.test_dir, "fake-dataset", session=self._resume_session(handler)
+        )
+
+        expected_path = self.test_dir / "resource-1@20240101T120000.csv"
+        self.assertEqual(expected_path.read_bytes(), b"chunk1chunk2")
+        self.assertFalse(part_path.exists())
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_failure_keeps_partial_file(self, mock_get_resources):
+        mock_get_resources.return_value = [RESOURCE]
+
+        class BrokenStream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield b"x" * 4096
+                raise httpx.ReadError("connection reset")
+
+        class BrokenTransport(httpx.AsyncBaseTransport):
+            async def handle_async_request(self, request):
+                return httpx.Response(200, stream=BrokenStream())
+
+        session = Session(async_client=httpx.AsyncClient(transport=BrokenTransport()))
+        scheduler = Scheduler(max_attempts=1)
+        results = downloader.download(
+            self.test_dir, "fake-dataset", session=session, scheduler=scheduler
+        )
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(scheduler.failures), 1)
+        self.assertFalse((self.test_dir / "resource-1@20240101T120000.csv").exists())
+        part_path = self.test_dir / "resource-1@20240101T120000.csv.part"
+        self.assertEqual(part_path.read_bytes(), b"x" * 4096)
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_skips_resources_unchanged_in_manifest(self, mock_get_resources):
+        mock_get_resources.return_value = [RESOURCE]
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, headers={"ETag": '"v1"'}, content=b"data")
+
+        downloader.download(
+            self.test_dir, "fake-dataset", session=self._resume_session(handler)
+        )
+        results = downloader.download(
+            self.test_dir, "fake-dataset", session=self._resume_session(handler)
+        )
+
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(results[0]["status"], "unchanged")
+        manifest = Manifest.load(self.test_dir)
+        entry = manifest.get_resource(RESOURCE)
+        self.assertEqual(entry["etag"], '"v1"')
+        self.assertEqual(entry["path"], "resource-1@20240101T120000.csv")
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_conditional_get_not_modified(self, mock_get_resources):
+        mock_get_resources.return_value = [RESOURCE]
+
+        def handler(request):
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, headers={"ETag": '"v1"'}, content=b"data")
+
+        downloader.download(
+            self.test_dir, "fake-dataset", session=self._resume_session(handler)
+        )
+
+        # CKAN bumps last_modified, but the file content is the same
+        mock_get_resources.return_value = [
+            {**RESOURCE, "last_modified": "2024-02-01T12:00:00.000000"}
+        ]
+        results = downloader.download(
+            self.test_dir, "fake-dataset", session=self._resume_session(handler)
+        )
+
+        self.assertEqual(results[0]["status"], "not-modified")
+        self.assertEqual(results[0]["filename"], "resource-1@20240101T120000.csv")
+        self.assertFalse((self.test_dir / "resource-1@20240201T120000.csv").exists())
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_reuses_fresh_dataset_metadata(self, mock_get_resources):
+        mock_get_resources.return_value = [RESOURCE]
+
+        def handler(request):
+            return httpx.Response(200, content=b"data")
+
+        for _ in range(2):
+            downloader.download(
+                self.test_dir,
+                "fake-dataset",
+                session=self._resume_session(handler),
+                metadata_max_age=3600,
+            )
+
+        self.assertEqual(mock_get_resources.call_count, 1)
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_retries_transient_errors(self, mock_get_resources):
+        mock_get_resources.return_value = [RESOURCE]
+        responses = iter([
+            httpx.Response(503),
+            httpx.Response(
+                200, headers={"Content-Length": "12"}, content=b"chunk1chunk2"
+            ),
+        ])
+
+        def handler(request):
+            return next(responses)
+
+        scheduler = Scheduler(base_delay=0)
+        results = downloader.download(
+            self.test_dir,
+            "fake-dataset",
+            session=self._resume_session(handler),
+            scheduler=scheduler,
+        )
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(scheduler.retries, 1)
+        self.assertEqual(scheduler.failures, [])
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_reports_permanent_failures(self, mock_get_resources):
+        mock_get_resources.return_value = [RESOURCE]
+
+        def handler(request):
+            return httpx.Response(404)
+
+        scheduler = Scheduler(base_delay=0)
+        results = downloader.download(
+            self.test_dir,
+            "fake-dataset",
+            session=self._resume_session(handler),
+            scheduler=scheduler,
+        )
+
+        self.assertEqual(results, [])
+        # Client errors are not retried
+        self.assertEqual(scheduler.retries, 0)
+        self.assertEqual(scheduler.failures[0]["url"], RESOURCE["url"])
+        self.assertIn("Resource 1", scheduler.report())
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_converts_to_parquet(self, mock_get_resources):
+        mock_get_resources.return_value = [OPERATIONS_RESOURCE]
+
+        def handler(request):
+            return httpx.Response(200, content=OPERATIONS_CSV)
+
+        results = downloader.download(
+            self.test_dir,
+            "fake-dataset",
+            session=self._resume_session(handler),
+            output_format="parquet",
+            rows_per_part=2,
+        )
+
+        dest = self.test_dir / "operacoes-do-tesouro-direto-2024@20240101T120000.parquet"
+        self.assertEqual(results[0]["destination"], dest)
+        self.assertEqual(len(list(dest.glob("part-*.parquet"))), 3)
+        self.assertFalse(list(self.test_dir.glob("*.csv")))
+
+        df = pd.read_parquet(dest)
+        self.assertEqual(len(df), 5)
+        self.assertEqual(df[Column.INVESTOR_ID.value].tolist(), list(range(5)))
+        self.assertTrue(
+            pd.api.types.is_datetime64_any_dtype(df[Column.OPERATION_DATE.value])
+        )
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_converts_resource_synced_as_csv(self, mock_get_resources):
+        mock_get_resources.return_value = [OPERATIONS_RESOURCE]
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, headers={"ETag": '"v1"'}, content=OPERATIONS_CSV)
+
+        downloader.download(
+            self.test_dir, "fake-dataset", session=self._resume_session(handler)
+        )
+        (result,) = downloader.download(
+            self.test_dir,
+            "fake-dataset",
+            session=self._resume_session(handler),
+            output_format="parquet",
+        )
+
+        # The stored CSV is no Parquet file, whatever the server says about it
+        self.assertNotIn("If-None-Match", requests[-1].headers)
+        self.assertNotIn("If-Modified-Since", requests[-1].headers)
+        dest = self.test_dir / "operacoes-do-tesouro-direto-2024@20240101T120000.parquet"
+        self.assertEqual(result["status"], "downloaded")
+        self.assertEqual(result["destination"], dest)
+        self.assertEqual(len(pd.read_parquet(dest)), 5)
+        entry = Manifest.load(self.test_dir).get_resource(OPERATIONS_RESOURCE)
+        self.assertEqual(entry["path"], dest.name)
+
+    def test_parse_years(self):
+        self.assertEqual(downloader.parse_years("2024"), {2024})
+        self.assertEqual(downloader.parse_years("2023-2025"), {2023, 2024, 2025})
+        self.assertEqual(
+            downloader.parse_years("2020, 2022-2023"), {2020, 2022, 2023}
+        )
+        with self.assertRaises(ValueError):
+            downloader.parse_years("2025-2023")
+        with self.assertRaises(ValueError):
+            downloader.parse_years("last-year")
+
+    def test_filter_resources(self):
+        resources = [
+            {"name": "Operações do Tesouro Direto 2023"},
+            {"name": "Operações do Tesouro Direto 2025"},
+            {"name": "Investidores do Tesouro Direto 2025"},
+            {"name": "Taxas dos Títulos Ofertados pelo Tesouro Direto"},
+        ]
+
+        def names(selected):
+            return [r["name"] for r in selected]
+
+        self.assertEqual(
+            names(downloader.filter_resources(resources, years={2025})),
+            [
+                "Operações do Tesouro Direto 2025",
+                "Investidores do Tesouro Direto 2025",
+                "Taxas dos Títulos Ofertados pelo Tesouro Direto",
+            ],
+        )
+        self.assertEqual(
+            names(
+                downloader.filter_resources(
+                    resources, years={2025}, resource_globs=["operacoes-*"]
+                )
+            ),
+            ["Operações do Tesouro Direto 2025"],
+        )
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_filters_resources(self, mock_get_resources):
+        mock_get_resources.return_value = [
+            {**RESOURCE, "name": f"Resource {year}", "url": f"http://example.com/{year}"}
+            for year in (2023, 2024, 2025)
+        ]
+        requested = []
+
+        def handler(request):
+            requested.append(request.url.path)
+            return httpx.Response(200, content=b"data")
+
+        results = downloader.download(
+            self.test_dir,
+            "fake-dataset",
+            session=self._resume_session(handler),
+            years=downloader.parse_years("2024-2025"),
+        )
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(sorted(requested), ["/2024", "/2025"])
+
+    @patch("tddata.downloader.get_dataset_resources_async")
     def test_download_skip_existing(self, mock_get_resources):
         # Set up an existing file
         filename = "resource-1@20240101T120000.csv"
@@ -0,0 +1,80 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import hashlib
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from tddata import integrity
+
+
+class TestIntegrity(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_hash_file_sha256(self):
+        filepath = self.test_dir / "file-a@20240101T100000.csv"
+        filepath.write_bytes(b"a;b\n1;2\n")
+        self.assertEqual(
+            integrity.hash_file(filepath, "sha256"),
+            hashlib.sha256(b"a;b\n1;2\n").hexdigest(),
+        )
+
+    def test_write_and_read_digest(self):
+        filepath = self.test_dir / "file-a@20240101T100000.csv"
+        filepath.write_bytes(b"content")
+        digest = integrity.hash_file(filepath)
+        integrity.write_digest(filepath, digest)
+
+        digest_path = integrity.get_digest_path(filepath)
+        self.assertEqual(
+            digest_path.read_text(), f"{digest}  file-a@20240101T100000.csv\n"
+        )
+        self.assertEqual(
+            integrity.read_digest(filepath), (integrity.HASH_ALGORITHM, digest)
+        )
+
+    def test_verify_store(self):
+        good = self.test_dir / "file-a@20240101T100000.csv"
+        good.write_bytes(b"good")
+        integrity.write_digest(good, integrity.hash_file(good))
+
+        corrupted = self.test_dir / "file-b@20240101T100000.csv"
+        corrupted.write_bytes(b"original")
+        integrity.write_digest(corrupted, integrity.hash_file(corrupted))
+        corrupted.write_bytes(b"truncat")
+
+        (self.test_dir / "file-c@20240101T100000.csv").write_bytes(b"no digest")
+
+        results = integrity.verify_store(self.test_dir, workers=2)
+        statuses = {r["path"].name: r["status"] for r in results}
+        self.assertEqual(
+            statuses,
+            {
+                "file-a@20240101T100000.csv": "ok",
+                "file-b@20240101T100000.csv": "mismatch",
+                "file-c@20240101T100000.csv": "no-digest",
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
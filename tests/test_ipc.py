@@ -0,0 +1,104 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from tddata import columnar, ipc, reader
+from tddata.constants import Column
+
+HEADER = (
+    "Tipo Titulo;Data Vencimento;Data Base;Taxa Compra Manha;Taxa Venda Manha;"
+    "PU Compra Manha;PU Venda Manha;PU Base Manha\n"
+)
+ROWS = (
+    "Tesouro Selic;01/03/2029;02/01/2024;0,10;0,12;14000,00;13990,00;13995,00\n"
+    "Tesouro IPCA+;15/05/2035;02/01/2024;5,50;5,62;2500,00;2490,00;2495,00\n"
+    "Tesouro Prefixado;01/01/2027;03/01/2024;10,50;10,62;780,00;779,00;779,50\n"
+)
+
+
+@unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+class TestIpc(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.filepath = (
+            self.test_dir
+            / "taxas-dos-titulos-ofertados-pelo-tesouro-direto@20240101T000000.csv"
+        )
+        self.filepath.write_text(HEADER + ROWS, encoding="utf-8")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_export_and_load(self):
+        path = ipc.export_dataset(self.test_dir, "prices", chunksize=2)
+        self.assertEqual(path, self.test_dir / "arrow" / "prices.arrow")
+        self.assertFalse(path.with_name("prices.arrow.tmp").exists())
+
+        df = ipc.load_dataset(self.test_dir, "prices")
+        pd.testing.assert_frame_equal(df, reader.read_prices(self.filepath))
+
+        table = ipc.load_table(
+            self.test_dir, "prices", columns=[Column.BUY_PRICE.value]
+        )
+        self.assertEqual(table.column_names, [Column.BUY_PRICE.value])
+        self.assertEqual(table.num_rows, 3)
+
+    def test_failed_export_leaves_no_tmp_file(self):
+        path = ipc.export_dataset(self.test_dir, "prices")
+        # The second chunk has an invalid date
+        self.filepath.write_text(
+            HEADER + ROWS.replace("03/01/2024", "99/99/2024"), encoding="utf-8"
+        )
+        with self.assertRaises(ValueError):
+            ipc.export_dataset(self.test_dir, "prices", chunksize=2)
+        self.assertFalse(path.with_name("prices.arrow.tmp").exists())
+        self.assertEqual(ipc.load_table(self.test_dir, "prices").num_rows, 3)
+
+    def test_export_with_new_categories(self):
+        self.filepath.unlink()
+        stock = self.test_dir / "estoque-do-tesouro-direto@20240101T000000.csv"
+        stock.write_text(
+            "Tipo Titulo;Vencimento do Titulo;Mes Estoque;PU;Quantidade;"
+            "Valor Estoque\n"
+            "Tesouro Selic;01/03/2029;01/2024;14000,00;1,00;14000,00\n"
+            "Tesouro Antigo;01/03/2029;01/2024;14000,00;1,00;14000,00\n"
+            # Not in the first chunk's categories
+            "Tesouro Novo;01/01/2027;02/2024;780,00;2,00;1560,00\n"
+            "Tesouro Antigo;01/03/2029;02/2024;14000,00;1,00;14000,00\n",
+            encoding="utf-8",
+        )
+        ipc.export_dataset(self.test_dir, "stock", chunksize=2)
+
+        df = ipc.load_dataset(self.test_dir, "stock")
+        bond_types = df[Column.BOND_TYPE.value]
+        self.assertIsInstance(bond_types.dtype, pd.CategoricalDtype)
+        self.assertEqual(
+            bond_types.tolist(),
+            reader.read_stock(stock)[Column.BOND_TYPE.value].tolist(),
+        )
+
+    def test_export_without_files(self):
+        self.assertIsNone(ipc.export_dataset(self.test_dir, "stock"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from tddata.manifest import MANIFEST_FILENAME, Manifest
+
+RESOURCE = {
+    "id": "abc-123",
+    "name": "Resource 1",
+    "url": "http://example.com/file1.csv",
+    "last_modified": "2024-01-01T12:00:00.000000",
+    "size": 100,
+}
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_save_and_load(self):
+        manifest = Manifest.load(self.test_dir)
+        self.assertEqual(manifest.resources, {})
+
+        filepath = self.test_dir / "resource-1@20240101T120000.csv"
+        manifest.set_resource(RESOURCE, filepath, etag='"v1"')
+        manifest.set_dataset_resources("fake-dataset", [RESOURCE])
+        manifest.save()
+
+        self.assertTrue((self.test_dir / MANIFEST_FILENAME).exists())
+        loaded = Manifest.load(self.test_dir)
+        entry = loaded.get_resource(RESOURCE)
+        self.assertEqual(entry["id"], "abc-123")
+        self.assertEqual(entry["etag"], '"v1"')
+        self.assertEqual(entry["path"], filepath.name)
+        self.assertEqual(
+            loaded.get_dataset_resources("fake-dataset", max_age=60), [RESOURCE]
+        )
+        self.assertIsNone(loaded.get_dataset_resources("fake-dataset", max_age=0))
+
+    def test_is_unchanged(self):
+        manifest = Manifest(self.test_dir)
+        filepath = self.test_dir / "resource-1@20240101T120000.csv"
+        manifest.set_resource(RESOURCE, filepath)
+
+        # The local file is missing
+        self.assertFalse(manifest.is_unchanged(RESOURCE))
+
+        filepath.touch()
+        self.assertTrue(manifest.is_unchanged(RESOURCE))
+        self.assertFalse(manifest.is_unchanged({**RESOURCE, "size": 200}))
+        self.assertFalse(
+            manifest.is_unchanged(
+                {**RESOURCE, "last_modified": "2024-02-01T12:00:00.000000"}
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from tddata import columnar, partitioned
+from tddata.constants import Column
+
+HEADER = (
+    "Codigo do Investidor;Data da Operacao;Tipo Titulo;Vencimento do Titulo;"
+    "Quantidade;Valor do Titulo;Valor da Operacao;Tipo da Operacao;"
+    "Canal da Operacao\n"
+)
+
+
+@unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+class TestPartitioned(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.write(
+            "operacoes-do-tesouro-direto-2023@20240101T000000.csv",
+            "1;16/05/2023;Tesouro IPCA+;15/05/2035;2,0;3000,00;6000,00;V;S\n"
+            "2;17/05/2023;Tesouro Selic;01/03/2029;1,0;1000,00;1000,00;C;S\n",
+        )
+        # An outdated version, which must not end up in the store
+        self.write(
+            "operacoes-do-tesouro-direto-2024@20240101T000000.csv",
+            "9;15/05/2024;Tesouro Selic;01/03/2029;9,0;1000,00;9000,00;C;S\n",
+        )
+        self.write(
+            "operacoes-do-tesouro-direto-2024@20250101T000000.csv",
+            "3;15/05/2024;Tesouro Selic;01/03/2029;1,5;1000,00;1500,00;C;S\n"
+            "4;16/05/2024;Tesouro Selic;01/03/2029;2,5;1000,00;2500,00;C;H\n"
+            "5;17/05/2024;Tesouro Prefixado;01/01/2027;1,0;700,00;700,00;C;S\n",
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, name, rows):
+        (self.test_dir / name).write_text(HEADER + rows, encoding="utf-8")
+
+    def test_build_dataset_layout(self):
+        root = partitioned.build_dataset(self.test_dir, "operations", chunksize=1)
+        self.assertEqual(root, self.test_dir / "partitioned" / "operations")
+        partitions = sorted(
+            str(p.parent.relative_to(root)) for p in root.rglob("*.parquet")
+        )
+        self.assertEqual(
+            sorted(set(partitions)),
+            [
+                "year=2023/bond_type=Tesouro%20IPCA%2B",
+                "year=2023/bond_type=Tesouro%20Selic",
+                "year=2024/bond_type=Tesouro%20Prefixado",
+                "year=2024/bond_type=Tesouro%20Selic",
+            ],
+        )
+        # Each chunk is written as its own file of the partitions it touches
+        self.assertEqual(partitions.count("year=2024/bond_type=Tesouro%20Selic"), 2)
+
+    def test_read_dataset_filters_partitions(self):
+        partitioned.build_dataset(self.test_dir, "operations", chunksize=2)
+
+        df = partitioned.read_dataset(self.test_dir, "operations")
+        self.assertEqual(sorted(df[Column.INVESTOR_ID.value]), [1, 2, 3, 4, 5])
+
+        df = partitioned.read_dataset(
+            self.test_dir, "operations", years=[2024], bond_types=["Tesouro Selic"]
+        )
+        self.assertEqual(sorted(df[Column.INVESTOR_ID.value]), [3, 4])
+        self.assertEqual(set(df[Column.BOND_TYPE.value]), {"Tesouro Selic"})
+        self.assertEqual(df[Column.OPERATION_VALUE.value].sum(), 4000.0)
+
+        df = partitioned.read_dataset(
+            self.test_dir,
+            "operations",
+            years=[2023],
+            columns=[Column.INVESTOR_ID.value],
+        )
+        self.assertEqual(sorted(df[Column.INVESTOR_ID.value]), [1, 2])
+
+    def test_rebuild_replaces_dataset(self):
+        partitioned.build_dataset(self.test_dir, "operations")
+        (self.test_dir / "operacoes-do-tesouro-direto-2023@20240101T000000.csv").unlink()
+        partitioned.build_dataset(self.test_dir, "operations")
+        df = partitioned.read_dataset(self.test_dir, "operations")
+        self.assertEqual(sorted(df[Column.INVESTOR_ID.value]), [3, 4, 5])
+
+    def test_build_without_files(self):
+        self.assertIsNone(partitioned.build_dataset(self.test_dir, "stock"))
+
+
+if __name__ == "__main__":
+    unittest.main()
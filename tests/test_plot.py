@@ -73,7 +73,7 @@ class TestPlot(unittest.TestCase):
 
         self.maturities_data = pd.DataFrame(
             {
-                Column.BUYBACK_DATE.value: [datetime(2024, 1, 1)],
+                Column.REDEMPTION_DATE.value: [datetime(2024, 1, 1)],
                 Column.VALUE.value: [1000.0],
                 Column.BOND_TYPE.value: ["Type A"],
             }
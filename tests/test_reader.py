@@ -14,15 +14,17 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import gzip
 import shutil
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 import pandas as pd
 
-from tddata import reader
-from tddata.constants import Column
+from tddata import columnar, compression, partitioned, reader
+from tddata.constants import DATASET_SCHEMAS, BondType, Column, Gender, SourceColumn
 
 
 class TestReader(unittest.TestCase):
@@ -38,6 +40,10 @@ class TestReader(unittest.TestCase):
             f.write(content)
         return filepath
 
+    def skip_unavailable(self, engine):
+        if engine == "pyarrow" and columnar.pa is None:
+            self.skipTest("pyarrow is not installed")
+
     def test_read_stock(self):
         content = (
             "Tipo Titulo;Vencimento do Titulo;Mes Estoque;PU;Quantidade;Valor Estoque\n"
@@ -117,6 +123,60 @@ class TestReader(unittest.TestCase):
             pd.api.types.is_datetime64_any_dtype(df[Column.BUYBACK_DATE.value])
         )
 
+    def test_read_interest_coupons(self):
+        content = (
+            "Tipo Titulo;Vencimento do Titulo;Data Resgate;PU;Quantidade;Valor\n"
+            "Tesouro IPCA+ com Juros Semestrais;15/05/2035;15/05/2024;"
+            "100,00;10,00;1000,00\n"
+        )
+        filepath = self.create_csv_file("coupons.csv", content)
+        df = reader.read_interest_coupons(filepath)
+
+        self.assertEqual(
+            df.columns.tolist(),
+            [
+                Column.BOND_TYPE.value,
+                Column.MATURITY_DATE.value,
+                Column.REDEMPTION_DATE.value,
+                Column.UNIT_PRICE.value,
+                Column.QUANTITY.value,
+                Column.VALUE.value,
+            ],
+        )
+        self.assertEqual(
+            df[Column.REDEMPTION_DATE.value].iloc[0], pd.Timestamp(2024, 5, 15)
+        )
+
+    def test_schemas_cover_every_dataset(self):
+        self.assertEqual(set(DATASET_SCHEMAS), set(reader.DATASET_READERS))
+        for dataset, spec in partitioned.DATASETS.items():
+            with self.subTest(dataset=dataset):
+                targets = [c.column for c in DATASET_SCHEMAS[dataset]]
+                self.assertIn(spec.date_column, targets)
+                self.assertEqual(len(set(targets)), len(targets))
+
+    def test_compile_schema(self):
+        schema = reader.compile_schema(
+            [
+                SourceColumn("Genero", Column.GENDER, "str", domain=Gender),
+                SourceColumn("Mes", Column.STOCK_MONTH, "date", "%m/%Y"),
+                SourceColumn("Valor", Column.VALUE, "float"),
+            ]
+        )
+        self.assertEqual(
+            schema.rename,
+            {
+                "Genero": Column.GENDER.value,
+                "Mes": Column.STOCK_MONTH.value,
+                "Valor": Column.VALUE.value,
+            },
+        )
+        self.assertEqual(
+            schema.dtypes, {"Genero": "str", "Mes": "date", "Valor": "float"}
+        )
+        self.assertEqual(schema.date_formats, {"Mes": "%m/%Y"})
+        self.assertEqual(schema.domains, {Column.GENDER.value: Gender})
+
     def test_read_maturities(self):
         content = (
             "Tipo Titulo;Vencimento do Titulo;Data Resgate;PU;Quantidade;Valor\n"
@@ -128,7 +188,7 @@ class TestReader(unittest.TestCase):
         self.assertEqual(len(df), 1)
         self.assertEqual(df.iloc[0][Column.UNIT_PRICE.value], 4000.00)
         self.assertTrue(
-            pd.api.types.is_datetime64_any_dtype(df[Column.BUYBACK_DATE.value])
+            pd.api.types.is_datetime64_any_dtype(df[Column.REDEMPTION_DATE.value])
         )
 
     def test_read_prices(self):
@@ -173,6 +233,397 @@ class TestReader(unittest.TestCase):
             pd.api.types.is_datetime64_any_dtype(df[Column.JOIN_DATE.value])
         )
 
+    @unittest.skipIf(compression.zstandard is None, "zstandard is not installed")
+    def test_read_compressed(self):
+        content = (
+            "Tipo Titulo;Vencimento do Titulo;Data Venda;PU;Quantidade;Valor\n"
+            "Tesouro IPCA+;15/08/2026;02/01/2024;3000,00;2,0;6000,00\n"
+            "Tesouro Selic;01/03/2029;03/01/2024;1000,00;1,0;1000,00\n"
+        )
+        gz_path = self.test_dir / "sales.csv.gz"
+        gz_path.write_bytes(gzip.compress(content.encode("utf-8")))
+        zst_path = compression.compress_file(
+            self.create_csv_file("sales.csv", content)
+        )
+        self.assertEqual(zst_path.name, "sales.csv.zst")
+
+        for filepath in (gz_path, zst_path):
+            df = reader.read_sales(filepath)
+            self.assertEqual(df[Column.VALUE.value].tolist(), [6000.0, 1000.0])
+
+            chunks = list(reader.read_sales(filepath, chunksize=1))
+            self.assertEqual(len(chunks), 2)
+            self.assertEqual(chunks[1].iloc[0][Column.SALE_DATE.value].day, 3)
+
+    def test_dates_are_parsed_with_explicit_formats(self):
+        content = (
+            "Tipo Titulo;Vencimento do Titulo;Data Resgate;Quantidade;Valor\n"
+            "Tesouro Prefixado;01/02/2025;10/01/2024;5,0;4500,50\n"
+            "Tesouro Prefixado;01/02/2025;;5,0;4500,50\n"
+            "Tesouro Selic;01/03/2029;10/01/2024;1,0;1000,00\n"
+        )
+        filepath = self.create_csv_file("buybacks.csv", content)
+        df = reader.read_buybacks(filepath)
+
+        self.assertEqual(
+            df[Column.MATURITY_DATE.value].tolist(),
+            [
+                pd.Timestamp(2025, 2, 1),
+                pd.Timestamp(2025, 2, 1),
+                pd.Timestamp(2029, 3, 1),
+            ],
+        )
+        self.assertEqual(
+            df[Column.BUYBACK_DATE.value].iloc[0], pd.Timestamp(2024, 1, 10)
+        )
+        self.assertTrue(pd.isna(df[Column.BUYBACK_DATE.value].iloc[1]))
+
+    def test_bond_types_are_normalized_categoricals(self):
+        content = (
+            "Tipo Titulo;Vencimento do Titulo;Data Venda;PU;Quantidade;Valor\n"
+            "tesouro selic;01/03/2029;02/01/2024;1000,00;1,0;1000,00\n"
+            "NTN-B1;15/01/2049;02/01/2024;1000,00;1,0;1000,00\n"
+            "Tesouro Selic;01/03/2029;03/01/2024;1000,00;1,0;1000,00\n"
+            ";01/03/2029;03/01/2024;1000,00;1,0;1000,00\n"
+            "Tesouro Novo;01/03/2029;03/01/2024;1000,00;1,0;1000,00\n"
+        )
+        filepath = self.create_csv_file("sales.csv", content)
+        bond_types = reader.read_sales(filepath)[Column.BOND_TYPE.value]
+
+        self.assertIsInstance(bond_types.dtype, pd.CategoricalDtype)
+        self.assertEqual(
+            list(bond_types.cat.categories),
+            [bond_type.value for bond_type in BondType] + ["Tesouro Novo"],
+        )
+        self.assertEqual(
+            bond_types.tolist()[:3],
+            [BondType.SELIC.value, BondType.RENDA.value, BondType.SELIC.value],
+        )
+        self.assertTrue(pd.isna(bond_types.iloc[3]))
+        self.assertEqual(bond_types.iloc[4], "Tesouro Novo")
+
+    def test_read_compact(self):
+        header = (
+            "Codigo do Investidor;Data de Adesao;Estado Civil;Genero;Profissao;"
+            "Idade;UF do Investidor;Cidade do Investidor;Pais do Investidor;"
+            "Situacao da Conta;Operou 12 Meses\n"
+        )
+        rows = "".join(
+            f"{i};01/01/2024;Solteiro(a);{'MF'[i % 2]};Engenheiro;{20 + i % 50};"
+            f"SP;Sao Paulo;BRASIL;A;S\n"
+            for i in range(200)
+        )
+        filepath = self.create_csv_file("investors.csv", header + rows)
+        expected = reader.read_investors(filepath)
+
+        df = reader.read_investors(filepath, compact=True)
+        self.assertEqual(df[Column.INVESTOR_ID.value].dtype, "Int16")
+        self.assertEqual(df[Column.AGE.value].dtype, "Int8")
+        for column in (Column.CITY, Column.STATE, Column.PROFESSION, Column.GENDER):
+            self.assertIsInstance(df[column.value].dtype, pd.CategoricalDtype)
+        self.assertGreater(df.attrs["memory_saved"], 0)
+        self.assertEqual(
+            df[Column.CITY.value].astype(str).tolist(),
+            expected[Column.CITY.value].tolist(),
+        )
+
+        chunks = list(reader.read_investors(filepath, chunksize=100, compact=True))
+        self.assertEqual(len(chunks), 2)
+        self.assertGreater(chunks[1].attrs["memory_saved"], 0)
+
+    def test_read_compact_chunks(self):
+        header = (
+            "Codigo do Investidor;Data de Adesao;Estado Civil;Genero;Profissao;"
+            "Idade;UF do Investidor;Cidade do Investidor;Pais do Investidor;"
+            "Situacao da Conta;Operou 12 Meses\n"
+        )
+        # Small ids and a single profession in the first chunk; large ids,
+        # distinct professions and no gender in the second
+        rows = [
+            f"{i};01/01/2024;Solteiro(a);M;Engenheiro;30;SP;Sao Paulo;BRASIL;A;S\n"
+            for i in range(50)
+        ] + [
+            f"{100000 + i};01/01/2024;Solteiro(a);;Profissao {i};40;RJ;Rio {i};"
+            "BRASIL;D;N\n"
+            for i in range(50)
+        ]
+        filepath = self.create_csv_file("investors.csv", header + "".join(rows))
+        expected = reader.read_investors(filepath)
+
+        chunks = list(reader.read_investors(filepath, chunksize=50, compact=True))
+        self.assertEqual(len(chunks), 2)
+        pd.testing.assert_series_equal(chunks[0].dtypes, chunks[1].dtypes)
+        df = pd.concat(chunks)
+        self.assertEqual(df[Column.INVESTOR_ID.value].dtype, "Int32")
+        self.assertEqual(df[Column.AGE.value].dtype, "Int16")
+        gender = df[Column.GENDER.value]
+        self.assertIsInstance(gender.dtype, pd.CategoricalDtype)
+        self.assertEqual(
+            list(gender.cat.categories), [member.value for member in Gender]
+        )
+        if columnar.pa is not None:
+            # Otherwise, text stays as it is parsed
+            self.assertEqual(
+                df[Column.PROFESSION.value].dtype, pd.StringDtype("pyarrow")
+            )
+        # Only the dtypes changed
+        for name in df.columns:
+            pd.testing.assert_series_equal(
+                df[name], expected[name].astype(df[name].dtype)
+            )
+
+    def test_read_compact_float32(self):
+        content = (
+            "Tipo Titulo;Data Vencimento;Data Base;Taxa Compra Manha;"
+            "Taxa Venda Manha;PU Compra Manha;PU Venda Manha;PU Base Manha\n"
+            "Tesouro Selic;01/03/2025;02/01/2024;0,01;0,02;12000,00;12005,00;12002,50"
+        )
+        filepath = self.create_csv_file("prices.csv", content)
+        df = reader.read_prices(filepath, compact="float32")
+        self.assertEqual(df[Column.BASE_PRICE.value].dtype, "float32")
+        self.assertEqual(df.iloc[0][Column.BASE_PRICE.value], 12002.5)
+        df = reader.read_prices(filepath, compact=True)
+        self.assertEqual(df[Column.BASE_PRICE.value].dtype, "float64")
+
+    def test_read_columns_and_filters(self):
+        content = (
+            "Codigo do Investidor;Data da Operacao;Tipo Titulo;"
+            "Vencimento do Titulo;Quantidade;Valor do Titulo;"
+            "Valor da Operacao;Tipo da Operacao;Canal da Operacao\n"
+            "456;15/05/2024;Tesouro Selic;01/03/2029;1,5;1000,00;1500,00;C;S\n"
+            "457;16/05/2024;tesouro selic;01/03/2029;2,0;1000,00;2000,00;V;H\n"
+            "458;17/05/2024;Tesouro Selic;01/03/2029;1,0;1000,00;1000,00;C;S\n"
+            "459;18/05/2024;Tesouro Selic;01/03/2029;3,0;1000,00;3000,00;C;S\n"
+            "460;18/05/2024;Tesouro Prefixado;01/01/2027;1,0;700,00;700,00;C;S\n"
+        )
+        filepath = self.create_csv_file("operations.csv", content)
+        columns = [Column.OPERATION_DATE, Column.OPERATION_VALUE.value]
+        filters = {
+            Column.BOND_TYPE: "Tesouro Selic",
+            Column.OPERATION_TYPE: ["C"],
+            Column.OPERATION_DATE: ("2024-05-16", "2024-05-18"),
+            Column.INVESTOR_ID: {456, 458, 459, 460},
+        }
+
+        for engine in reader.ENGINES:
+            with self.subTest(engine=engine):
+                self.skip_unavailable(engine)
+                df = reader.read_operations(
+                    filepath, engine=engine, columns=columns, filters=filters
+                )
+                self.assertEqual(
+                    list(df.columns),
+                    [Column.OPERATION_DATE.value, Column.OPERATION_VALUE.value],
+                )
+                self.assertEqual(
+                    df[Column.OPERATION_VALUE.value].tolist(), [1000.0, 3000.0]
+                )
+                self.assertEqual(list(df.index), [0, 1])
+
+                chunks = list(
+                    reader.read_operations(
+                        filepath,
+                        chunksize=2,
+                        engine=engine,
+                        columns=columns,
+                        filters=filters,
+                    )
+                )
+                # The first and last chunks have no matching row
+                self.assertEqual(len(chunks), 1)
+                pd.testing.assert_frame_equal(pd.concat(chunks), df)
+
+        # Only the selected columns and those filtered on are parsed
+        with patch.object(pd, "read_csv", wraps=pd.read_csv) as read_csv:
+            reader.read_operations(filepath, columns=columns)
+        self.assertEqual(
+            read_csv.call_args.kwargs["usecols"],
+            ["Data da Operacao", "Valor da Operacao"],
+        )
+
+    def test_read_many(self):
+        header = (
+            "Tipo Titulo;Vencimento do Titulo;Data Venda;PU;Quantidade;Valor\n"
+        )
+        files = [
+            self.create_csv_file(
+                "sales-2023.csv",
+                header
+                + "Tesouro Selic;01/03/2029;02/01/2023;1000,00;1,0;1000,00\n"
+                + "Tesouro Antigo;01/03/2029;03/01/2023;1000,00;1,0;1000,00\n",
+            ),
+            self.create_csv_file(
+                "sales-2024.csv",
+                header
+                + "Tesouro IPCA+;15/08/2026;02/01/2024;3000,00;2,0;6000,00\n"
+                + "Tesouro Novo;01/03/2029;03/01/2024;1000,00;1,0;1000,00\n",
+            ),
+        ]
+        expected = ["Tesouro Selic", "Tesouro Antigo", "Tesouro IPCA+", "Tesouro Novo"]
+
+        def check(df):
+            self.assertEqual(list(df.index), [0, 1, 2, 3])
+            self.assertEqual(df[Column.BOND_TYPE.value].tolist(), expected)
+            # Each file has its own unmapped names, still one categorical
+            self.assertIsInstance(df[Column.BOND_TYPE.value].dtype, pd.CategoricalDtype)
+            self.assertEqual(
+                df[Column.SALE_DATE.value].dt.year.tolist(), [2023, 2023, 2024, 2024]
+            )
+
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                check(reader.read_many("sales", files, workers=workers))
+        # Without pyarrow, the DataFrames are concatenated by pandas
+        with patch.object(columnar, "pa", None):
+            check(reader.read_many("sales", files, workers=1))
+
+        df = reader.read_many(
+            "sales",
+            files,
+            workers=2,
+            columns=[Column.VALUE],
+            filters={Column.BOND_TYPE: "Tesouro IPCA+"},
+        )
+        self.assertEqual(df[Column.VALUE.value].tolist(), [6000.0])
+
+    def test_split_ranges(self):
+        header = "Tipo Titulo;Vencimento do Titulo;Data Venda;PU;Quantidade;Valor\n"
+        rows = [
+            f"Tesouro Selic;01/03/2029;{day:02d}/05/2024;1000,00;1,0;{day}000,00\n"
+            for day in range(1, 29)
+        ]
+        filepath = self.create_csv_file("sales.csv", header + "".join(rows))
+        with patch.object(reader, "MIN_RANGE_SIZE", 100):
+            parsed_header, ranges = reader.split_ranges(filepath, 4)
+        self.assertEqual(parsed_header.decode(), header)
+        self.assertEqual(len(ranges), 4)
+        data = filepath.read_bytes()
+        self.assertEqual(ranges[0][0], len(header))
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+        # Every range holds whole lines
+        for start, end in ranges:
+            self.assertTrue(data[start:end].endswith(b"\n"))
+            self.assertIn(data[start:end].decode().splitlines()[0] + "\n", rows)
+
+        # Too small to split
+        _, ranges = reader.split_ranges(filepath, 4)
+        self.assertEqual(ranges, [(len(header), len(data))])
+
+    def test_read_workers(self):
+        header = "Tipo Titulo;Vencimento do Titulo;Data Venda;PU;Quantidade;Valor\n"
+        bond_types = ["Tesouro Selic", "tesouro ipca+", "Tesouro Antigo"]
+        filepath = self.create_csv_file(
+            "sales.csv",
+            header
+            + "".join(
+                f"{bond_types[day % 3]};01/03/2029;{day:02d}/05/2024;"
+                f"1000,00;{day},5;{day}500,00\n"
+                for day in range(1, 29)
+            ),
+        )
+        expected = reader.read_sales(filepath)
+        with patch.object(reader, "MIN_RANGE_SIZE", 200):
+            self.assertGreater(len(reader.split_ranges(filepath, 3)[1]), 1)
+            for engine in reader.ENGINES:
+                with self.subTest(engine=engine):
+                    self.skip_unavailable(engine)
+                    df = reader.read_sales(filepath, engine=engine, workers=3)
+                    pd.testing.assert_frame_equal(df, expected)
+
+            df = reader.read_sales(
+                filepath,
+                workers=3,
+                columns=[Column.SALE_DATE],
+                filters={Column.BOND_TYPE: BondType.IPCA.value},
+            )
+            self.assertEqual(list(df.index), list(range(10)))
+            self.assertEqual(
+                df[Column.SALE_DATE.value].dt.day.tolist(), list(range(1, 29, 3))
+            )
+
+    def test_engines_return_declared_dtypes(self):
+        content = (
+            "Codigo do Investidor;Data de Adesao;Estado Civil;Genero;Profissao;"
+            "Idade;UF do Investidor;Cidade do Investidor;Pais do Investidor;"
+            "Situacao da Conta;Operou 12 Meses\n"
+            "1;01/01/2020;Solteiro(a);M;;;SP;SAO PAULO;BRASIL;A;N\n"
+            "2;02/01/2020;Solteiro(a);F;;35;RJ;RIO DE JANEIRO;BRASIL;A;S\n"
+        )
+        filepath = self.create_csv_file("investors.csv", content)
+        for engine in reader.ENGINES:
+            with self.subTest(engine=engine):
+                self.skip_unavailable(engine)
+                df = reader.read_investors(filepath, engine=engine)
+                # Inferred, they would be float64 for the blanks
+                self.assertEqual(df[Column.AGE.value].dtype, "Int64")
+                self.assertEqual(df[Column.INVESTOR_ID.value].dtype, "Int64")
+                # Inferred, pandas 2 would make them object and nanoseconds
+                self.assertEqual(df[Column.PROFESSION.value].dtype, pd.StringDtype())
+                self.assertEqual(df[Column.GENDER.value].dtype, pd.StringDtype())
+                self.assertEqual(df[Column.JOIN_DATE.value].dtype, "datetime64[us]")
+                self.assertTrue(df[Column.PROFESSION.value].isna().all())
+
+    def test_read_workers_with_blank_columns(self):
+        header = (
+            "Codigo do Investidor;Data de Adesao;Estado Civil;Genero;Profissao;"
+            "Idade;UF do Investidor;Cidade do Investidor;Pais do Investidor;"
+            "Situacao da Conta;Operou 12 Meses\n"
+        )
+        # The second half has no profession, gender or age, so some ranges
+        # only hold blanks in those columns
+        rows = [
+            f"{i};01/01/2020;Solteiro(a);M;Engenheiro;30;SP;SAO PAULO;BRASIL;A;S\n"
+            if i < 20
+            else f"{i};02/01/2020;Solteiro(a);;;;RJ;RIO DE JANEIRO;BRASIL;A;N\n"
+            for i in range(40)
+        ]
+        filepath = self.create_csv_file("investors.csv", header + "".join(rows))
+        expected = reader.read_investors(filepath)
+        with patch.object(reader, "MIN_RANGE_SIZE", 200):
+            self.assertEqual(len(reader.split_ranges(filepath, 4)[1]), 4)
+            for engine in reader.ENGINES:
+                with self.subTest(engine=engine):
+                    self.skip_unavailable(engine)
+                    df = reader.read_investors(filepath, engine=engine, workers=4)
+                    pd.testing.assert_frame_equal(df, expected)
+
+    @unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+    def test_pyarrow_engine_matches_c_engine(self):
+        cases = [
+            (
+                reader.read_operations,
+                "Codigo do Investidor;Data da Operacao;Tipo Titulo;"
+                "Vencimento do Titulo;Quantidade;Valor do Titulo;"
+                "Valor da Operacao;Tipo da Operacao;Canal da Operacao\n"
+                "456;15/05/2024;Tesouro Selic;01/03/2029;1,5;1000,00;1500,00;C;S\n"
+                "457;16/05/2024;tesouro ipca+;15/05/2035;2,0;3000,00;6000,00;V;H\n"
+                "458;17/05/2024;Tesouro Prefixado;01/01/2027;1,0;700,00;700,00;C;S\n",
+            ),
+            (
+                reader.read_stock,
+                "Tipo Titulo;Vencimento do Titulo;Mes Estoque;PU;Quantidade;"
+                "Valor Estoque\n"
+                "Tesouro Prefixado;01/01/2026;12/2024;800,50;1000,50;800900,25\n"
+                "Tesouro Selic;01/03/2029;01/2025;14000,00;2,00;28000,00\n"
+                "Tesouro IPCA+;15/05/2035;01/2025;2500,00;4,00;10000,00\n",
+            ),
+        ]
+        for read, content in cases:
+            with self.subTest(read=read.__name__):
+                filepath = self.create_csv_file(f"{read.__name__}.csv", content)
+                expected = read(filepath)
+                pd.testing.assert_frame_equal(
+                    read(filepath, engine="pyarrow"), expected
+                )
+                chunks = list(read(filepath, chunksize=2, engine="pyarrow"))
+                self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+                pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+        with self.assertRaises(ValueError):
+            reader.read_sales(filepath, engine="python")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,91 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import time
+import unittest
+
+import httpx
+
+from tddata.scheduler import Scheduler, TokenBucket, is_retryable
+
+URL = "http://example.com/file.csv"
+
+
+def _status_error(status_code):
+    request = httpx.Request("GET", URL)
+    response = httpx.Response(status_code, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+class TestScheduler(unittest.TestCase):
+    def test_is_retryable(self):
+        self.assertTrue(is_retryable(httpx.ConnectTimeout("timeout")))
+        self.assertTrue(is_retryable(_status_error(503)))
+        self.assertTrue(is_retryable(_status_error(429)))
+        self.assertFalse(is_retryable(_status_error(404)))
+        self.assertFalse(is_retryable(ValueError("CKAN API failed")))
+
+    def test_backoff_is_bounded(self):
+        scheduler = Scheduler(base_delay=1.0, max_delay=5.0)
+        for attempt in range(1, 10):
+            delay = scheduler.backoff(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(5.0, 2 ** (attempt - 1)))
+
+    def test_call_retries_until_success(self):
+        scheduler = Scheduler(base_delay=0)
+        attempts = []
+
+        async def request():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise _status_error(502)
+            return "ok"
+
+        self.assertEqual(asyncio.run(scheduler.call(URL, request)), "ok")
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(scheduler.retries, 2)
+
+    def test_retry_budget_is_shared(self):
+        scheduler = Scheduler(base_delay=0, retry_budget=1)
+
+        async def request():
+            raise httpx.ReadTimeout("timeout")
+
+        async def run():
+            for _ in range(2):
+                with self.assertRaises(httpx.ReadTimeout):
+                    await scheduler.call(URL, request)
+
+        asyncio.run(run())
+        self.assertEqual(scheduler.retries, 1)
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=50, burst=1)
+
+        async def acquire_many():
+            start = time.monotonic()
+            for _ in range(6):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        # The first token is available at once, the next 5 at 50 per second
+        self.assertGreaterEqual(asyncio.run(acquire_many()), 0.09)
+
+
+if __name__ == "__main__":
+    unittest.main()
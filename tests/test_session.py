@@ -0,0 +1,66 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import unittest
+
+import httpx
+
+from tddata.session import Session
+
+
+class TestSession(unittest.TestCase):
+    def test_client_is_reused(self):
+        with Session(max_connections=5, timeout=12.0) as session:
+            client = session.client
+            self.assertIs(session.client, client)
+            self.assertEqual(client.timeout.read, 12.0)
+            self.assertIsNone(client.timeout.pool)
+        self.assertTrue(client.is_closed)
+
+    def test_async_client_is_recreated_per_event_loop(self):
+        session = Session()
+
+        async def get_client():
+            return session.async_client
+
+        first = asyncio.run(get_client())
+        second = asyncio.run(get_client())
+        self.assertIsNot(first, second)
+
+        async def get_client_twice():
+            return session.async_client, session.async_client
+
+        a, b = asyncio.run(get_client_twice())
+        self.assertIs(a, b)
+
+    def test_user_clients_are_not_closed(self):
+        client = httpx.Client()
+        async_client = httpx.AsyncClient()
+        session = Session(client=client, async_client=async_client)
+
+        async def use_and_close():
+            self.assertIs(session.async_client, async_client)
+            await session.aclose()
+
+        asyncio.run(use_and_close())
+        self.assertFalse(client.is_closed)
+        self.assertFalse(async_client.is_closed)
+        client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
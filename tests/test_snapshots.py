@@ -0,0 +1,144 @@
+# Copyright (C) 2020-2025 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+
+from tddata import downloader, integrity, reader, snapshots, storage
+from tddata.constants import Column
+from tddata.session import Session
+
+HEADER = "Tipo Titulo;Vencimento do Titulo;Data Venda;PU;Quantidade;Valor\n"
+ROW = "Tesouro Selic;01/03/2029;{day:02d}/05/2024;1000,00;1,00;1000,00\n"
+
+
+def sales_rows(days):
+    return HEADER + "".join(ROW.format(day=day) for day in days)
+
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, name, content):
+        filepath = self.test_dir / name
+        filepath.write_text(content, encoding="utf-8")
+        return filepath
+
+    def objects(self):
+        return [p for p in (self.test_dir / "objects").rglob("*") if p.is_file()]
+
+    def test_appended_versions_share_chunks(self):
+        old = self.write("vendas@20240101T000000.csv", sales_rows(range(1, 20)))
+        new = self.write("vendas@20240201T000000.csv", sales_rows(range(1, 30)))
+        old_ref = snapshots.snapshot_file(old, chunk_size=128)
+        chunks = len(self.objects())
+        new_ref = snapshots.snapshot_file(new, chunk_size=128)
+
+        self.assertFalse(old.exists())
+        self.assertFalse(new.exists())
+        old_chunks = snapshots.read_ref(old_ref)["chunks"]
+        new_chunks = snapshots.read_ref(new_ref)["chunks"]
+        # All the full chunks of the old version are reused
+        self.assertEqual(new_chunks[: len(old_chunks) - 1], old_chunks[:-1])
+        self.assertLess(len(self.objects()) - chunks, len(new_chunks))
+
+        with snapshots.open_snapshot(new_ref) as f:
+            self.assertEqual(f.read().decode(), sales_rows(range(1, 30)))
+
+    def test_identical_versions_are_stored_once(self):
+        for name in ["vendas@20240101T000000.csv", "vendas@20240201T000000.csv"]:
+            snapshots.snapshot_file(self.write(name, sales_rows(range(1, 10))))
+        self.assertEqual(len(self.objects()), 1)
+
+    def test_refs_are_resolved_as_files(self):
+        filepath = self.write(
+            "vendas-do-tesouro-direto@20240101T000000.csv", sales_rows([1, 2])
+        )
+        integrity.write_digest(filepath, integrity.hash_file(filepath))
+        ref = snapshots.snapshot_file(filepath, chunk_size=64)
+        self.assertFalse(integrity.get_digest_path(filepath).exists())
+
+        self.assertEqual(storage.get_latest_file(self.test_dir, "vendas*.csv"), ref)
+        self.assertEqual(storage.get_latest_files(self.test_dir), [ref])
+
+        df = reader.read_sales(ref)
+        self.assertEqual(len(df), 2)
+        self.assertEqual(df.iloc[1][Column.SALE_DATE.value].day, 2)
+
+        dest = snapshots.materialize(ref, self.test_dir / "copy.csv")
+        self.assertEqual(dest.read_text(encoding="utf-8"), sales_rows([1, 2]))
+
+    def test_verify_ref(self):
+        ref = snapshots.snapshot_file(
+            self.write("vendas@20240101T000000.csv", sales_rows([1, 2]))
+        )
+        (result,) = integrity.verify_store(self.test_dir, workers=1)
+        self.assertEqual(result["status"], "ok")
+
+        (chunk,) = self.objects()
+        chunk.write_bytes(b"corrupted")
+        self.assertEqual(snapshots.verify_ref(ref)["status"], "mismatch")
+        chunk.unlink()
+        self.assertEqual(snapshots.verify_ref(ref)["status"], "mismatch")
+
+    @patch("tddata.downloader.get_dataset_resources_async")
+    def test_download_dedup(self, mock_get_resources):
+        mock_get_resources.return_value = [
+            {
+                "name": "Vendas do Tesouro Direto",
+                "format": "CSV",
+                "url": "http://example.com/vendas.csv",
+                "last_modified": "2024-01-01T12:00:00.000000",
+            }
+        ]
+        content = sales_rows([1, 2, 3]).encode()
+
+        def handler(request):
+            return httpx.Response(200, content=content)
+
+        def download():
+            session = Session(
+                async_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            )
+            return downloader.download(
+                self.test_dir, "vendas", session=session, dedup=True
+            )
+
+        (result,) = download()
+        ref = self.test_dir / "vendas-do-tesouro-direto@20240101T120000.csv.ref"
+        self.assertEqual(result["destination"], ref)
+        self.assertTrue(ref.exists())
+        self.assertFalse(ref.with_suffix("").exists())
+        with snapshots.open_snapshot(ref) as f:
+            self.assertEqual(f.read(), content)
+
+        # The reference counts as the stored version on the next sync
+        (result,) = download()
+        self.assertEqual(result["status"], "unchanged")
+        self.assertEqual(result["destination"], ref)
+
+
+if __name__ == "__main__":
+    unittest.main()
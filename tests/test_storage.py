@@ -14,12 +14,16 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import datetime as dt
 import shutil
 import tempfile
 import unittest
 from pathlib import Path
 
-from tddata import storage
+import pandas as pd
+
+from tddata import compression, integrity, snapshots, storage
+from tddata.catalog import Catalog
 
 
 class TestStorage(unittest.TestCase):
@@ -53,6 +57,16 @@ class TestStorage(unittest.TestCase):
         self.assertTrue(filename.startswith("tesouro-selic@"))
         self.assertTrue(filename.endswith(".csv"))
 
+    def test_extract_year(self):
+        self.assertEqual(
+            storage.extract_year("Operações do Tesouro Direto 2024"), 2024
+        )
+        self.assertEqual(
+            storage.extract_year("operacoes-do-tesouro-direto-2024@20250101T000000.csv"),
+            2024,
+        )
+        self.assertIsNone(storage.extract_year("estoque-do-tesouro-direto@20250101T000000.csv"))
+
     def test_get_latest_files(self):
         # Create dummy files
         (self.test_dir / "file-a@20240101T100000.csv").touch()
@@ -83,6 +97,136 @@ class TestStorage(unittest.TestCase):
         latest = storage.get_latest_file(self.test_dir, "nonexistent*.csv")
         self.assertIsNone(latest)
 
+    def create_versions(self, slug, timestamps):
+        paths = []
+        for timestamp in timestamps:
+            path = self.test_dir / f"{slug}@{timestamp:%Y%m%dT%H%M%S}.csv"
+            path.write_text("a;b\n1;2\n" * 100)
+            integrity.write_digest(path, integrity.hash_file(path))
+            paths.append(path)
+        return paths
+
+    def test_compact_keep_last(self):
+        now = dt.datetime.now()
+        paths = self.create_versions(
+            "file-a", [now - dt.timedelta(days=d) for d in (30, 20, 10, 0)]
+        )
+        (single,) = self.create_versions("file-b", [now - dt.timedelta(days=90)])
+
+        report = storage.compact(self.test_dir, keep_last=2)
+
+        self.assertEqual([e["path"] for e in report], paths[:2])
+        self.assertEqual({e["action"] for e in report}, {"delete"})
+        for path in paths[:2]:
+            self.assertFalse(path.exists())
+            self.assertFalse(integrity.get_digest_path(path).exists())
+        for path in [*paths[2:], single]:
+            self.assertTrue(path.exists())
+
+    def test_compact_groups_versions_by_format(self):
+        now = dt.datetime.now()
+        csv_paths = self.create_versions(
+            "file-a", [now - dt.timedelta(days=d) for d in (30, 20)]
+        )
+        # A compressed CSV version is still a CSV version
+        compressed = csv_paths[1].with_name(csv_paths[1].name + ".zst")
+        csv_paths[1].rename(compressed)
+        parquet_paths = [
+            self.test_dir / f"file-a@{now - dt.timedelta(days=d):%Y%m%dT%H%M%S}.parquet"
+            for d in (10, 0)
+        ]
+        for path in parquet_paths:
+            path.write_bytes(b"PAR1")
+
+        report = storage.compact(self.test_dir, keep_last=1)
+
+        self.assertEqual(
+            [e["path"] for e in report], sorted([csv_paths[0], parquet_paths[0]])
+        )
+        self.assertTrue(compressed.exists())
+        self.assertTrue(parquet_paths[1].exists())
+
+    def test_compact_max_age_and_dry_run(self):
+        now = dt.datetime.now()
+        paths = self.create_versions(
+            "file-a", [now - dt.timedelta(days=d) for d in (30, 20, 5, 1)]
+        )
+
+        report = storage.compact(self.test_dir, max_age_days=7, dry_run=True)
+        self.assertEqual([e["path"] for e in report], paths[:2])
+        self.assertTrue(all(path.exists() for path in paths))
+
+        storage.compact(self.test_dir, max_age_days=7)
+        self.assertEqual(storage.get_versions(self.test_dir, "file-a"), paths[2:])
+
+    @unittest.skipIf(compression.zstandard is None, "zstandard is not installed")
+    def test_compact_compresses_retained_versions(self):
+        now = dt.datetime.now()
+        paths = self.create_versions(
+            "file-a", [now - dt.timedelta(days=d) for d in (3, 2, 1)]
+        )
+
+        report = storage.compact(self.test_dir, compress=True, workers=1)
+
+        self.assertEqual([e["action"] for e in report], ["compress", "compress"])
+        compressed = [path.with_name(path.name + ".zst") for path in paths[:2]]
+        self.assertEqual(
+            storage.get_versions(self.test_dir, "file-a"), [*compressed, paths[2]]
+        )
+        # The latest version stays uncompressed
+        self.assertEqual(storage.get_latest_files(self.test_dir), [paths[2]])
+        pd.testing.assert_frame_equal(
+            pd.read_csv(compressed[0], sep=";"), pd.read_csv(paths[2], sep=";")
+        )
+        self.assertEqual(integrity.verify_file(compressed[0])["status"], "ok")
+
+    @unittest.skipIf(compression.zstandard is None, "zstandard is not installed")
+    def test_compact_updates_catalog_rows(self):
+        now = dt.datetime.now()
+        paths = self.create_versions(
+            "file-a", [now - dt.timedelta(days=d) for d in (3, 2, 1)]
+        )
+        with Catalog(self.test_dir) as catalog:
+            for path in paths:
+                catalog.add(path, dataset="dataset-a", digest="sha256:recorded")
+
+        storage.compact(self.test_dir, keep_last=2, compress=True, workers=1)
+
+        compressed = paths[1].with_name(paths[1].name + ".zst")
+        with Catalog(self.test_dir) as catalog:
+            rows = {
+                row[0]: row[1:]
+                for row in catalog.connection.execute(
+                    "SELECT path, dataset, digest FROM files"
+                )
+            }
+        algorithm, hexdigest = integrity.read_digest(compressed)
+        self.assertEqual(
+            rows,
+            {
+                # The latest version keeps what the downloader recorded
+                paths[2].name: ("dataset-a", "sha256:recorded"),
+                compressed.name: ("dataset-a", f"{algorithm}:{hexdigest}"),
+            },
+        )
+
+    def test_compact_collects_snapshot_chunks(self):
+        now = dt.datetime.now()
+        paths = self.create_versions(
+            "file-a", [now - dt.timedelta(days=d) for d in (2, 1)]
+        )
+        paths[0].write_text("old content")
+        refs = [snapshots.snapshot_file(path) for path in paths]
+        objects = self.test_dir / "objects"
+        self.assertEqual(len(list(objects.glob("*/*"))), 2)
+
+        storage.compact(self.test_dir, keep_last=1)
+
+        self.assertFalse(refs[0].exists())
+        self.assertEqual(len(list(objects.glob("*/*"))), 1)
+        with snapshots.open_snapshot(refs[1]) as f:
+            self.assertEqual(f.read(), b"a;b\n1;2\n" * 100)
+
 
 if __name__ == "__main__":
     unittest.main()